@@ -0,0 +1,24 @@
+# Loaded automatically by gunicorn from the working directory.
+import glob
+import os
+import tempfile
+
+# Prometheus metrics (todos.metrics) are written by every worker to files in this
+# directory and summed when /metrics/ is scraped. It must be set before workers
+# import the application.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'todo_app_metrics'))
+
+
+def on_starting(server):
+    # Counters from a previous run would otherwise be added to the new ones. Only the
+    # metric files are removed: the directory may be one the operator configured.
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.db')):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -53,9 +53,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Removes itself unless REQUEST_INSTRUMENTATION is set
+    'todos.instrumentation.RequestInstrumentationMiddleware',
+    'todos.metrics.MetricsMiddleware',
     'axes.middleware.AxesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # gzip/brotli for JSON responses; after WhiteNoise, which serves precompressed static files
+    'todos.compression.ResponseCompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -75,6 +80,8 @@ AXES_COOLOFF_TIME = timedelta(minutes=30)
 AXES_LOCKOUT_CALLABLE = 'todos.utils.lockout_response'  
 AXES_RESET_ON_SUCCESS = True  
 AXES_LOCKOUT_PARAMETERS = [["username", "ip_address"]] # Only lock out when the exact combination of username AND IP address exceeds the failure limit
+# How long axes AccessLog / AccessFailureLog rows are kept by `manage.py reap_expired`
+ACCESS_LOG_RETENTION = timedelta(days=90)
 
 ROOT_URLCONF = 'todo_app.urls'
 
@@ -100,13 +107,14 @@ WSGI_APPLICATION = 'todo_app.wsgi.application'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'todos.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson when installed, byte-compatible with rest_framework.renderers.JSONRenderer
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'todos.renderers.FastJSONRenderer',
     ),
 }
 
@@ -124,6 +132,29 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
 }
 
+# Serve the read hot paths (todo lists, my groups, user info) with async views;
+# enable only when running under an ASGI server (uvicorn todo_app.asgi:application)
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS') == 'True'
+
+# Per-request query count, DB/view/serialization time in a Server-Timing header and a
+# JSON log line (todos.instrumentation); SQL shapes repeated more than the threshold
+# within one request are logged as suspected N+1 queries
+REQUEST_INSTRUMENTATION = os.getenv('REQUEST_INSTRUMENTATION') == 'True'
+REQUEST_INSTRUMENTATION_REPEATED_QUERY_THRESHOLD = int(os.getenv('REQUEST_INSTRUMENTATION_REPEATED_QUERY_THRESHOLD', 5))
+
+# Prometheus request metrics (todos.metrics) served at /metrics/ to staff users; opt-in,
+# since they time every SQL query. With several gunicorn workers they are aggregated
+# through PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED') == 'True'
+
+# JSON responses at least this large (bytes) are compressed (todos.compression)
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv('RESPONSE_COMPRESSION_MIN_SIZE', '1024'))
+
+# How long a user's token_version is cached by ClaimsJWTAuthentication. With the default
+# per-process cache this is how long a revoked token stays valid on other workers;
+# 0 disables the cache (one query per request)
+AUTH_TOKEN_VERSION_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_VERSION_CACHE_TIMEOUT', 30))
+
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         'Bearer': {
@@ -166,8 +197,35 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL')
 
+# Email outbox drained by `manage.py send_queued_emails`
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_BACKOFF = timedelta(minutes=1)
+EMAIL_OUTBOX_MAX_BACKOFF = timedelta(hours=6)
+# A worker claims a batch for this long; messages it did not finish are retried afterwards
+EMAIL_OUTBOX_CLAIM_TIMEOUT = timedelta(minutes=10)
+# Sent and dead messages older than this are removed by `manage.py reap_expired`
+EMAIL_OUTBOX_RETENTION = timedelta(days=30)
+
 PASSWORD_RESET_TIMEOUT = 86400
 
+# Cursor pagination of todo lists (?page_size=...&cursor=...)
+TODO_PAGE_SIZE = int(os.getenv('TODO_PAGE_SIZE', 50))
+TODO_MAX_PAGE_SIZE = int(os.getenv('TODO_MAX_PAGE_SIZE', 200))
+
+# Rows fetched per database round trip (server-side cursor on PostgreSQL) and sent
+# per chunk by the streaming export (todos/export/)
+TODO_EXPORT_CHUNK_SIZE = int(os.getenv('TODO_EXPORT_CHUNK_SIZE', 2000))
+
+# Maximum number of operations accepted by todos/batch/
+TODO_BATCH_MAX_OPERATIONS = 500
+
+# Delta sync (todos/sync/): cursors older than the tombstone retention force a full resync
+TODO_TOMBSTONE_RETENTION = timedelta(days=30)
+TODO_SYNC_OVERLAP = timedelta(seconds=5)
+
+# Group member/admin rosters used by permission checks (todos.membership)
+GROUP_ROSTER_CACHE_TIMEOUT = 300
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -1,10 +1,22 @@
 from django.contrib import admin
-from .models import ToDo, Group
+from .models import ToDo, Group, OutboxEmail
+from .search import search_todos
 
 class ToDoAdmin(admin.ModelAdmin):
     list_display = ('title', 'priority', 'user', 'group', 'is_completed')
     list_filter = ('priority', 'is_completed', 'group')
     search_fields = ('title', 'description')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Same index-backed search as the API (tsvector + GIN on PostgreSQL).
+        return search_todos(queryset, search_term, order_by_rank=False), False
+
 admin.site.register(ToDo, ToDoAdmin)
-admin.site.register(Group)
\ No newline at end of file
+admin.site.register(Group)
+
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
\ No newline at end of file
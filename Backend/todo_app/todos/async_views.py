@@ -0,0 +1,155 @@
+"""
+Asynchroniczne (ASGI) wersje najczęściej wywoływanych endpointów odczytu.
+
+Żądanie GET z tokenem JWT zawierającym claimy (patrz todos.authentication) jest
+obsługiwane w pętli zdarzeń przez async ORM: worker nie jest blokowany na czas
+oczekiwania na bazę. Wszystko inne - pozostałe metody, brak lub błędny token,
+tokeny sprzed wprowadzenia claimów, sesja panelu admina - trafia do dotychczasowego
+widoku DRF (sync_view), więc odpowiedzi i błędy pozostają identyczne.
+
+Włączane ustawieniem ASYNC_READ_VIEWS (patrz todos/urls.py); ma sens tylko pod
+serwerem ASGI - pod WSGI każdy widok asynchroniczny dostaje własną pętlę zdarzeń.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+from rest_framework.request import Request
+
+from .authentication import ClaimsJWTAuthentication
+from .models import CustomUser, Group
+from .fastpath import ToDoListFastPath
+from .serializers import GroupSerializer
+from .versioning import etag_matches, version_etag
+from .views import (
+    MyGroupsListView,
+    ToDoByGroupView,
+    ToDoByUserView,
+    ToDoListCreateView,
+    UserInfoView,
+    get_filtered_todos,
+    get_group_filtered_todos,
+    user_groups_filter,
+    user_info_data,
+)
+
+
+class AsyncReadView(View):
+    sync_view = None
+    # Czy odpowiedź dostaje ETag z data_version (jak @conditional_on_user_version)
+    conditional = True
+    fallback_view = None
+    allow_header = None
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        sync_view = cls.sync_view()
+        # View.setup() robi to samo przed wyliczeniem nagłówka Allow w DRF
+        if hasattr(sync_view, 'get') and not hasattr(sync_view, 'head'):
+            sync_view.head = sync_view.get
+        view = super().as_view(
+            fallback_view=cls.sync_view.as_view(),
+            allow_header=', '.join(sync_view.allowed_methods),
+            **initkwargs,
+        )
+        # Jak widoki DRF: uwierzytelnianie tokenem, bez CSRF
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method == 'GET':
+            try:
+                auth = await ClaimsJWTAuthentication().aauthenticate(request)
+            except APIException:
+                auth = None
+            if auth is not None:
+                drf_request = Request(request)
+                drf_request.user, drf_request.auth = auth
+                return await self.get_conditional(drf_request, *args, **kwargs)
+
+        return await sync_to_async(self.fallback_view)(request, *args, **kwargs)
+
+    async def get_conditional(self, request, *args, **kwargs):
+        user = request.user
+        etag = None
+        if self.conditional and not user.is_superuser:
+            data_version = await (
+                CustomUser.objects.filter(pk=user.id).values_list('data_version', flat=True).afirst()
+            )
+            etag = version_etag(user.id, data_version, request.get_full_path())
+            if etag_matches(etag, request.headers.get('If-None-Match')):
+                response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+                del response['Content-Type']
+                response['ETag'] = etag
+                return self.finalize(response)
+
+        try:
+            data = await self.get(request, *args, **kwargs)
+        except APIException as exc:
+            # Błędy parametrów (kursor, fields/omit) w tym samym formacie co exception_handler DRF
+            detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            return self.render(detail, status_code=exc.status_code)
+
+        response = self.render(data)
+        if etag:
+            response['ETag'] = etag
+        return response
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        response = HttpResponse(renderer.render(data), content_type=renderer.media_type, status=status_code)
+        return self.finalize(response)
+
+    def finalize(self, response):
+        response['Allow'] = self.allow_header
+        return response
+
+
+class AsyncToDoListMixin:
+    """Wspólna obsługa listy zadań: opcjonalne stronicowanie kursorowe i serializacja (todos.fastpath)."""
+
+    async def list_todos(self, request, todos):
+        fast = ToDoListFastPath(request, todos)
+        return fast.data([row async for row in fast.rows])
+
+
+class AsyncToDoListView(AsyncToDoListMixin, AsyncReadView):
+    sync_view = ToDoListCreateView
+
+    async def get(self, request):
+        return await self.list_todos(request, get_filtered_todos(request, requesting_user=request.user))
+
+
+class AsyncToDoByUserView(AsyncToDoListMixin, AsyncReadView):
+    sync_view = ToDoByUserView
+
+    async def get(self, request):
+        return await self.list_todos(request, get_filtered_todos(request, requesting_user=request.user))
+
+
+class AsyncToDoByGroupView(AsyncToDoListMixin, AsyncReadView):
+    sync_view = ToDoByGroupView
+
+    async def get(self, request):
+        return await self.list_todos(request, get_group_filtered_todos(request, requesting_user=request.user))
+
+
+class AsyncMyGroupsListView(AsyncReadView):
+    sync_view = MyGroupsListView
+
+    async def get(self, request):
+        groups = GroupSerializer.eager_queryset(Group.objects.filter(user_groups_filter(request.user)).distinct(), request)
+        # Iteracja async wykonuje zapytanie główne i prefetche, serializacja nie sięga już do bazy
+        groups = [group async for group in groups]
+        return GroupSerializer(groups, many=True, context={'request': request}).data
+
+
+class AsyncUserInfoView(AsyncReadView):
+    sync_view = UserInfoView
+    conditional = False
+
+    async def get(self, request):
+        return user_info_data(request.user)
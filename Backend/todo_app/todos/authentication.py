@@ -0,0 +1,152 @@
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+TOKEN_VERSION_CLAIM = 'tv'
+CLAIMED_USER_FIELDS = ('username', 'is_verified', 'is_superuser')
+
+_missing = object()
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token (i wyprowadzony z niego access token) z danymi użytkownika w claimach."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for field in CLAIMED_USER_FIELDS:
+            token[field] = getattr(user, field)
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+
+def token_version_cache_key(user_id):
+    return f'token-version:{user_id}'
+
+
+def get_token_version(user_id):
+    """
+    Aktualny token_version aktywnego użytkownika (None, gdy nie istnieje lub jest
+    nieaktywny). Odczyt idzie przez cache; sygnał post_save CustomUser nadpisuje
+    wpis przy każdym zapisie, a AUTH_TOKEN_VERSION_CACHE_TIMEOUT ogranicza
+    opóźnienie unieważnienia przy cache lokalnym dla procesu.
+    """
+    key = token_version_cache_key(user_id)
+    version = cache.get(key, _missing)
+    if version is _missing:
+        version = (
+            get_user_model().objects
+            .filter(pk=user_id, is_active=True)
+            .values_list('token_version', flat=True)
+            .first()
+        )
+        cache.set(key, version, getattr(settings, 'AUTH_TOKEN_VERSION_CACHE_TIMEOUT', 30))
+    return version
+
+
+async def aget_token_version(user_id):
+    """Asynchroniczny odpowiednik get_token_version() dla widoków ASGI."""
+    key = token_version_cache_key(user_id)
+    version = await cache.aget(key, _missing)
+    if version is _missing:
+        version = await (
+            get_user_model().objects
+            .filter(pk=user_id, is_active=True)
+            .values_list('token_version', flat=True)
+            .afirst()
+        )
+        await cache.aset(key, version, getattr(settings, 'AUTH_TOKEN_VERSION_CACHE_TIMEOUT', 30))
+    return version
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    Użytkownik zbudowany z claimów tokena. id, username, is_verified itp. są
+    dostępne bez zapytania; każdy inny atrybut (lub użycie w ORM) ładuje
+    obiekt CustomUser z bazy, więc widoki działają bez zmian.
+
+    'data_version' celowo nie jest claimem - zmienia się przy każdym zapisie
+    zadania, więc token byłby natychmiast nieaktualny. ETagi (versioning) i klucz
+    cache składu grup odczytują je z bazy, co kosztuje jedno zapytanie na żądanie.
+    """
+
+    def __init__(self, validated_token, load_user):
+        super().__init__(load_user)
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        claims = {field: validated_token[field] for field in CLAIMED_USER_FIELDS}
+        claims.update(
+            id=user_id,
+            pk=user_id,
+            is_active=True,
+            is_authenticated=True,
+            is_anonymous=False,
+        )
+        self.__dict__['_claims'] = claims
+
+    def __bool__(self):
+        # `if not request.user` nie powinno wymuszać wczytania użytkownika
+        return True
+
+    def __getattr__(self, name):
+        claims = self.__dict__['_claims']
+        if self._wrapped is empty and name in claims:
+            return claims[name]
+        return super().__getattr__(name)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Uwierzytelnianie JWT bez zapytania o użytkownika: token jest ważny, jeśli jego
+    znacznik 'tv' zgadza się z aktualnym token_version użytkownika (z cache).
+    Tokeny wystawione przed wprowadzeniem claimów obsługuje zwykła ścieżka simplejwt.
+
+    Zapytanie odpada tylko w widokach, które nie sięgają po inne pola użytkownika
+    (np. /info/); widoki z ETagiem nadal wczytują 'data_version'. Sygnał usuwa wpis
+    z cache po zapisie użytkownika, ale przy cache lokalnym dla procesu (domyślny
+    LocMemCache) inne workery widzą unieważnienie dopiero po
+    AUTH_TOKEN_VERSION_CACHE_TIMEOUT; wspólny backend CACHES usuwa to okno.
+    """
+
+    def get_user(self, validated_token):
+        if TOKEN_VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        return self.get_claims_user(validated_token, get_token_version(self.get_user_id(validated_token)))
+
+    async def aauthenticate(self, request):
+        """
+        Asynchroniczny odpowiednik authenticate(). Zwraca None również dla tokenów
+        bez claimów - te wymagają wczytania użytkownika i obsługuje je ścieżka synchroniczna.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if TOKEN_VERSION_CLAIM not in validated_token:
+            return None
+        version = await aget_token_version(self.get_user_id(validated_token))
+        return self.get_claims_user(validated_token, version), validated_token
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+    def get_claims_user(self, validated_token, version):
+        if version is None:
+            raise AuthenticationFailed("User not found or inactive", code="user_not_found")
+        if version != validated_token[TOKEN_VERSION_CLAIM]:
+            raise AuthenticationFailed("Token has been revoked", code="token_not_valid")
+
+        return ClaimsUser(validated_token, partial(JWTAuthentication.get_user, self, validated_token))
@@ -0,0 +1,90 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPSConnection
+from urllib.parse import urlsplit
+
+from .instrumentation import parse_server_timing
+
+
+class RollbackBenchmark(Exception):
+    """Wyjątek wycofujący transakcję, w której wykonano pomiar."""
+
+
+def summarize_latencies(latencies, errors, elapsed, queries=()):
+    """
+    Przepustowość i percentyle opóźnień (w ms) z listy czasów pojedynczych żądań (w s)
+    oraz, jeśli są znane, średnia i maksymalna liczba zapytań SQL na żądanie.
+    """
+    latencies = sorted(latencies)
+
+    def percentile(fraction):
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000, 2)
+
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'latency_ms_mean': round(statistics.fmean(latencies) * 1000, 2) if latencies else None,
+        'latency_ms_p50': percentile(0.50),
+        'latency_ms_p95': percentile(0.95),
+        'latency_ms_p99': percentile(0.99),
+        'queries_mean': round(sum(queries) / len(queries), 2) if queries else None,
+        'queries_max': max(queries, default=None),
+    }
+
+
+def server_timing_queries(header):
+    """Liczba zapytań z nagłówka Server-Timing (todos.instrumentation) albo None."""
+    description = parse_server_timing(header).get('db', {}).get('desc', '')
+    count = description.split(' ')[0]
+    return int(count) if count.isdigit() else None
+
+
+def run_load(url, headers, concurrency, total_requests, method='GET'):
+    """
+    Wysyła total_requests żądań do działającego serwera z `concurrency` wątków,
+    każdy na własnym połączeniu keep-alive. Odpowiedzi 4xx/5xx liczą się jako błędy.
+    Liczby zapytań są znane, gdy serwer ma włączone REQUEST_INSTRUMENTATION.
+    """
+    parts = urlsplit(url)
+    connection_class = HTTPSConnection if parts.scheme == 'https' else HTTPConnection
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+
+    counter = iter(range(total_requests))
+    counter_lock = threading.Lock()
+    latencies, errors, queries = [], [], []
+
+    def worker():
+        connection = connection_class(parts.netloc, timeout=30)
+        while True:
+            with counter_lock:
+                if next(counter, None) is None:
+                    break
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                query_count = server_timing_queries(response.getheader('Server-Timing'))
+                if query_count is not None:
+                    queries.append(query_count)
+                if response.status >= 400:
+                    errors.append(response.status)
+            except OSError as exc:
+                errors.append(type(exc).__name__)
+                connection.close()
+                connection = connection_class(parts.netloc, timeout=30)
+                continue
+            latencies.append(time.perf_counter() - started)
+        connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    return summarize_latencies(latencies, errors, time.perf_counter() - started, queries)
@@ -0,0 +1,137 @@
+"""
+Kompresja odpowiedzi API negocjowana nagłówkiem Accept-Encoding: brotli, gdy
+klient go akceptuje i zainstalowany jest pakiet 'Brotli', w przeciwnym razie gzip.
+
+Kompresowane są tylko odpowiedzi o typach z COMPRESSIBLE_CONTENT_TYPES większe
+niż RESPONSE_COMPRESSION_MIN_SIZE bajtów (krótszych nie opłaca się kompresować)
+oraz odpowiedzi strumieniowe tych typów. Statyczne pliki obsługuje WhiteNoise,
+który ma własne, wcześniej skompresowane wersje.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_CONTENT_TYPES = ('application/json', 'application/x-ndjson', 'text/csv')
+# Jakość 11 (domyślna) jest przeznaczona dla plików kompresowanych raz, z góry;
+# przy kompresji każdej odpowiedzi w locie jest kilkadziesiąt razy wolniejsza
+BROTLI_QUALITY = 5
+# Jak GZipMiddleware: losowe bajty w nagłówku gzip utrudniają ataki typu BREACH
+GZIP_MAX_RANDOM_BYTES = 100
+
+
+def accepted_encodings(header):
+    """Kodowania z nagłówka Accept-Encoding z wagą q > 0."""
+    encodings = set()
+    for item in header.split(','):
+        coding, *params = (part.strip() for part in item.split(';'))
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding and weight > 0:
+            encodings.add(coding.lower())
+    return encodings
+
+
+def choose_encoding(header):
+    encodings = accepted_encodings(header or '')
+    if brotli is not None and 'br' in encodings:
+        return 'br'
+    if 'gzip' in encodings:
+        return 'gzip'
+    return None
+
+
+def brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    for chunk in sequence:
+        # flush() po każdym fragmencie: klient dostaje dane od razu, jak przy compress_sequence
+        yield compressor.process(chunk) + compressor.flush()
+    yield compressor.finish()
+
+
+async def brotli_async_sequence(sequence):
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    async for chunk in sequence:
+        yield compressor.process(chunk) + compressor.flush()
+    yield compressor.finish()
+
+
+async def gzip_async_sequence(sequence):
+    # compress_sequence przyjmuje tylko zwykłe iteratory; tu kompresujemy każdy fragment
+    # osobno jak GZipMiddleware (kolejne człony gzip są poprawnym strumieniem)
+    async for chunk in sequence:
+        yield compress_string(chunk, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+
+
+class ResponseCompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'RESPONSE_COMPRESSION_MIN_SIZE', 1024)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def is_compressible(self, response):
+        if response.has_header('Content-Encoding'):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in COMPRESSIBLE_CONTENT_TYPES:
+            return False
+        return response.streaming or len(response.content) >= self.min_size
+
+    def compress(self, request, response):
+        if not self.is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                wrapper = brotli_async_sequence if encoding == 'br' else gzip_async_sequence
+                response.streaming_content = wrapper(response.streaming_content)
+            elif encoding == 'br':
+                response.streaming_content = brotli_sequence(response.streaming_content)
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, max_random_bytes=GZIP_MAX_RANDOM_BYTES,
+                )
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+            else:
+                compressed = compress_string(response.content, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # Silny ETag nie może opisywać innej reprezentacji (RFC 9110, 8.8.1)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
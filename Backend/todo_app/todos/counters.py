@@ -0,0 +1,99 @@
+import logging
+from collections import Counter
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Q
+
+from .models import ToDo, ToDoCounter
+
+logger = logging.getLogger(__name__)
+
+
+def counter_deltas(created=(), deleted=(), changed=()):
+    """
+    Zwraca zmiany liczników dla utworzonych, usuniętych i zmienionych zadań.
+    'changed' to pary (klucz przed zapisem, klucz po zapisie).
+    """
+    deltas = Counter()
+    for todo in created:
+        deltas[todo.counter_key()] += 1
+    for todo in deleted:
+        deltas[getattr(todo, '_loaded_counter_key', None) or todo.counter_key()] -= 1
+    for old_key, new_key in changed:
+        if old_key != new_key:
+            deltas[old_key] -= 1
+            deltas[new_key] += 1
+    deltas.pop(None, None)
+    return deltas
+
+
+def apply_counter_deltas(deltas):
+    """
+    Nanosi zmiany na wiersze ToDoCounter (UPDATE count = count + delta).
+    Wiersz jest tworzony przy pierwszym zwiększeniu; zmniejszenie nieistniejącego
+    wiersza oznacza rozjazd i jest tylko logowane (naprawia go rebuild_todo_counters).
+    Klucze są przetwarzane w stałej kolejności, by równoległe transakcje nie
+    blokowały się nawzajem.
+    """
+    for key in sorted(deltas, key=lambda k: tuple(-1 if v is None else int(v) for v in k)):
+        delta = deltas[key]
+        if not delta:
+            continue
+        user_id, group_id, priority, is_completed = key
+        rows = ToDoCounter.objects.filter(user_id=user_id, group_id=group_id, priority=priority, is_completed=is_completed)
+        if rows.update(count=F('count') + delta):
+            continue
+        if delta < 0:
+            logger.warning(f"ToDoCounter drift: missing row for {key} (delta {delta}).")
+            continue
+        try:
+            with transaction.atomic():
+                ToDoCounter.objects.create(
+                    user_id=user_id, group_id=group_id, priority=priority, is_completed=is_completed, count=delta
+                )
+        except IntegrityError:
+            rows.update(count=F('count') + delta)
+
+
+def rebuild_counters():
+    """
+    Odbudowuje wszystkie liczniki od zera na podstawie tabeli zadań.
+    Na PostgreSQL tabela zadań jest blokowana przed zapisem na czas odbudowy.
+    Zwraca liczbę utworzonych wierszy liczników.
+    """
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {ToDo._meta.db_table} IN SHARE MODE')
+
+        ToDoCounter.objects.all().delete()
+
+        rows = (
+            ToDo.objects.filter(Q(group__isnull=False) | Q(user__isnull=False))
+            .values('user_id', 'group_id', 'priority', 'is_completed')
+            .annotate(total=Count('id'))
+        )
+        counts = Counter()
+        for row in rows:
+            if row['group_id']:
+                key = (None, row['group_id'], row['priority'], row['is_completed'])
+            else:
+                key = (row['user_id'], None, row['priority'], row['is_completed'])
+            counts[key] += row['total']
+
+        ToDoCounter.objects.bulk_create([
+            ToDoCounter(user_id=user_id, group_id=group_id, priority=priority, is_completed=is_completed, count=total)
+            for (user_id, group_id, priority, is_completed), total in counts.items()
+        ], batch_size=1000)
+    return len(counts)
+
+
+def summarize_counters(counters):
+    """Zamienia wiersze ToDoCounter jednej listy na słownik sum i histogramu priorytetów."""
+    summary = {'open': 0, 'completed': 0, 'by_priority': {}}
+    for counter in sorted(counters, key=lambda c: c.priority):
+        state = 'completed' if counter.is_completed else 'open'
+        summary[state] += counter.count
+        bucket = summary['by_priority'].setdefault(str(counter.priority), {'open': 0, 'completed': 0})
+        bucket[state] += counter.count
+    return summary
@@ -0,0 +1,96 @@
+"""
+Szybka ścieżka odczytu list zadań (bez ModelSerializer).
+
+ToDoSerializer przy tysiącach wierszy spędza większość czasu na tworzeniu
+instancji modelu i wywołaniach get_attribute/to_representation dla każdego pola.
+ToDoRowSerializer buduje te same słowniki - ta sama kolejność pól, formaty dat,
+null dla zadań bez grupy, zestaw pól z 'fields'/'omit' (todos.fieldsets) -
+wprost z krotek .values_list(). Zgodność bajtowa odpowiedzi z ToDoSerializer
+jest sprawdzana w testach; zmiana pól ToDoSerializer wymaga zmiany tutaj.
+"""
+from operator import itemgetter
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .pagination import ToDoCursorPagination
+from .serializers import ToDoSerializer
+
+
+def datetime_representation():
+    """Funkcja formatująca datę jak serializers.DateTimeField (strefa bieżąca, 'Z' dla UTC)."""
+    output_format = api_settings.DATETIME_FORMAT
+    if not settings.USE_TZ or output_format is None or output_format.lower() != ISO_8601:
+        return serializers.DateTimeField().to_representation
+    current_timezone = timezone.get_current_timezone()
+
+    def represent(value):
+        if not value:
+            return None
+        value = value.astimezone(current_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return represent
+
+
+class ToDoRowSerializer:
+    # Pola ToDoSerializer, których kolumna w .values_list() ma inną nazwę
+    columns = {'group_name': 'group__name'}
+    datetime_fields = frozenset({'created_at', 'updated_at'})
+
+    def __init__(self, fields=None):
+        self.field_names = [name for name in ToDoSerializer.Meta.fields if fields is None or name in fields]
+        self.column_names = [self.columns.get(name, name) for name in self.field_names]
+
+    def rows(self, queryset, extra=()):
+        """Krotki wartości pól (w kolejności field_names), a po nich kolumn 'extra'."""
+        return queryset.values_list(*self.column_names, *extra)
+
+    def to_representation(self, rows):
+        names = self.field_names
+        count = len(names)
+        datetimes = [index for index, name in enumerate(names) if name in self.datetime_fields]
+        if not datetimes:
+            return [dict(zip(names, row[:count])) for row in rows]
+
+        represent = datetime_representation()
+        data = []
+        for row in rows:
+            values = list(row[:count])
+            for index in datetimes:
+                values[index] = represent(values[index])
+            data.append(dict(zip(names, values)))
+        return data
+
+
+class ToDoListFastPath:
+    """
+    Lista zadań z querysetu widoku jako dane odpowiedzi - pełna lista albo strona
+    ToDoCursorPagination, jak w widokach z ToDoSerializer. 'rows' jest querysetem
+    krotek, więc widok synchroniczny i asynchroniczny wykonują je po swojemu.
+
+        fast = ToDoListFastPath(request, todos)
+        data = fast.data(list(fast.rows))  # albo [row async for row in fast.rows]
+    """
+
+    def __init__(self, request, queryset):
+        self.serializer = ToDoRowSerializer(ToDoSerializer.requested_fields_for(request))
+        self.paginator = ToDoCursorPagination()
+        if self.paginator.is_requested(request):
+            queryset = self.paginator.get_page_queryset(queryset, request)
+            # Wartości pól sortowania i id ostatniego wiersza trafiają do kursora
+            self.rows = self.serializer.rows(queryset, extra=self.paginator.position_fields)
+        else:
+            self.paginator = None
+            self.rows = self.serializer.rows(queryset)
+
+    def data(self, rows):
+        if self.paginator is None:
+            return self.serializer.to_representation(rows)
+        position = itemgetter(slice(-len(self.paginator.position_fields), None))
+        page = self.paginator.set_page(rows, position=position)
+        return self.paginator.get_paginated_data(self.serializer.to_representation(page))
@@ -0,0 +1,99 @@
+"""
+Rzadkie zestawy pól (sparse fieldsets) w odczytach zadań i grup.
+
+?fields=title,is_completed zwraca tylko wskazane pola, ?omit=description,members
+wszystkie poza wskazanymi; 'id' jest zwracane zawsze. Parametry działają tylko
+dla GET/HEAD - przy zapisie serializer musi znać wszystkie pola.
+
+Oprócz odpowiedzi zawężana jest lista kolumn w SELECT (only_requested_columns),
+a GroupSerializer.setup_eager_loading pomija prefetche pominiętych pól.
+"""
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+ALWAYS_INCLUDED = frozenset({'id'})
+
+
+def _parse_names(value):
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_fields(request, available):
+    """
+    Zbiór pól wybranych parametrami 'fields'/'omit' spośród 'available' albo None,
+    gdy żądanie ich nie podaje (zwracane są wtedy wszystkie pola).
+    """
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    params = getattr(request, 'query_params', request.GET)
+    fields = _parse_names(params.get(FIELDS_PARAM))
+    omit = _parse_names(params.get(OMIT_PARAM))
+    if fields is None and omit is None:
+        return None
+
+    available = frozenset(available)
+    for param, names in ((FIELDS_PARAM, fields), (OMIT_PARAM, omit)):
+        unknown = (names or set()) - available
+        if unknown:
+            raise ValidationError({param: f"Unknown fields: {', '.join(sorted(unknown))}"})
+
+    selected = set(available) if fields is None else fields
+    return frozenset(selected - (omit or set())) | (ALWAYS_INCLUDED & available)
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer zwracający tylko pola wybrane w żądaniu z kontekstu ('request').
+    Przy many=True DRF tworzy jeden serializer potomny, więc zbiór pól jest
+    wyliczany raz na listę, nie per obiekt.
+
+    'sparse_columns' mapuje pola serializera na kolumny modelu dla .only(), gdy
+    nazwy się różnią; pole spoza bazy (np. liczone z prefetchu) mapuje się na ().
+    """
+    sparse_columns = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requested_fields = requested_fields(self.context.get('request'), self.Meta.fields)
+        if self.requested_fields is not None:
+            for name in set(self.fields) - self.requested_fields:
+                self.fields.pop(name)
+
+    @classmethod
+    def requested_fields_for(cls, request):
+        return requested_fields(request, cls.Meta.fields)
+
+    @classmethod
+    def trim_queryset(cls, queryset, request):
+        """Queryset ograniczony do kolumn pól wybranych w żądaniu (bez zmian, gdy wybrano wszystkie)."""
+        return only_requested_columns(queryset, cls.requested_fields_for(request), cls.sparse_columns)
+
+
+def only_requested_columns(queryset, fields, columns):
+    """
+    Nakłada .only() z kolumnami potrzebnymi do serializacji 'fields' oraz do
+    sortowania (kursor stronicowania czyta wartość pola sortowania ostatniego
+    wiersza). Niepotrzebny select_related jest usuwany razem z JOIN-em.
+    """
+    if fields is None:
+        return queryset
+
+    selected = {'id'}
+    for field in fields:
+        selected.update(columns.get(field, (field,)))
+    model_fields = {field.name for field in queryset.model._meta.concrete_fields}
+    selected.update(
+        name.lstrip('-') for name in queryset.query.order_by
+        if isinstance(name, str) and name.lstrip('-') in model_fields
+    )
+
+    related = {column.split('__')[0] for column in selected if '__' in column}
+    if not isinstance(queryset.query.select_related, dict):
+        # Kolumny relacji można wczytać tylko razem z JOIN-em
+        selected = {column for column in selected if '__' not in column}
+    elif not related:
+        queryset = queryset.select_related(None)
+    return queryset.only(*selected)
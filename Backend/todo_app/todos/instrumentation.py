@@ -0,0 +1,207 @@
+"""
+Opcjonalna instrumentacja żądań (REQUEST_INSTRUMENTATION): liczba zapytań SQL,
+łączny czas bazy, czas widoku i czas serializacji (renderowania) odpowiedzi.
+Wyniki trafiają do nagłówka Server-Timing i do jednej linii logu JSON
+(logger 'todos.instrumentation'); zapytania o tym samym kształcie powtórzone
+więcej niż REQUEST_INSTRUMENTATION_REPEATED_QUERY_THRESHOLD razy są zgłaszane
+jako podejrzenie N+1.
+
+Gdy instrumentacja jest wyłączona, middleware zgłasza MiddlewareNotUsed i Django
+usuwa je z łańcucha, a do połączeń z bazą nie jest dodawany żaden wrapper.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+# Listy parametrów (IN (%s, %s, ...)) i liczby wpisane w SQL (LIMIT 21) nie zmieniają kształtu zapytania
+_PLACEHOLDER_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+_NUMBER = re.compile(r'\b\d+\b')
+
+
+def query_shape(sql):
+    return _NUMBER.sub('?', _PLACEHOLDER_LIST.sub('%s, ...', sql))
+
+
+class RequestMetrics:
+    def __init__(self, keep_statements=False):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        # Treść zapytań jest potrzebna tylko do wykrywania N+1; same metryki liczą zapytania i czas
+        self.statements = Counter() if keep_statements else None
+        self.view_started = None
+        self.view_finished = None
+        self.finished = None
+
+    def record_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        if self.statements is not None:
+            self.statements[sql] += 1
+
+    def keep_statements(self):
+        if self.statements is None:
+            self.statements = Counter()
+
+    def repeated_queries(self, threshold):
+        # Kształty liczone dopiero tutaj, a nie przy każdym zapytaniu
+        shapes = Counter()
+        for sql, count in self.statements.items():
+            shapes[query_shape(sql)] += count
+        return [
+            {'sql': shape, 'count': count}
+            for shape, count in shapes.most_common()
+            if count > threshold
+        ]
+
+    def durations(self):
+        """Czasy w milisekundach; 'serialize' tylko dla odpowiedzi renderowanych po widoku (DRF)."""
+        view_finished = self.view_finished or self.finished
+        durations = {'db': self.db_time, 'total': self.finished - self.started}
+        if self.view_started is not None:
+            durations['view'] = view_finished - self.view_started
+        if self.view_finished is not None:
+            durations['serialize'] = self.finished - self.view_finished
+        return {name: round(value * 1000, 2) for name, value in durations.items()}
+
+
+def record_queries(execute, sql, params, many, context):
+    """Wrapper execute_wrappers każdego połączenia; poza instrumentowanym żądaniem nic nie robi."""
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - started)
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+def enable_query_recording():
+    """Dodaje record_queries do istniejących i przyszłych połączeń (idempotentne)."""
+    # Połączenia są tworzone leniwie w każdym wątku (także w wątku sync_to_async widoków async)
+    connection_created.connect(install_query_recorder, dispatch_uid='todos.instrumentation')
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
+
+
+@contextmanager
+def collect_request_metrics(request, keep_statements=False):
+    """
+    Zbiera metryki żądania w request.instrumentation. Gdy robi to już zewnętrzne
+    middleware (instrumentacja i todos.metrics mogą działać razem), używa jego obiektu.
+    Treść zapytań jest zapamiętywana tylko przy keep_statements.
+    """
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        if keep_statements:
+            metrics.keep_statements()
+        request.instrumentation = metrics
+        yield metrics
+        return
+
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
+    request.instrumentation = metrics = RequestMetrics(keep_statements)
+    token = _current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_metrics.reset(token)
+        metrics.finished = time.perf_counter()
+
+
+def server_timing_header(metrics, durations, repeated):
+    entries = [f'db;dur={durations["db"]};desc="{metrics.queries} queries"']
+    entries += [f'{name};dur={durations[name]}' for name in ('view', 'serialize', 'total') if name in durations]
+    if repeated:
+        entries.append(f'n-plus-one;desc="{len(repeated)} repeated query shapes"')
+    return ', '.join(entries)
+
+
+def parse_server_timing(header):
+    """Odwrotność server_timing_header(): {'db': {'dur': 1.2, 'desc': '3 queries'}, ...}."""
+    metrics = {}
+    for entry in filter(None, (part.strip() for part in (header or '').split(','))):
+        name, *params = (param.strip() for param in entry.split(';'))
+        values = {}
+        for param in params:
+            key, _, value = param.partition('=')
+            value = value.strip('"')
+            values[key] = float(value) if key == 'dur' else value
+        metrics[name] = values
+    return metrics
+
+
+class RequestInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'REQUEST_INSTRUMENTATION_REPEATED_QUERY_THRESHOLD', 5)
+        enable_query_recording()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect_request_metrics(request, keep_statements=True) as metrics:
+            response = self.get_response(request)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        with collect_request_metrics(request, keep_statements=True) as metrics:
+            response = await self.get_response(request)
+        return self.finish(request, response, metrics)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.instrumentation.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Wywoływane po widoku, tuż przed renderowaniem odpowiedzi DRF/szablonu
+        request.instrumentation.view_finished = time.perf_counter()
+        return response
+
+    def finish(self, request, response, metrics):
+        if metrics.finished is None:
+            metrics.finished = time.perf_counter()
+        durations = metrics.durations()
+        repeated = metrics.repeated_queries(self.threshold)
+        response['Server-Timing'] = server_timing_header(metrics, durations, repeated)
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            **{f'{name}_ms': value for name, value in durations.items()},
+        }
+        if repeated:
+            record['repeated_queries'] = repeated
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+        return response
@@ -0,0 +1,99 @@
+import time
+from datetime import timedelta
+
+from axes.helpers import get_cool_off
+from axes.models import AccessAttempt, AccessFailureLog, AccessLog
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Device, Invitation, OutboxEmail, ToDoTombstone
+
+
+def expired_querysets(now=None):
+    """
+    Zwraca listę (etykieta, queryset, pole porządku) wierszy, które można
+    bezpiecznie usunąć. Każdy warunek odpowiada temu, co widoki i tak uznają
+    za nieważne.
+
+    Pole porządku to kolumna indeksu pasującego do warunku, więc partie
+    delete_in_batches() czytają indeks od najstarszych wierszy zamiast
+    przeglądać całą tabelę po PK. 'pk' zostaje tam, gdzie kolumna wygaśnięcia
+    rośnie razem z kluczem (czas wstawienia wiersza: tombstone'y, outbox
+    i logi axes) oraz dla AccessAttempt - jeden wiersz na aktywną parę użytkownik/IP.
+    """
+    now = now or timezone.now()
+    querysets = [
+        ('device', Device.objects.filter(expires_at__lt=now), 'expires_at'),
+        ('invitation', Invitation.objects.filter(expiration_date__lt=now), 'expiration_date'),
+        # Częściowy indeks invitation_used_up_idx; wygasłe liczy już 'invitation'
+        ('invitation_used_up', Invitation.objects.filter(uses__gte=F('max_uses'), expiration_date__gte=now), 'expiration_date'),
+    ]
+
+    retention = getattr(settings, 'TODO_TOMBSTONE_RETENTION', None)
+    if retention:
+        # Kursory synchronizacji starsze niż retencja i tak są odrzucane
+        querysets.append(('todo_tombstone', ToDoTombstone.objects.filter(deleted_at__lt=now - retention), 'pk'))
+
+    outbox_retention = getattr(settings, 'EMAIL_OUTBOX_RETENTION', None)
+    if outbox_retention:
+        # Tylko wiadomości zakończone; oczekujące zostają niezależnie od wieku
+        querysets.append((
+            'outbox_email',
+            OutboxEmail.objects.filter(
+                status__in=[OutboxEmail.STATUS_SENT, OutboxEmail.STATUS_DEAD],
+                created_at__lt=now - outbox_retention,
+            ),
+            'pk',
+        ))
+
+    cool_off = get_cool_off()
+    if cool_off is not None:
+        querysets.append(('axes_access_attempt', AccessAttempt.objects.filter(attempt_time__lt=now - cool_off), 'pk'))
+
+    log_retention = getattr(settings, 'ACCESS_LOG_RETENTION', timedelta(days=90))
+    querysets += [
+        ('axes_access_log', AccessLog.objects.filter(attempt_time__lt=now - log_retention), 'pk'),
+        ('axes_access_failure_log', AccessFailureLog.objects.filter(attempt_time__lt=now - log_retention), 'pk'),
+    ]
+    return querysets
+
+
+def delete_in_batches(queryset, order_field='pk', batch_size=1000, sleep=0.0):
+    """
+    Usuwa wiersze pasujące do queryset partiami w kolejności (order_field, pk).
+
+    Każda partia to osobna krótka transakcja: SELECT co najwyżej batch_size
+    kluczy (od miejsca, w którym skończyła poprzednia partia) i DELETE
+    z ponownie sprawdzonym warunkiem, więc wiersz odświeżony w międzyczasie
+    (np. przedłużona sesja urządzenia) nie zostanie usunięty.
+    """
+    ordering = ('pk',) if order_field == 'pk' else (order_field, 'pk')
+    deleted = 0
+    last = None
+    while True:
+        batch = queryset.order_by(*ordering)
+        if last is not None:
+            batch = batch.filter(keyset_after(ordering, last))
+        rows = list(batch.values_list(*ordering)[:batch_size])
+        if not rows:
+            return deleted
+
+        with transaction.atomic():
+            count, _ = queryset.filter(pk__in=[row[-1] for row in rows]).delete()
+        deleted += count
+        last = rows[-1]
+
+        if len(rows) < batch_size:
+            return deleted
+        if sleep:
+            time.sleep(sleep)
+
+
+def keyset_after(ordering, values):
+    """Warunek (a, b) > (va, vb) dla rosnącego porządku 'ordering'."""
+    condition = Q()
+    for index, field in enumerate(ordering):
+        condition |= Q(**dict(zip(ordering[:index], values)), **{f'{field}__gt': values[index]})
+    return condition
@@ -0,0 +1,117 @@
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+
+from todos.benchmarking import RollbackBenchmark
+from todos.models import CustomUser
+
+
+@contextmanager
+def count_hashes():
+    """Liczy wywołania encode() domyślnego hashera (verify() również przez nie przechodzi)."""
+    hasher_class = type(get_hasher())
+    calls = []
+    original = hasher_class.encode
+
+    def encode(self, *args, **kwargs):
+        calls.append(None)
+        return original(self, *args, **kwargs)
+
+    with mock.patch.object(hasher_class, 'encode', encode):
+        yield calls
+
+
+class Command(BaseCommand):
+    help = (
+        "Mierzy liczbę haszowań haseł na żądanie (logowanie, zmiana hasła) oraz "
+        "przepustowość logowania na rdzeń. Dane testowe są wycofywane po pomiarze."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='Liczba logowań w pomiarze sekwencyjnym.')
+        parser.add_argument('--threads', type=int, default=0, help='Wątki w pomiarze równoległym (domyślnie liczba rdzeni).')
+        parser.add_argument('--json', action='store_true', help='Wypisz wynik jako JSON.')
+
+    def handle(self, *args, **options):
+        host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+        self.client = Client(HTTP_HOST=host, **{'wsgi.url_scheme': 'https'})
+        results = {'cpu_count': os.cpu_count()}
+
+        try:
+            with transaction.atomic():
+                results.update(self.measure_requests(options['requests']))
+                raise RollbackBenchmark
+        except RollbackBenchmark:
+            pass
+
+        results.update(self.measure_parallel(options['requests'], options['threads'] or os.cpu_count() or 1))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for key, value in results.items():
+            self.stdout.write(f"{key}: {value}")
+
+    def measure_requests(self, requests):
+        username = f'bench-{uuid.uuid4().hex[:12]}'
+        password = f'Bench-{uuid.uuid4().hex}-1!'
+        CustomUser.objects.create_user(
+            username=username, email=f'{username}@example.invalid', password=password, is_verified=True,
+        )
+        credentials = {'username': username, 'password': password}
+
+        with count_hashes() as login_hashes:
+            started = time.perf_counter()
+            for _ in range(requests):
+                response = self.client.post('/login/', credentials, content_type='application/json')
+                self.check_response('login', response)
+            elapsed = time.perf_counter() - started
+        access = response.json()['access']
+
+        new_password = f'Bench-{uuid.uuid4().hex}-2!'
+        with count_hashes() as change_hashes:
+            response = self.client.post(
+                '/password/change/',
+                {'old_password': password, 'new_password1': new_password, 'new_password2': new_password},
+                content_type='application/json',
+                HTTP_AUTHORIZATION=f'Bearer {access}',
+            )
+        self.check_response('password change', response)
+
+        return {
+            'login_hashes_per_request': len(login_hashes) / requests,
+            'change_password_hashes_per_request': len(change_hashes),
+            'login_requests_per_second_single_thread': round(requests / elapsed, 2),
+        }
+
+    def check_response(self, name, response):
+        if response.status_code != 200:
+            raise CommandError(f"Benchmark {name} request failed ({response.status_code}): {response.content!r}")
+
+    def measure_parallel(self, requests, threads):
+        encoded = make_password(f'Bench-{uuid.uuid4().hex}-3!')
+        total = requests * threads
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda _: check_password('wrong-password', encoded), range(total)))
+        elapsed = time.perf_counter() - started
+
+        cores = min(threads, os.cpu_count() or 1)
+        hashes_per_second = total / elapsed
+        return {
+            'parallel_threads': threads,
+            'parallel_hashes_per_second': round(hashes_per_second, 2),
+            # Logowanie to dokładnie jedno haszowanie, więc to także logowania/s na rdzeń
+            'logins_per_second_per_core': round(hashes_per_second / cores, 2),
+        }
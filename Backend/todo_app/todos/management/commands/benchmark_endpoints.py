@@ -0,0 +1,390 @@
+import json
+import subprocess
+import time
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+from typing import NamedTuple
+
+import django
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlencode, urlsafe_base64_encode
+
+from todos import urls as todo_urls
+from todos.authentication import ClaimsRefreshToken
+from todos.benchmarking import RollbackBenchmark, run_load, summarize_latencies
+from todos.models import CustomUser, Device, Group, Invitation, ToDo
+
+
+class Scenario(NamedTuple):
+    url_name: str
+    method: str
+    kwargs: dict = {}
+    query: dict = {}
+    data: dict = None
+    variant: str = ''
+    # Zapisy są wykonywane w savepoincie wycofywanym po każdym żądaniu
+    mutates: bool = False
+    as_admin: bool = False
+
+    @property
+    def key(self):
+        return f'{self.url_name}:{self.variant}' if self.variant else self.url_name
+
+    @property
+    def path(self):
+        path = reverse(self.url_name, kwargs=self.kwargs)
+        return f'{path}?{urlencode(self.query)}' if self.query else path
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark wszystkich tras z todos/urls.py na zbiorze z generate_dataset: przepustowość, "
+        "percentyle opóźnień i liczba zapytań SQL na endpoint. Domyślnie w procesie (klient "
+        "testowy Django, wszystkie zmiany są wycofywane); z --base-url tylko trasy tylko do "
+        "odczytu, wysyłane do działającego serwera. Wynik w JSON (--output) do porównań między commitami."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default='bench-0', help='Użytkownik, w imieniu którego wysyłane są żądania.')
+        parser.add_argument('--password', default='Bench-password-1!', help='Jego hasło (logowanie, zmiana hasła).')
+        parser.add_argument('--requests', type=int, default=20, help='Liczba mierzonych żądań na endpoint.')
+        parser.add_argument('--warmup', type=int, default=2, help='Liczba niemierzonych żądań rozgrzewających.')
+        parser.add_argument('--endpoint', action='append', default=[], help='Tylko wskazane scenariusze (nazwa trasy lub nazwa:wariant).')
+        parser.add_argument('--base-url', help='Adres działającego serwera, np. http://127.0.0.1:8000.')
+        parser.add_argument('--concurrency', type=int, default=1, help='Równoległe połączenia (tylko z --base-url).')
+        parser.add_argument('--label', default='', help='Opis przebiegu zapisywany w wyniku.')
+        parser.add_argument('--output', help='Zapisz wynik jako JSON do pliku.')
+        parser.add_argument('--compare', help='Porównaj z wcześniejszym wynikiem JSON.')
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(username=options['user'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist; run generate_dataset first.")
+        self.options = options
+
+        if options['base_url']:
+            results = self.run_against_server(user)
+        else:
+            results = self.run_in_process(user)
+
+        report = {'meta': self.metadata(user), **results}
+        self.print_report(report)
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2))
+            self.stdout.write(f"Saved to {options['output']}")
+        if options['compare']:
+            self.print_comparison(json.loads(Path(options['compare']).read_text()), report)
+
+    def metadata(self, user):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                cwd=settings.BASE_DIR,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'label': self.options['label'],
+            'commit': commit,
+            'timestamp': timezone.now().isoformat(),
+            'mode': 'server' if self.options['base_url'] else 'in-process',
+            'base_url': self.options['base_url'],
+            'concurrency': self.options['concurrency'] if self.options['base_url'] else 1,
+            'database': connection.vendor,
+            'django': django.get_version(),
+            'requests_per_endpoint': self.options['requests'],
+            'user': user.username,
+            'dataset': {
+                'users': CustomUser.objects.count(),
+                'groups': Group.objects.count(),
+                'todos': ToDo.objects.count(),
+                'user_todos': ToDo.objects.filter(user=user, group__isnull=True).count(),
+                'user_groups': user.custom_groups.count(),
+            },
+        }
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"{'endpoint':<32} {'method':<6} {'status':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}"
+        )
+        for key, result in report['endpoints'].items():
+            self.stdout.write(
+                f"{key:<32} {result['method']:<6} {result.get('status') or '-':>6} "
+                f"{format_number(result['requests_per_second']):>9} {format_number(result['latency_ms_p50']):>9} "
+                f"{format_number(result['latency_ms_p95']):>9} {format_number(result['latency_ms_p99']):>9} "
+                f"{format_number(result['queries_mean']):>8}"
+            )
+            if result['errors']:
+                self.stdout.write(self.style.WARNING(f"  {result['errors']} of {result['requests']} requests failed"))
+        for key, reason in report['skipped'].items():
+            self.stdout.write(self.style.WARNING(f"skipped {key}: {reason}"))
+
+    def print_comparison(self, baseline, report):
+        meta = baseline.get('meta', {})
+        self.stdout.write(f"Compared with {meta.get('label') or meta.get('commit') or self.options['compare']}:")
+        self.stdout.write(f"{'endpoint':<32} {'p50 ms':>24} {'p99 ms':>24} {'queries':>18}")
+        for key, result in report['endpoints'].items():
+            before = baseline.get('endpoints', {}).get(key)
+            if before is None:
+                continue
+            self.stdout.write(
+                f"{key:<32} {format_change(before['latency_ms_p50'], result['latency_ms_p50']):>24} "
+                f"{format_change(before['latency_ms_p99'], result['latency_ms_p99']):>24} "
+                f"{format_change(before['queries_mean'], result['queries_mean']):>18}"
+            )
+
+    def selected(self, scenarios):
+        names = set(self.options['endpoint'])
+        if not names:
+            return scenarios
+        return [scenario for scenario in scenarios if scenario.key in names or scenario.url_name in names]
+
+    def run_in_process(self, user):
+        host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+        client = Client(HTTP_HOST=host, **{'wsgi.url_scheme': 'https'})
+        results = {}
+        try:
+            with transaction.atomic():
+                fixtures = self.create_fixtures(user)
+                scenarios = build_scenarios(fixtures, self.options['password'])
+                for scenario in self.selected(scenarios):
+                    token = fixtures['admin_token'] if scenario.as_admin else fixtures['token']
+                    self.stdout.write(f"  {scenario.key} ...", ending='\r')
+                    results[scenario.key] = self.measure_in_process(client, scenario, token)
+                raise RollbackBenchmark
+        except RollbackBenchmark:
+            pass
+        return {'endpoints': results, 'skipped': uncovered_routes(scenarios)}
+
+    def measure_in_process(self, client, scenario, token):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        request = getattr(client, scenario.method.lower())
+        latencies, errors, queries, statuses, sizes = [], [], [], Counter(), []
+
+        for iteration in range(self.options['warmup'] + self.options['requests']):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                with transaction.atomic():
+                    response = request(scenario.path, scenario.data or {}, content_type='application/json', **headers)
+                    # Odpowiedź strumieniowa (eksport) czyta bazę dopiero przy odczycie treści
+                    body = b''.join(response.streaming_content) if response.streaming else response.content
+                    if scenario.mutates:
+                        transaction.set_rollback(True)
+                elapsed = time.perf_counter() - started
+            if iteration < self.options['warmup']:
+                continue
+            latencies.append(elapsed)
+            queries.append(len(captured.captured_queries))
+            statuses[response.status_code] += 1
+            sizes.append(len(body))
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+
+        return {
+            'method': scenario.method,
+            'path': scenario.path,
+            'status': statuses.most_common(1)[0][0] if statuses else None,
+            **summarize_latencies(latencies, errors, sum(latencies), queries),
+            'response_bytes': max(sizes, default=None),
+        }
+
+    def run_against_server(self, user):
+        fixtures = self.read_fixtures(user)
+        scenarios = build_scenarios(fixtures, self.options['password'])
+        headers = {'Authorization': f"Bearer {fixtures['token']}"}
+        results, skipped = {}, {}
+        for scenario in self.selected(scenarios):
+            if scenario.mutates or scenario.as_admin:
+                skipped[scenario.key] = 'writes or needs an admin account; measured in-process only'
+                continue
+            self.stdout.write(f"  {scenario.key} ...", ending='\r')
+            url = self.options['base_url'].rstrip('/') + scenario.path
+            if self.options['warmup']:
+                run_load(url, headers, 1, self.options['warmup'], method=scenario.method)
+            results[scenario.key] = {
+                'method': scenario.method,
+                'path': scenario.path,
+                # Liczby zapytań tylko z nagłówka Server-Timing (REQUEST_INSTRUMENTATION na serwerze)
+                **run_load(url, headers, self.options['concurrency'], self.options['requests'], method=scenario.method),
+            }
+        # Pozostałe trasy wymagają obiektów tworzonych tylko w pomiarze w procesie
+        skipped.update(uncovered_routes(scenarios, reason='needs fixtures created in-process; measured in-process only'))
+        return {'endpoints': results, 'skipped': skipped}
+
+    def read_fixtures(self, user):
+        """Dane potrzebne do żądań, wyszukane w istniejącym zbiorze bez żadnych zapisów."""
+        groups = Group.objects.filter(members=user).annotate(size=Count('members')).order_by('-size')
+        fixtures = {
+            'user': user,
+            'token': str(ClaimsRefreshToken.for_user(user).access_token),
+            'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+            'reset_token': default_token_generator.make_token(user),
+            'todo_id': ToDo.objects.filter(user=user, group__isnull=True).values_list('pk', flat=True).first(),
+            'group_id': groups.values_list('pk', flat=True).first(),
+            'admin_group_id': groups.filter(admins=user).values_list('pk', flat=True).first(),
+            'member_group_id': groups.exclude(admins=user).values_list('pk', flat=True).first(),
+        }
+        fixtures['member_id'] = (
+            CustomUser.objects.filter(custom_groups=fixtures['admin_group_id'])
+            .exclude(administered_groups=fixtures['admin_group_id'])
+            .values_list('pk', flat=True).first()
+        ) if fixtures['admin_group_id'] else None
+
+        return fixtures
+
+    def create_fixtures(self, user):
+        """read_fixtures() oraz obiekty tworzone na potrzeby pomiaru (wycofywane razem z nim)."""
+        fixtures = self.read_fixtures(user)
+
+        device = Device.objects.create(
+            user=user,
+            device_id='benchmark-device',
+            refresh_token=str(ClaimsRefreshToken.for_user(user)),
+            expires_at=timezone.now() + timedelta(days=1),
+            remember_me=True,
+        )
+        fixtures['device'] = device
+
+        admin = CustomUser.objects.create_superuser(
+            username='benchmark-admin', email='benchmark-admin@example.invalid', password=None,
+        )
+        fixtures['admin_token'] = str(ClaimsRefreshToken.for_user(admin).access_token)
+
+        # Grupy, do których użytkownik nie należy: do pierwszej dostaje zaproszenie,
+        # do drugiej zostaje dopisany jako zwykły członek, jeśli żadnej takiej nie ma
+        outside = list(Group.objects.exclude(members=user).annotate(size=Count('members')).order_by('-size')[:2])
+        while len(outside) < 2:
+            group = Group.objects.create(name=f'benchmark-{len(outside)}')
+            group.members.add(admin)
+            group.admins.add(admin)
+            outside.append(group)
+        invitation_group, member_group = outside
+
+        fixtures['invitation_token'] = Invitation.objects.create(
+            group=invitation_group,
+            inviter=invitation_group.admins.first() or admin,
+            expiration_date=timezone.now() + timedelta(days=1),
+            max_uses=1_000_000,
+        ).token
+        if fixtures['member_group_id'] is None:
+            member_group.members.add(user)
+            fixtures['member_group_id'] = member_group.pk
+        return fixtures
+
+
+def build_scenarios(fixtures, password):
+    """
+    Scenariusze pomiaru: co najmniej jeden dla każdej trasy z todos/urls.py
+    (uncovered_routes() wypisuje trasy bez scenariusza). Scenariusze wymagające
+    brakującego elementu fixtures są pomijane.
+    """
+    user = fixtures['user']
+    device = fixtures.get('device')
+    uid_token = {'uidb64': fixtures['uidb64'], 'token': fixtures['reset_token']}
+    new_password = f'{password}-changed'
+
+    scenarios = [
+        Scenario('userinfo', 'GET'),
+        Scenario('todo-list-create', 'GET'),
+        Scenario('todo-list-create', 'GET', query={'page_size': 50}, variant='page'),
+        Scenario('todo-list-create', 'GET', query={'page_size': 50, 'search': 'invoice'}, variant='search'),
+        Scenario('todo-list-create', 'GET', query={'page_size': 50, 'fields': 'title,is_completed'}, variant='sparse'),
+        Scenario('todo-list-create', 'POST', data={'title': 'Benchmark', 'priority': 2}, variant='create', mutates=True),
+        Scenario('todos-by-user', 'GET'),
+        Scenario('todos-by-user', 'GET', query={'page_size': 50}, variant='page'),
+        Scenario('todos-by-group', 'GET'),
+        Scenario('todos-by-group', 'GET', query={'page_size': 50}, variant='page'),
+        Scenario('todos-sync', 'GET'),
+        Scenario('todos-summary', 'GET'),
+        Scenario('todos-export', 'GET'),
+        Scenario('todos-export', 'GET', query={'format': 'csv'}, variant='csv'),
+        Scenario('bootstrap', 'GET'),
+        Scenario('bootstrap', 'GET', query={'personal_todos_page_size': 50, 'group_todos_page_size': 50}, variant='page'),
+        Scenario('group-list', 'GET'),
+        Scenario('group-list', 'GET', query={'fields': 'name,color'}, variant='sparse'),
+        Scenario('admin-group-list', 'GET', as_admin=True),
+        Scenario('metrics', 'GET', as_admin=True),
+        Scenario('group-create', 'POST', data={'name': 'Benchmark'}, mutates=True),
+        Scenario('verify-email', 'GET', kwargs=uid_token, mutates=True),
+        Scenario('password-reset', 'POST', data={'email': user.email}, mutates=True),
+        Scenario('password-reset-confirm', 'GET', kwargs=uid_token),
+        Scenario(
+            'password-reset-confirm', 'POST', kwargs=uid_token, variant='post', mutates=True,
+            data={'new_password': new_password, 're_new_password': new_password},
+        ),
+        Scenario('password_reset_form_page', 'GET', kwargs=uid_token),
+        Scenario(
+            'register', 'POST', mutates=True,
+            data={'username': 'benchmark-register', 'email': 'benchmark-register@example.invalid', 'password': new_password},
+        ),
+        Scenario('login', 'POST', data={'username': user.username, 'password': password}, mutates=True),
+        Scenario(
+            'auth-password-change', 'POST', mutates=True,
+            data={'old_password': password, 'new_password1': new_password, 'new_password2': new_password},
+        ),
+    ]
+
+    if device is not None:
+        token_data = {'device_id': device.device_id, 'refresh_token': device.refresh_token}
+        scenarios += [
+            Scenario('token_refresh', 'POST', data=token_data, mutates=True),
+            Scenario('token_logout', 'POST', data=token_data, mutates=True),
+        ]
+    if fixtures.get('invitation_token'):
+        scenarios.append(Scenario('invitation-accept', 'POST', kwargs={'token': fixtures['invitation_token']}, mutates=True))
+
+    todo_id = fixtures['todo_id']
+    if todo_id:
+        scenarios += [
+            Scenario('todo-detail', 'GET', kwargs={'pk': todo_id}),
+            Scenario('todo-detail', 'PATCH', kwargs={'pk': todo_id}, data={'is_completed': True}, variant='update', mutates=True),
+            Scenario('todos-batch', 'POST', mutates=True, data={'operations': [
+                *({'op': 'create', 'data': {'title': f'Benchmark {i}'}} for i in range(5)),
+                {'op': 'update', 'id': todo_id, 'data': {'priority': 1}},
+                {'op': 'complete', 'id': todo_id},
+            ]}),
+        ]
+    if fixtures['group_id']:
+        scenarios.append(Scenario('group-detail', 'GET', kwargs={'pk': fixtures['group_id']}))
+    if fixtures['admin_group_id']:
+        scenarios.append(Scenario('invitation-create', 'POST', data={'group_id': fixtures['admin_group_id']}, mutates=True))
+    if fixtures['admin_group_id'] and fixtures['member_id']:
+        membership = {'group_id': fixtures['admin_group_id'], 'user_id': fixtures['member_id']}
+        scenarios += [
+            Scenario('group-manage-member', 'DELETE', kwargs=membership, mutates=True),
+            Scenario('group-manage-admin', 'POST', kwargs=membership, mutates=True),
+        ]
+    if fixtures['member_group_id']:
+        scenarios.append(Scenario('group-leave', 'DELETE', kwargs={'group_id': fixtures['member_group_id']}, mutates=True))
+    return scenarios
+
+
+def format_number(value):
+    return '-' if value is None else f'{value:g}'
+
+
+def format_change(before, after):
+    if before is None or after is None:
+        return f'{format_number(before)} -> {format_number(after)}'
+    change = f' ({(after - before) / before:+.0%})' if before else ''
+    return f'{before:g} -> {after:g}{change}'
+
+
+def uncovered_routes(scenarios, reason='no scenario (missing fixture or not defined in build_scenarios)'):
+    covered = {scenario.url_name for scenario in scenarios}
+    return {
+        pattern.name: reason
+        for pattern in todo_urls.urlpatterns
+        if pattern.name not in covered
+    }
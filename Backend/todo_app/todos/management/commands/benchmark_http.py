@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from todos.authentication import ClaimsRefreshToken
+from todos.benchmarking import run_load
+from todos.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Generator obciążenia: wysyła równoległe żądania GET (keep-alive) do działającego "
+        "serwera i raportuje przepustowość oraz percentyle opóźnień. Służy do porównania "
+        "wdrożenia WSGI (gunicorn) z ASGI (uvicorn), patrz Backend/README.md."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Pełny adres, np. http://127.0.0.1:8000/todos/')
+        parser.add_argument('--user', help='Nazwa użytkownika, dla którego zostanie wystawiony token JWT.')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=1000, help='Łączna liczba żądań.')
+        parser.add_argument('--json', action='store_true', help='Wypisz wynik jako JSON.')
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['user']:
+            try:
+                user = CustomUser.objects.get(username=options['user'])
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"User {options['user']!r} does not exist.")
+            headers['Authorization'] = f'Bearer {ClaimsRefreshToken.for_user(user).access_token}'
+
+        results = run_load(options['url'], headers, options['concurrency'], options['requests'])
+        results.update(url=options['url'], concurrency=options['concurrency'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for key, value in results.items():
+            self.stdout.write(f"{key}: {value}")
+
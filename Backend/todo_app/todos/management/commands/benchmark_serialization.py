@@ -0,0 +1,144 @@
+import json
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import RequestFactory, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from todos.fastpath import ToDoListFastPath
+from todos.models import CustomUser, ToDo
+from todos.pagination import ToDoCursorPagination
+from todos.renderers import FastJSONRenderer, orjson
+from todos.serializers import ToDoSerializer
+from todos.views import get_filtered_todos
+
+CURSOR = re.compile(rb'cursor=[^&"]+')
+
+
+class Command(BaseCommand):
+    help = (
+        "Mierzy przepustowość (wiersze/s) zamiany listy zadań użytkownika na bajty odpowiedzi: "
+        "ToDoSerializer lub szybka ścieżka .values_list() (todos.fastpath), renderowane przez "
+        "JSONRenderer DRF lub FastJSONRenderer. Czas obejmuje zapytanie do bazy. "
+        "Sprawdza też, że wszystkie warianty dają identyczne bajty."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='Użytkownik (domyślnie ten z największą liczbą zadań osobistych).')
+        parser.add_argument('--rows', type=int, default=0, help='Rozmiar strony (bez limitu TODO_MAX_PAGE_SIZE); 0 = cała lista.')
+        parser.add_argument('--repeat', type=int, default=5, help='Liczba pomiarów; wynik to najlepszy z nich.')
+        parser.add_argument('--fields', default='', help="Opcjonalny zestaw pól, jak parametr 'fields'.")
+        parser.add_argument('--json', action='store_true', help='Wypisz wynik jako JSON.')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['username'])
+        query = {}
+        if options['rows']:
+            query['page_size'] = options['rows']
+        if options['fields']:
+            query['fields'] = options['fields']
+        self.factory_request = RequestFactory().get('/todos/', query)
+        self.user = user
+
+        with override_settings(TODO_MAX_PAGE_SIZE=max(options['rows'], 1)):
+            summary = self.measure(user, max(1, options['repeat']))
+
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        rows = summary['rows']
+        self.stdout.write(f"user {user.username}, {rows} rows, orjson: {summary['orjson']}")
+        self.stdout.write(f"{'variant':24} {'rows/s':>10} {'ms':>9} {'bytes':>10}")
+        for name, result in summary['variants'].items():
+            self.stdout.write(
+                f"{name:24} {result['rows_per_second']:>10} {result['seconds'] * 1000:>9.1f} {result['bytes']:>10}"
+            )
+        fetch = summary['fetch_only']
+        self.stdout.write(f"{'fetch only (no JSON)':24} {fetch['rows_per_second']:>10} {fetch['seconds'] * 1000:>9.1f}")
+        self.stdout.write(self.style.SUCCESS(f"Identical output; fast path speedup: {summary['speedup']}x"))
+
+    def best_time(self, repeat, function):
+        best, result = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = function()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def measure(self, user, repeat):
+        variants = {
+            'serializer+drf_json': (self.serialize, JSONRenderer()),
+            'serializer+fast_json': (self.serialize, FastJSONRenderer()),
+            'fastpath+drf_json': (self.fastpath, JSONRenderer()),
+            'fastpath+fast_json': (self.fastpath, FastJSONRenderer()),
+        }
+        results, outputs = {}, {}
+        for name, (build, renderer) in variants.items():
+            best, content = self.best_time(repeat, lambda: renderer.render(build()))
+            outputs[name] = content
+            results[name] = {'seconds': round(best, 4), 'bytes': len(content)}
+
+        # Kursor w linku 'next' jest podpisany ze znacznikiem czasu, więc różni się między pomiarami
+        if len({CURSOR.sub(b'cursor=', content) for content in outputs.values()}) != 1:
+            raise CommandError("Variants produced different output: " + ', '.join(
+                f"{name}={len(content)}B" for name, content in outputs.items()
+            ))
+
+        # Dolna granica: samo zapytanie i pobranie krotek, bez budowania słowników i JSON-a
+        fetch_seconds, _ = self.best_time(repeat, self.fetch)
+        fetch_only = {'seconds': round(fetch_seconds, 4)}
+
+        rows = self.row_count
+        for result in [*results.values(), fetch_only]:
+            result['rows_per_second'] = round(rows / result['seconds']) if result['seconds'] else None
+        baseline = results['serializer+drf_json']['seconds']
+        return {
+            'username': user.username,
+            'rows': rows,
+            'orjson': orjson is not None,
+            'speedup': round(baseline / results['fastpath+fast_json']['seconds'], 2),
+            'variants': results,
+            'fetch_only': fetch_only,
+        }
+
+    def get_user(self, username):
+        if username:
+            try:
+                return CustomUser.objects.get(username=username)
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"User {username!r} does not exist.")
+        top = (
+            ToDo.objects.filter(user__isnull=False).values('user_id')
+            .annotate(count=Count('id')).order_by('-count').first()
+        )
+        if top is None:
+            raise CommandError("No todos to serialize; run generate_dataset first.")
+        return CustomUser.objects.get(pk=top['user_id'])
+
+    def request(self):
+        request = Request(self.factory_request)
+        request.user = self.user
+        return request
+
+    def serialize(self):
+        """Dotychczasowa ścieżka widoków listy: instancje modelu i ToDoSerializer."""
+        request = self.request()
+        todos = get_filtered_todos(request)
+        paginator = ToDoCursorPagination()
+        page = paginator.paginate_queryset(todos, request)
+        data = ToDoSerializer(todos if page is None else page, many=True, context={'request': request}).data
+        self.row_count = len(data)
+        return data if page is None else paginator.get_paginated_data(data)
+
+    def fastpath(self):
+        request = self.request()
+        fast = ToDoListFastPath(request, get_filtered_todos(request))
+        return fast.data(list(fast.rows))
+
+    def fetch(self):
+        request = self.request()
+        return list(ToDoListFastPath(request, get_filtered_todos(request)).rows)
@@ -0,0 +1,173 @@
+import itertools
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from todos.counters import rebuild_counters
+from todos.models import CustomUser, Group, ToDo
+from todos.signals import batch_todo_deletes
+
+WORDS = (
+    'buy', 'call', 'fix', 'review', 'plan', 'write', 'send', 'clean', 'book', 'pay', 'order', 'prepare',
+    'milk', 'report', 'invoice', 'meeting', 'garden', 'car', 'tickets', 'dentist', 'groceries', 'slides',
+    'budget', 'birthday', 'laundry', 'kitchen', 'flight', 'hotel', 'insurance', 'taxes', 'homework', 'bike',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generuje syntetyczny zbiór danych do benchmarków (patrz benchmark_endpoints): użytkowników, "
+        "grupy o skośnym rozkładzie członkostwa i zadania, wstawiane przez bulk_create. "
+        "Rozkłady są zipfowskie: niewielu użytkowników i grup ma większość zadań i członkostw. "
+        "Dla tego samego --seed zbiór jest powtarzalny."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--todos', type=int, default=100_000, help='Łączna liczba zadań.')
+        parser.add_argument('--group-share', type=float, default=0.3, help='Udział zadań grupowych (0-1).')
+        parser.add_argument('--max-group-size', type=int, default=200, help='Liczba członków największej grupy.')
+        parser.add_argument('--skew', type=float, default=1.1, help='Wykładnik rozkładu Zipfa (0 = równomierny).')
+        parser.add_argument('--prefix', default='bench', help='Prefiks nazw użytkowników i grup.')
+        parser.add_argument('--password', default='Bench-password-1!', help='Hasło wszystkich użytkowników.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--clear', action='store_true', help='Najpierw usuń dane z poprzedniego uruchomienia (ten sam prefiks).')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError("--users must be at least 1.")
+        if not 0 <= options['group_share'] <= 1:
+            raise CommandError("--group-share must be between 0 and 1.")
+        if options['groups'] < 1:
+            options['group_share'] = 0
+
+        self.prefix = options['prefix']
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['seed'])
+        self.skew = options['skew']
+
+        if options['clear']:
+            self.clear()
+        elif CustomUser.objects.filter(username__startswith=f'{self.prefix}-').exists():
+            raise CommandError(f"Dataset {self.prefix!r} already exists; use --clear or another --prefix.")
+
+        started = time.perf_counter()
+        user_ids = self.create_users(options['users'], options['password'])
+        group_ids = self.create_groups(options['groups'], user_ids, options['max_group_size'])
+        todo_count = self.create_todos(options['todos'], user_ids, group_ids, options['group_share'])
+
+        # bulk_create pomija sygnały post_save, więc liczniki odbudowujemy na końcu
+        counters = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(user_ids)} users, {len(group_ids)} groups, {todo_count} todos "
+            f"and {counters} counter rows in {time.perf_counter() - started:.1f}s. "
+            f"Heaviest user: {self.prefix}-0."
+        ))
+
+    def weights(self, count):
+        """Skumulowane wagi Zipfa: element o randze r ma wagę 1 / (r + 1) ** skew."""
+        return list(itertools.accumulate(1 / (rank + 1) ** self.skew for rank in range(count)))
+
+    def clear(self):
+        users = CustomUser.objects.filter(username__startswith=f'{self.prefix}-')
+        groups = Group.objects.filter(name__startswith=f'{self.prefix}-')
+        todos = ToDo.objects.filter(Q(user__in=users) | Q(group__in=groups))
+        # Partiami, jak ToDoBatchView: tombstone'y, liczniki i data_version zbiorczo na partię
+        while pks := list(todos.values_list('pk', flat=True)[:self.batch_size]):
+            with batch_todo_deletes():
+                ToDo.objects.filter(pk__in=pks).delete()
+        groups.delete()
+        users.delete()
+
+    def create_users(self, count, password):
+        # Jedno haszowanie dla wszystkich kont zamiast jednego na użytkownika
+        encoded_password = make_password(password)
+        users = (
+            CustomUser(
+                username=f'{self.prefix}-{i}',
+                email=f'{self.prefix}-{i}@example.invalid',
+                password=encoded_password,
+                is_verified=True,
+            )
+            for i in range(count)
+        )
+        self.bulk_create(CustomUser, users)
+        # Nie wszystkie bazy zwracają klucze z bulk_create, więc odczytujemy je w kolejności rang
+        ids = dict(
+            CustomUser.objects.filter(username__startswith=f'{self.prefix}-').values_list('username', 'id')
+        )
+        return [ids[f'{self.prefix}-{i}'] for i in range(count)]
+
+    def create_groups(self, count, user_ids, max_group_size):
+        if count < 1:
+            return []
+        self.bulk_create(Group, (Group(name=f'{self.prefix}-group-{i}') for i in range(count)))
+        ids = dict(Group.objects.filter(name__startswith=f'{self.prefix}-group-').values_list('name', 'id'))
+        group_ids = [ids[f'{self.prefix}-group-{i}'] for i in range(count)]
+
+        user_weights = self.weights(len(user_ids))
+        memberships, admins = [], []
+        for rank, group_id in enumerate(group_ids):
+            # Rozmiar grupy maleje z rangą; członkowie są losowani z wagami, więc
+            # "ciężcy" użytkownicy należą do wielu grup
+            size = min(len(user_ids), max(2, int(max_group_size / (rank + 1) ** self.skew)))
+            members = set()
+            for _ in range(4):
+                if len(members) >= size:
+                    break
+                members.update(self.random.choices(user_ids, cum_weights=user_weights, k=size - len(members)))
+            # Ogon rozkładu jest losowany bardzo rzadko; resztę dopełniamy równomiernie
+            while len(members) < size:
+                members.add(self.random.choice(user_ids))
+            members = sorted(members)
+            memberships.extend(
+                Group.members.through(group_id=group_id, customuser_id=user_id) for user_id in members
+            )
+            admins.extend(
+                Group.admins.through(group_id=group_id, customuser_id=user_id)
+                for user_id in members[:1 + (size >= 10)]
+            )
+        self.bulk_create(Group.members.through, memberships)
+        self.bulk_create(Group.admins.through, admins)
+        return group_ids
+
+    def create_todos(self, count, user_ids, group_ids, group_share):
+        user_weights = self.weights(len(user_ids))
+        group_weights = self.weights(len(group_ids)) if group_ids else None
+        roll, randint, sample = self.random.random, self.random.randint, self.random.sample
+
+        def todos():
+            for _ in range(count):
+                if group_ids and roll() < group_share:
+                    owner = {'group_id': self.random.choices(group_ids, cum_weights=group_weights)[0]}
+                else:
+                    owner = {'user_id': self.random.choices(user_ids, cum_weights=user_weights)[0]}
+                yield ToDo(
+                    title=' '.join(sample(WORDS, randint(2, 4))).capitalize(),
+                    description=' '.join(sample(WORDS, randint(4, 12))) if roll() < 0.4 else '',
+                    priority=randint(1, 3),
+                    is_completed=roll() < 0.35,
+                    **owner,
+                )
+
+        return self.bulk_create(ToDo, todos(), progress=True)
+
+    def bulk_create(self, model, objects, progress=False):
+        """Wstawia obiekty partiami po batch_size, każdą partię w osobnej transakcji."""
+        total = 0
+        objects = iter(objects)
+        while batch := list(itertools.islice(objects, self.batch_size)):
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            total += len(batch)
+            if progress:
+                self.stdout.write(f"  {model._meta.model_name}: {total}", ending='\r')
+        if progress:
+            self.stdout.write('')
+        return total
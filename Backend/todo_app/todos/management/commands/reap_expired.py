@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from todos.maintenance import delete_in_batches, expired_querysets
+
+
+class Command(BaseCommand):
+    help = (
+        "Usuwa wygasłe urządzenia (sesje), nieważne zaproszenia, stare tombstones, "
+        "wysłane lub porzucone wiadomości z outboxa oraz przeterminowane wpisy django-axes, partiami w krótkich transakcjach."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0.0, help='Przerwa (s) między partiami, aby odciążyć bazę.')
+        parser.add_argument('--dry-run', action='store_true', help='Tylko policz wiersze do usunięcia.')
+
+    def handle(self, *args, **options):
+        total = 0
+        for label, queryset, order_field in expired_querysets():
+            if options['dry_run']:
+                count = queryset.count()
+            else:
+                count = delete_in_batches(
+                    queryset, order_field, batch_size=options['batch_size'], sleep=options['sleep'],
+                )
+            total += count
+            self.stdout.write(f"{label}: {count}")
+
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {total} rows."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from todos.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Odbudowuje liczniki zadań (ToDoCounter) od zera, naprawiając ewentualne rozjazdy."
+
+    def handle(self, *args, **options):
+        total = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} counter rows."))
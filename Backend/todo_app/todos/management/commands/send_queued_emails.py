@@ -0,0 +1,31 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from todos.outbox import deliver_queued_emails
+
+
+class Command(BaseCommand):
+    help = "Wysyła wiadomości ze skrzynki nadawczej (OutboxEmail) partiami, przez jedno połączenie SMTP na partię."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--once', action='store_true', help='Opróżnij kolejkę i zakończ zamiast działać w pętli.')
+        parser.add_argument('--sleep', type=float, default=5.0, help='Przerwa (s) gdy kolejka jest pusta.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        connection = get_connection(fail_silently=False)
+
+        while True:
+            stats = deliver_queued_emails(batch_size=batch_size, connection=connection)
+            if any(stats.values()):
+                self.stdout.write(f"sent={stats['sent']} retry={stats['retry']} dead={stats['dead']}")
+
+            # Pełna partia bez żadnej wysłanej wiadomości oznacza zwykle awarię SMTP -
+            # wtedy też czekamy, zamiast od razu pobierać kolejne wiadomości
+            if sum(stats.values()) < batch_size or not stats['sent']:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
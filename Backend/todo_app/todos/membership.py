@@ -0,0 +1,61 @@
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Group
+
+
+class GroupRoster(NamedTuple):
+    member_ids: frozenset
+    admin_ids: frozenset
+
+    def is_member(self, user_id):
+        return user_id in self.member_ids
+
+    def is_admin(self, user_id):
+        return user_id in self.admin_ids
+
+
+def load_group_roster(group_id):
+    member_ids = Group.members.through.objects.filter(group_id=group_id).values_list('customuser_id', flat=True)
+    admin_ids = Group.admins.through.objects.filter(group_id=group_id).values_list('customuser_id', flat=True)
+    return GroupRoster(frozenset(member_ids), frozenset(admin_ids))
+
+
+def roster_cache_key(group_id, user):
+    # The requesting user's data_version is bumped by the m2m_changed receiver
+    # whenever members or admins of any group they belong to change (or they are
+    # added/removed themselves), so older entries simply stop being read. This
+    # keeps the cache correct across gunicorn workers even with a per-process cache.
+    # It only holds for groups the user is in, see get_group_roster().
+    return f'group-roster:{group_id}:{user.id}:{user.data_version}'
+
+
+def get_group_roster(request, group_id):
+    """
+    Zwraca członków i administratorów grupy (GroupRoster). Wynik jest
+    zapamiętywany na czas żądania (klasy uprawnień i widok dzielą jedno
+    odczytanie) oraz w cache Django pomiędzy żądaniami - tylko dla członków
+    i administratorów grupy. Zmiany w grupie nie podbijają 'data_version'
+    superużytkowników ani osób spoza niej, więc dla nich roster jest zawsze
+    czytany z bazy.
+    """
+    group_id = int(group_id)
+    memo = request.__dict__.setdefault('_group_rosters', {})
+    if group_id in memo:
+        return memo[group_id]
+
+    user = request.user
+    timeout = getattr(settings, 'GROUP_ROSTER_CACHE_TIMEOUT', 300)
+    key = roster_cache_key(group_id, user) if user.is_authenticated else None
+
+    roster = cache.get(key) if key else None
+    if roster is None:
+        roster = load_group_roster(group_id)
+        if key and (roster.is_member(user.id) or roster.is_admin(user.id)):
+            cache.set(key, roster, timeout)
+
+    memo[group_id] = roster
+    return roster
+
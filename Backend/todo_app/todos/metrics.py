@@ -0,0 +1,168 @@
+"""
+Metryki aplikacji w formacie Prometheusa, udostępniane pod /metrics/ (tylko dla staffu).
+
+Przy kilku workerach gunicorna każdy proces ma własną pamięć, więc liczniki są
+zapisywane do plików w katalogu PROMETHEUS_MULTIPROC_DIR (tryb multiprocess
+prometheus_client) i sumowane przy odczycie. Katalog ustawia i czyści
+gunicorn.conf.py; bez tej zmiennej metryki są zbierane tylko w bieżącym procesie.
+
+Głębokość kolejki e-maili nie jest licznikiem procesu: jest odczytywana z bazy
+przy każdym odczycie metryk.
+"""
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.models import Min
+from django.utils import timezone
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from prometheus_client.core import REGISTRY, GaugeMetricFamily
+
+from .instrumentation import collect_request_metrics, enable_query_recording
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+REQUEST_LATENCY = Histogram(
+    'todo_app_http_request_duration_seconds',
+    'Request latency per URL name of todos/urls.py.',
+    ['view', 'method'],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    'todo_app_http_requests',
+    'Requests per URL name, method and status class.',
+    ['view', 'method', 'status'],
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    'todo_app_db_queries_per_request',
+    'SQL queries per request.',
+    ['view'],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_TIME = Histogram(
+    'todo_app_db_duration_seconds',
+    'Total SQL time per request.',
+    ['view'],
+    buckets=LATENCY_BUCKETS,
+)
+LOGIN_ATTEMPTS = Counter(
+    'todo_app_login_attempts',
+    'Login attempts by outcome (success, invalid_credentials, locked_out, superuser_blocked).',
+    ['outcome'],
+)
+TOKEN_REFRESHES = Counter(
+    'todo_app_token_refreshes',
+    'Token refreshes by outcome (success, missing_fields, invalid, expired, conflict, error).',
+    ['outcome'],
+)
+
+# Trasy spoza todos/urls.py (admin, swagger, 404) są sumowane pod jedną etykietą
+OTHER_VIEW = 'other'
+
+
+def record_login(outcome):
+    LOGIN_ATTEMPTS.labels(outcome=outcome).inc()
+
+
+def record_token_refresh(outcome):
+    TOKEN_REFRESHES.labels(outcome=outcome).inc()
+
+
+class EmailOutboxCollector:
+    """Głębokość skrzynki nadawczej (todos.outbox), liczona z bazy w chwili odczytu."""
+
+    def describe(self):
+        return [
+            GaugeMetricFamily('todo_app_email_outbox_pending', 'Pending outbox emails.'),
+            GaugeMetricFamily('todo_app_email_outbox_due', 'Pending outbox emails due for sending.'),
+            GaugeMetricFamily('todo_app_email_outbox_oldest_due_age_seconds', 'Age of the oldest due outbox email.'),
+        ]
+
+    def collect(self):
+        from .models import OutboxEmail
+
+        now = timezone.now()
+        # Oba zapytania korzystają z częściowego indeksu outbox_pending_due_idx
+        pending = OutboxEmail.objects.filter(status=OutboxEmail.STATUS_PENDING)
+        due = pending.filter(next_attempt_at__lte=now)
+        oldest = due.aggregate(oldest=Min('next_attempt_at'))['oldest']
+
+        pending_gauge, due_gauge, age_gauge = self.describe()
+        pending_gauge.add_metric([], pending.count())
+        due_gauge.add_metric([], due.count())
+        age_gauge.add_metric([], (now - oldest).total_seconds() if oldest else 0)
+        return [pending_gauge, due_gauge, age_gauge]
+
+
+class _ProcessMetrics:
+    """Metryki z domyślnego rejestru procesu (tryb bez PROMETHEUS_MULTIPROC_DIR)."""
+
+    def collect(self):
+        return REGISTRY.collect()
+
+
+def scrape_registry():
+    """Rejestr do odczytu: suma plików wszystkich workerów albo rejestr bieżącego procesu."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = CollectorRegistry()
+        registry.register(_ProcessMetrics())
+    registry.register(EmailOutboxCollector())
+    return registry
+
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+def render_metrics():
+    return generate_latest(scrape_registry())
+
+
+class MetricsMiddleware:
+    """
+    Rejestruje opóźnienie, status oraz liczbę i czas zapytań SQL każdego żądania
+    pod nazwą trasy z todos/urls.py (bez treści zapytań). Włączane ustawieniem
+    METRICS_ENABLED; wyłączone usuwa się z łańcucha i nie owija połączeń z bazą.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        from . import urls
+
+        self.get_response = get_response
+        self.view_names = frozenset(pattern.name for pattern in urls.urlpatterns)
+        enable_query_recording()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect_request_metrics(request) as metrics:
+            response = self.get_response(request)
+        self.observe(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        with collect_request_metrics(request) as metrics:
+            response = await self.get_response(request)
+        self.observe(request, response, metrics)
+        return response
+
+    def observe(self, request, response, metrics):
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name in self.view_names else OTHER_VIEW
+        method = request.method if request.method in ('GET', 'POST', 'PUT', 'PATCH', 'DELETE') else 'other'
+
+        REQUEST_LATENCY.labels(view, method).observe(time.perf_counter() - metrics.started)
+        REQUESTS.labels(view, method, f'{response.status_code // 100}xx').inc()
+        DB_QUERIES_PER_REQUEST.labels(view).observe(metrics.queries)
+        DB_TIME.labels(view).observe(metrics.db_time)
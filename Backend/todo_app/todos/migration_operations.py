@@ -0,0 +1,63 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import NotSupportedError
+from django.db.migrations.operations import AddConstraint, AddIndex
+
+
+class AddIndexConcurrentlyIfPostgres(AddIndexConcurrently):
+    """
+    Na PostgreSQL tworzy indeks przez CREATE INDEX CONCURRENTLY, aby migracja
+    nie blokowała zapisów do tabel produkcyjnych. Na innych bazach (np. SQLite
+    w testach) działa jak zwykłe AddIndex. Migracja musi mieć atomic = False.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        return AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        return AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class AddPostgresOnlyIndexConcurrently(AddIndexConcurrently):
+    """
+    Indeks specyficzny dla PostgreSQL (np. GIN na tsvector), tworzony przez
+    CREATE INDEX CONCURRENTLY. Na innych bazach operacja nic nie robi.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class AddUniqueConstraintConcurrentlyIfPostgres(AddConstraint):
+    """
+    Unikalne ograniczenie (UniqueConstraint na polach, bez warunku) dodawane bez
+    blokowania zapisów na czas budowy indeksu: na PostgreSQL najpierw
+    CREATE UNIQUE INDEX CONCURRENTLY, potem ADD CONSTRAINT ... UNIQUE USING INDEX,
+    które tylko przejmuje gotowy indeks. Na innych bazach działa jak zwykłe
+    AddConstraint. Migracja musi mieć atomic = False.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        if schema_editor.connection.in_atomic_block:
+            raise NotSupportedError(
+                f'The {self.__class__.__name__} operation cannot be executed inside a transaction (set atomic = False on the migration).'
+            )
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        quote = schema_editor.quote_name
+        table = quote(model._meta.db_table)
+        name = quote(self.constraint.name)
+        columns = ', '.join(quote(model._meta.get_field(field).column) for field in self.constraint.fields)
+        schema_editor.execute(f'CREATE UNIQUE INDEX CONCURRENTLY {name} ON {table} ({columns})')
+        schema_editor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}')
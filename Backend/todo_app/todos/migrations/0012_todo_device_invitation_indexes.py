@@ -0,0 +1,32 @@
+# Generated by Django 4.2.20 on 2026-10-18 19:17
+
+from django.db import migrations, models
+
+from todos.migration_operations import AddIndexConcurrentlyIfPostgres
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('todos', '0011_alter_group_name'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfPostgres(
+            model_name='device',
+            index=models.Index(fields=['user', 'device_id'], name='device_user_device_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='invitation',
+            index=models.Index(fields=['expiration_date'], name='invitation_expiration_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='todo',
+            index=models.Index(condition=models.Q(('group__isnull', True)), fields=['user', 'created_at'], name='todo_user_created_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='todo',
+            index=models.Index(condition=models.Q(('user__isnull', True)), fields=['group', 'created_at'], name='todo_group_created_idx'),
+        ),
+    ]
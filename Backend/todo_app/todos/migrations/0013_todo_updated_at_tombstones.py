@@ -0,0 +1,48 @@
+# Generated by Django 4.2.20 on 2026-10-18 19:18
+
+from django.db import migrations, models
+import django.utils.timezone
+
+from todos.migration_operations import AddIndexConcurrentlyIfPostgres
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('todos', '0012_todo_device_invitation_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ToDoTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('todo_id', models.BigIntegerField()),
+                ('user_id', models.BigIntegerField(blank=True, null=True)),
+                ('group_id', models.BigIntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='todo',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='todo',
+            index=models.Index(condition=models.Q(('group__isnull', True)), fields=['user', 'updated_at'], name='todo_user_updated_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='todo',
+            index=models.Index(condition=models.Q(('user__isnull', True)), fields=['group', 'updated_at'], name='todo_group_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todotombstone',
+            index=models.Index(fields=['user_id', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todotombstone',
+            index=models.Index(fields=['group_id', 'deleted_at'], name='tombstone_group_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0013_todo_updated_at_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0, help_text='Bumped on every change to the todos, groups or memberships visible to the user (used for ETags).'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.20 on 2026-10-18 19:24
+
+from itertools import chain
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_counters(apps, schema_editor):
+    # Kopia todos.counters.rebuild_counters z chwili tej migracji (bez importu kodu aplikacji)
+    ToDo = apps.get_model('todos', 'ToDo')
+    ToDoCounter = apps.get_model('todos', 'ToDoCounter')
+    group_rows = (
+        ToDo.objects.filter(group__isnull=False).order_by()
+        .values('group_id', 'priority', 'is_completed').annotate(count=models.Count('id'))
+    )
+    user_rows = (
+        ToDo.objects.filter(group__isnull=True, user__isnull=False).order_by()
+        .values('user_id', 'priority', 'is_completed').annotate(count=models.Count('id'))
+    )
+    ToDoCounter.objects.bulk_create([ToDoCounter(**row) for row in chain(group_rows, user_rows)], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0015_outboxemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ToDoCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('priority', models.IntegerField()),
+                ('is_completed', models.BooleanField()),
+                ('count', models.IntegerField(default=0)),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='todo_counters', to='todos.group')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='todo_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='todocounter',
+            constraint=models.UniqueConstraint(condition=models.Q(('group__isnull', True)), fields=('user', 'priority', 'is_completed'), name='todocounter_user_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='todocounter',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('group', 'priority', 'is_completed'), name='todocounter_group_unique'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.20 on 2026-10-18 19:25
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+from todos.migration_operations import AddPostgresOnlyIndexConcurrently
+
+CREATE_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION todos_todo_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS todos_todo_search_vector_trigger ON todos_todo;
+CREATE TRIGGER todos_todo_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description ON todos_todo
+    FOR EACH ROW EXECUTE FUNCTION todos_todo_search_vector_update();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS todos_todo_search_vector_trigger ON todos_todo;
+DROP FUNCTION IF EXISTS todos_todo_search_vector_update();
+"""
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def create_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(CREATE_TRIGGER_SQL)
+
+
+def drop_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_TRIGGER_SQL)
+
+
+def backfill_search_vector(apps, schema_editor):
+    """Fills search_vector for existing rows in short id-range batches (the trigger computes it)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT coalesce(max(id), 0) FROM todos_todo')
+        max_id = cursor.fetchone()[0]
+        for start in range(0, max_id + 1, BACKFILL_BATCH_SIZE):
+            cursor.execute(
+                'UPDATE todos_todo SET title = title WHERE id >= %s AND id < %s AND search_vector IS NULL',
+                [start, start + BACKFILL_BATCH_SIZE],
+            )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('todos', '0016_todocounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todo',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_trigger, drop_trigger),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+        AddPostgresOnlyIndexConcurrently(
+            model_name='todo',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='todo_search_vector_idx'),
+        ),
+    ]
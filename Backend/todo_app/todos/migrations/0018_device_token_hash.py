@@ -0,0 +1,48 @@
+# Generated by Django 4.2.20 on 2026-10-18 19:27
+
+import hashlib
+
+from django.db import migrations, models
+
+from todos.migration_operations import AddUniqueConstraintConcurrentlyIfPostgres
+
+
+BATCH_SIZE = 5000
+
+
+def backfill_token_hash(apps, schema_editor):
+    Device = apps.get_model('todos', 'Device')
+    last_pk = 0
+    while True:
+        batch = list(
+            Device.objects.filter(pk__gt=last_pk, token_hash__isnull=True)
+            .order_by('pk')
+            .only('pk', 'refresh_token')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for device in batch:
+            device.token_hash = hashlib.sha256(device.refresh_token.encode()).hexdigest()
+        Device.objects.bulk_update(batch, ['token_hash'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('todos', '0017_todo_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='token_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_token_hash, migrations.RunPython.noop),
+        AddUniqueConstraintConcurrentlyIfPostgres(
+            model_name='device',
+            constraint=models.UniqueConstraint(fields=('token_hash',), name='device_token_hash_uniq'),
+        ),
+    ]
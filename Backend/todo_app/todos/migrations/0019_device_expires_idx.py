@@ -0,0 +1,20 @@
+# Generated by Django 4.2.20 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+from todos.migration_operations import AddIndexConcurrentlyIfPostgres
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('todos', '0018_device_token_hash'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfPostgres(
+            model_name='device',
+            index=models.Index(fields=['expires_at'], name='device_expires_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0019_device_expires_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, help_text='Stamp embedded in access tokens; bumped on password, activity, permission or claim changes to revoke them.'),
+        ),
+    ]
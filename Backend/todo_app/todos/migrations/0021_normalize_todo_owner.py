@@ -0,0 +1,49 @@
+# Generated by Django 4.2.20 on 2026-10-19 09:12
+
+from itertools import chain
+
+from django.db import migrations
+from django.db.models import Count, F
+from django.utils import timezone
+
+
+def normalize_todo_owner(apps, schema_editor):
+    """
+    Zadania z ustawionym jednocześnie 'user' i 'group' (mógł je utworzyć PATCH
+    z 'group_id' przed dodaniem ToDoDetailView.perform_update) były widoczne
+    tylko dla właściciela - członkowie grupy ich nie widzieli. Czyszczenie 'group'
+    zachowuje tę widoczność po zawężeniu personal_todos_filter do group IS NULL.
+    """
+    ToDo = apps.get_model('todos', 'ToDo')
+    CustomUser = apps.get_model('todos', 'CustomUser')
+    ToDoCounter = apps.get_model('todos', 'ToDoCounter')
+
+    mixed = ToDo.objects.filter(user__isnull=False, group__isnull=False)
+    user_ids = set(mixed.values_list('user_id', flat=True))
+    if not user_ids:
+        return
+    # updated_at: zmiana 'group_id' trafia do synchronizacji przyrostowej (todos/sync/)
+    mixed.update(group=None, updated_at=timezone.now())
+    CustomUser.objects.filter(id__in=user_ids).update(data_version=F('data_version') + 1)
+    # Liczniki wliczały te zadania do grup; odbudowa jak w 0016 (bez importu kodu aplikacji)
+    ToDoCounter.objects.all().delete()
+    group_rows = (
+        ToDo.objects.filter(group__isnull=False).order_by()
+        .values('group_id', 'priority', 'is_completed').annotate(count=Count('id'))
+    )
+    user_rows = (
+        ToDo.objects.filter(group__isnull=True, user__isnull=False).order_by()
+        .values('user_id', 'priority', 'is_completed').annotate(count=Count('id'))
+    )
+    ToDoCounter.objects.bulk_create([ToDoCounter(**row) for row in chain(group_rows, user_rows)], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0020_customuser_token_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_todo_owner, migrations.RunPython.noop),
+    ]
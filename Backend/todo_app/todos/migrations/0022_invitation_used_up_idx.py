@@ -0,0 +1,20 @@
+# Generated by Django 4.2.20 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+from todos.migration_operations import AddIndexConcurrentlyIfPostgres
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('todos', '0021_normalize_todo_owner'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfPostgres(
+            model_name='invitation',
+            index=models.Index(condition=models.Q(('uses__gte', models.F('max_uses'))), fields=['expiration_date'], name='invitation_used_up_idx'),
+        ),
+    ]
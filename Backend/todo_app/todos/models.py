@@ -1,8 +1,11 @@
 # todos/models.py
+import hashlib
 import random
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 import uuid
 
@@ -13,9 +16,63 @@ class CustomUser(AbstractUser):
             default=False,
             help_text='Designates whether the user has verified their email address.'
         )
+    data_version = models.PositiveBigIntegerField(
+            default=0,
+            help_text='Bumped on every change to the todos, groups or memberships visible to the user (used for ETags).'
+        )
+    token_version = models.PositiveIntegerField(
+            default=0,
+            help_text='Stamp embedded in access tokens; bumped on password, activity, permission or claim changes to revoke them.'
+        )
     USERNAME_FIELD = 'username'  
     REQUIRED_FIELDS = ['email']  
 
+    # Pola kopiowane do claimów tokena (lub wpływające na uprawnienia) - ich zmiana unieważnia tokeny
+    TOKEN_STAMPED_FIELDS = ('username', 'is_verified', 'is_active', 'is_staff', 'is_superuser')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if set(cls.TOKEN_STAMPED_FIELDS) <= set(field_names):
+            instance._loaded_token_state = instance.token_state()
+        return instance
+
+    def token_state(self):
+        return tuple(getattr(self, field) for field in self.TOKEN_STAMPED_FIELDS)
+
+    # Liczniki podbijane wyłącznie przez UPDATE ... SET x = x + 1; zapis wczytanej
+    # (być może nieaktualnej) wartości cofnąłby równoległe podbicia
+    COUNTER_FIELDS = ('data_version', 'token_version')
+
+    def save(self, *args, **kwargs):
+        if self._state.adding or kwargs.get('force_insert'):
+            super().save(*args, **kwargs)
+            self._loaded_token_state = self.token_state()
+            return
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred
+            ]
+        update_fields = set(update_fields) - set(self.COUNTER_FIELDS)
+
+        # set_password() zostawia surowe hasło w _password do czasu zapisu
+        password_changed = self._password is not None
+        loaded_state = getattr(self, '_loaded_token_state', None)
+        token_changed = password_changed or (loaded_state is not None and loaded_state != self.token_state())
+        if token_changed:
+            self.token_version = models.F('token_version') + 1
+            update_fields.add('token_version')
+        kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+        if token_changed:
+            self.refresh_from_db(fields=['token_version'])
+        if not set(self.TOKEN_STAMPED_FIELDS) & self.get_deferred_fields():
+            self._loaded_token_state = self.token_state()
+
     def __str__(self):
         return f"{self.username} ({self.email})"
 
@@ -35,6 +92,12 @@ class Group(models.Model):
         return self.name
 
 
+class ToDoManager(models.Manager):
+    def get_queryset(self):
+        # search_vector is only used in WHERE/ORDER BY of searches; never load it.
+        return super().get_queryset().defer('search_vector')
+
+
 class ToDo(models.Model):
     
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='todos', null=True, blank=True)
@@ -45,6 +108,59 @@ class ToDo(models.Model):
     priority = models.IntegerField(default=2)
     is_completed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by a database trigger on PostgreSQL (migration 0017), NULL elsewhere.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ToDoManager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='todo_search_vector_idx'),
+            models.Index(
+                fields=['user', 'created_at'],
+                name='todo_user_created_idx',
+                condition=models.Q(group__isnull=True),
+            ),
+            models.Index(
+                fields=['group', 'created_at'],
+                name='todo_group_created_idx',
+                condition=models.Q(user__isnull=True),
+            ),
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='todo_user_updated_idx',
+                condition=models.Q(group__isnull=True),
+            ),
+            models.Index(
+                fields=['group', 'updated_at'],
+                name='todo_group_updated_idx',
+                condition=models.Q(user__isnull=True),
+            ),
+        ]
+
+    COUNTER_FIELDS = ('user_id', 'group_id', 'priority', 'is_completed')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if set(cls.COUNTER_FIELDS) <= set(field_names):
+            instance._loaded_counter_key = instance.counter_key()
+        return instance
+
+    def counter_key(self):
+        """Klucz wiersza ToDoCounter, do którego wliczane jest zadanie (None dla zadania bez właściciela)."""
+        if self.group_id:
+            return (None, self.group_id, self.priority, self.is_completed)
+        if self.user_id:
+            return (self.user_id, None, self.priority, self.is_completed)
+        return None
+
+    def save(self, *args, **kwargs):
+        # Counters, tombstones and data versions are maintained by post_save
+        # receivers; run them in the same transaction as the write itself.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.title} ({self.priority})"
@@ -55,7 +171,59 @@ class ToDo(models.Model):
             raise ValidationError('Zadanie musi być przypisane do użytkownika lub grupy.')
         if self.user and self.group:
             raise ValidationError('Zadanie nie może być przypisane zarówno do użytkownika, jak i do grupy.')
-        
+
+
+class ToDoCounter(models.Model):
+    """
+    Licznik zadań listy osobistej (user) albo grupy (group) dla pary
+    (priority, is_completed). Utrzymywany przyrostowo przy każdym zapisie
+    zadania; 'manage.py rebuild_todo_counters' odbudowuje go od zera.
+    """
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='todo_counters', null=True, blank=True)
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='todo_counters', null=True, blank=True)
+    priority = models.IntegerField()
+    is_completed = models.BooleanField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'priority', 'is_completed'],
+                condition=models.Q(group__isnull=True),
+                name='todocounter_user_unique',
+            ),
+            models.UniqueConstraint(
+                fields=['group', 'priority', 'is_completed'],
+                condition=models.Q(user__isnull=True),
+                name='todocounter_group_unique',
+            ),
+        ]
+
+    def __str__(self):
+        owner = f"group {self.group_id}" if self.group_id else f"user {self.user_id}"
+        return f"{owner}: priority {self.priority}, completed={self.is_completed}: {self.count}"
+
+
+class ToDoTombstone(models.Model):
+    """
+    Ślad po usuniętym zadaniu (lub zadaniu przeniesionym poza dotychczasową listę),
+    używany przez synchronizację przyrostową. Przechowuje gołe identyfikatory
+    zamiast kluczy obcych, bo ma przetrwać usunięcie zadania, a nawet grupy.
+    """
+    todo_id = models.BigIntegerField()
+    user_id = models.BigIntegerField(null=True, blank=True)
+    group_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_id', 'deleted_at'], name='tombstone_user_deleted_idx'),
+            models.Index(fields=['group_id', 'deleted_at'], name='tombstone_group_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"Tombstone of todo {self.todo_id}"
+
 
 
 class Invitation(models.Model):
@@ -66,17 +234,52 @@ class Invitation(models.Model):
     max_uses = models.PositiveIntegerField(default=1)  
     uses = models.PositiveIntegerField(default=0)  
 
+    TOKEN_ATTEMPTS = 10
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expiration_date'], name='invitation_expiration_idx'),
+            # Wykorzystane zaproszenia usuwane przez reap_expired
+            models.Index(
+                fields=['expiration_date'],
+                name='invitation_used_up_idx',
+                condition=models.Q(uses__gte=models.F('max_uses')),
+            ),
+        ]
+
     def _generate_short_token(self):
         return ''.join(random.choices('0123456789', k=6))
 
     def save(self, *args, **kwargs):
-        if not self.token: 
-            while True:
-                potential_token = self._generate_short_token()
-                if not Invitation.objects.filter(token=potential_token).exists():
-                    self.token = potential_token
-                    break
-        super().save(*args, **kwargs) 
+        if self.token:
+            return super().save(*args, **kwargs)
+
+        # Zamiast sprawdzać zajętość kodu zapytaniem, wstawiamy wiersz i przy kolizji
+        # na unikalnym indeksie losujemy ponownie (savepoint chroni zewnętrzną transakcję).
+        # Nazwa ograniczenia w błędzie zależy od bazy, więc kolizję potwierdzamy
+        # zapytaniem dopiero po błędzie; każdy inny IntegrityError leci dalej od razu.
+        for attempt in range(self.TOKEN_ATTEMPTS):
+            self.token = self._generate_short_token()
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                token_taken = Invitation.objects.filter(token=self.token).exists()
+                self.token = ''
+                if not token_taken or attempt == self.TOKEN_ATTEMPTS - 1:
+                    raise
+
+    def claim_use(self):
+        """
+        Atomowo zużywa jedno użycie zaproszenia pojedynczym warunkowym UPDATE.
+        Zwraca False, gdy zaproszenie wygasło lub limit użyć został już osiągnięty.
+        """
+        claimed = Invitation.objects.filter(
+            pk=self.pk,
+            uses__lt=models.F('max_uses'),
+            expiration_date__gt=timezone.now(),
+        ).update(uses=models.F('uses') + 1)
+        return bool(claimed)
 
     def is_valid(self):
         """Sprawdza, czy zaproszenie jest ważne (nie wygasło i nie zostało przekroczona liczba użyć)."""
@@ -85,10 +288,72 @@ class Invitation(models.Model):
     def __str__(self):
         return f"Invitation to {self.group.name} by {self.inviter.username}"
     
+class OutboxEmail(models.Model):
+    """
+    Wiadomość e-mail oczekująca na wysłanie. Widoki zapisują ją w transakcji
+    żądania, a komenda 'send_queued_emails' wysyła je partiami.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_DEAD, 'Dead'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True, null=True)
+    recipients = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at'],
+                name='outbox_pending_due_idx',
+                condition=models.Q(status='pending'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
+
+
 class Device(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     device_id = models.CharField(max_length=255)  
     refresh_token = models.CharField(max_length=500)  
+    # SHA-256 aktualnego refresh tokena; po nim (unikalny indeks) szukamy urządzenia
+    token_hash = models.CharField(max_length=64, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()         
-    remember_me = models.BooleanField(default=False)
\ No newline at end of file
+    remember_me = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'device_id'], name='device_user_device_idx'),
+            models.Index(fields=['expires_at'], name='device_expires_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['token_hash'], name='device_token_hash_uniq'),
+        ]
+
+    @staticmethod
+    def hash_token(token):
+        """Skrót o stałej długości używany zamiast porównywania pełnego tokena."""
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def save(self, *args, **kwargs):
+        if self.refresh_token:
+            self.token_hash = self.hash_token(self.refresh_token)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'refresh_token' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'token_hash'}
+        super().save(*args, **kwargs)
\ No newline at end of file
@@ -0,0 +1,116 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+def queue_email(subject, message, from_email, recipient_list):
+    """
+    Zapisuje wiadomość w skrzynce nadawczej zamiast wysyłać ją w trakcie żądania.
+    Wywołana wewnątrz transakcji, zostanie wysłana tylko jeśli transakcja się powiedzie.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email,
+        recipients=list(recipient_list),
+    )
+
+
+def retry_delay(attempts):
+    """Wykładniczy backoff: base, 2*base, 4*base, ... ograniczony przez EMAIL_OUTBOX_MAX_BACKOFF."""
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_BACKOFF', timedelta(minutes=1))
+    ceiling = getattr(settings, 'EMAIL_OUTBOX_MAX_BACKOFF', timedelta(hours=6))
+    return min(base * (2 ** max(attempts - 1, 0)), ceiling)
+
+
+def claim_queued_emails(batch_size):
+    """
+    Rezerwuje partię zaległych wiadomości i od razu zatwierdza transakcję.
+    Wiersze są wybierane przez SELECT ... FOR UPDATE SKIP LOCKED, a rezerwacją
+    jest przesunięcie next_attempt_at o EMAIL_OUTBOX_CLAIM_TIMEOUT: inne workery
+    ich nie pobiorą, a po awarii workera wiadomości wrócą do kolejki same.
+    """
+    lease = getattr(settings, 'EMAIL_OUTBOX_CLAIM_TIMEOUT', timedelta(minutes=10))
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if batch:
+            OutboxEmail.objects.filter(id__in=[email.id for email in batch]).update(next_attempt_at=now + lease)
+    return batch
+
+
+def deliver_queued_emails(batch_size=50, connection=None):
+    """
+    Wysyła jedną partię zaległych wiadomości przez jedno połączenie SMTP.
+    Wysyłka odbywa się poza transakcją (claim_queued_emails), a wynik każdej
+    wiadomości jest zapisywany zaraz po próbie wysłania, więc przerwanie workera
+    w połowie partii nie wyśle ponownie wiadomości już dostarczonych. Zwraca
+    słownik z liczbą wysłanych, ponawianych i porzuconych (dead) wiadomości.
+    """
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    stats = {'sent': 0, 'retry': 0, 'dead': 0}
+
+    batch = claim_queued_emails(batch_size)
+    if not batch:
+        return stats
+
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        logger.error(f"Nie udało się otworzyć połączenia SMTP: {e}")
+        for email in batch:
+            _mark_failed(email, e, max_attempts, stats)
+        return stats
+
+    try:
+        for email in batch:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=email.recipients,
+                connection=connection,
+            )
+            try:
+                message.send(fail_silently=False)
+            except Exception as e:
+                logger.warning(f"Nie udało się wysłać wiadomości {email.id} (próba {email.attempts + 1}): {e}")
+                _mark_failed(email, e, max_attempts, stats)
+                continue
+
+            email.status = OutboxEmail.STATUS_SENT
+            email.attempts += 1
+            email.sent_at = timezone.now()
+            email.last_error = ''
+            email.save(update_fields=['status', 'attempts', 'sent_at', 'last_error'])
+            stats['sent'] += 1
+    finally:
+        connection.close()
+
+    return stats
+
+
+def _mark_failed(email, error, max_attempts, stats):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = OutboxEmail.STATUS_DEAD
+        stats['dead'] += 1
+        logger.error(f"Wiadomość {email.id} przeniesiona do dead letter po {email.attempts} próbach: {error}")
+    else:
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+        stats['retry'] += 1
+    email.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error'])
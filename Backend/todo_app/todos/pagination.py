@@ -0,0 +1,181 @@
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class ToDoCursorPagination(BasePagination):
+    """
+    Stronicowanie typu keyset (kursorowe) dla list zadań.
+
+    Kursor jest nieprzezroczystym, podpisanym tokenem zawierającym aktywne
+    sortowanie oraz wartości pól sortowania i 'id' ostatniego zwróconego
+    wiersza. Kolejna strona jest wybierana warunkiem WHERE (pole, id) > (v, id),
+    więc głębokie strony kosztują tyle samo co pierwsza (bez OFFSET). Sortowanie
+    może mieć kilka pól (np. wyszukiwanie: trafność, potem data utworzenia).
+
+    Stronicowanie włącza się, gdy klient poda 'cursor' lub 'page_size';
+    bez tych parametrów widoki zwracają pełną listę jak dotychczas.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    default_ordering = '-created_at'
+    # 'search_rank' is the relevance annotation added by todos.search.search_todos
+    ordering_fields = ('title', 'priority', 'created_at', 'is_completed', 'search_rank')
+    signing_salt = 'todos.pagination.cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.page_size = getattr(settings, 'TODO_PAGE_SIZE', 50)
+        self.max_page_size = getattr(settings, 'TODO_MAX_PAGE_SIZE', 200)
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            page_size = int(value)
+        except ValueError:
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """Początkowe pola sortowania querysetu, które mogą trafić do kursora (krotka)."""
+        ordering = []
+        for term in queryset.query.order_by:
+            if not isinstance(term, str) or term.lstrip('-') not in self.ordering_fields:
+                break
+            ordering.append(term)
+        return tuple(ordering) or (self.default_ordering,)
+
+    @property
+    def position_fields(self):
+        """Pola wiersza zapisywane w kursorze: pola sortowania, a na końcu 'id'."""
+        return [*(term.lstrip('-') for term in self.ordering), 'id']
+
+    def encode_cursor(self, ordering, position):
+        *values, pk = position
+        values = [value.isoformat() if field.lstrip('-') == 'created_at' else value for field, value in zip(ordering, values)]
+        return signing.dumps({'o': ','.join(ordering), 'v': values, 'id': pk}, salt=self.signing_salt, compress=True)
+
+    def instance_position(self, instance):
+        return tuple(getattr(instance, field) for field in self.position_fields)
+
+    def decode_cursor(self, request, ordering):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = signing.loads(encoded, salt=self.signing_salt)
+            values, pk = payload['v'], int(payload['id'])
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or payload.get('o') != ','.join(ordering) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        for index, field in enumerate(ordering):
+            if field.lstrip('-') == 'created_at':
+                values[index] = parse_datetime(values[index]) if isinstance(values[index], str) else None
+                if values[index] is None:
+                    raise NotFound(self.invalid_cursor_message)
+        return (*values, pk)
+
+    def get_page_queryset(self, queryset, request):
+        """Zapytanie o bieżącą stronę (z jednym wierszem nadmiarowym do wykrycia następnej)."""
+        self.request = request
+        self.current_page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        # 'id' rozstrzyga remisy w kierunku ostatniego pola sortowania
+        keys = [*self.ordering, '-id' if self.ordering[-1].startswith('-') else 'id']
+        queryset = queryset.order_by(*keys)
+
+        position = self.decode_cursor(request, self.ordering)
+        if position is not None:
+            # (a, b, id) > (va, vb, pk) z kierunkiem każdego pola osobno
+            condition = Q()
+            for index, key in enumerate(keys):
+                field = key.lstrip('-')
+                lookup = 'lt' if key.startswith('-') else 'gt'
+                equal = {previous.lstrip('-'): value for previous, value in zip(keys[:index], position)}
+                condition |= Q(**equal, **{f'{field}__{lookup}': position[index]})
+            try:
+                queryset = queryset.filter(condition)
+            except (TypeError, ValueError, ValidationError):
+                # Podpisany kursor z wartością niepasującą do typu pola
+                raise NotFound(self.invalid_cursor_message)
+
+        return queryset[:self.current_page_size + 1]
+
+    def set_page(self, results, position=None):
+        """
+        Zapamiętuje bieżącą stronę i kursor następnej. 'position' zwraca wartości
+        position_fields wiersza - domyślnie z atrybutów instancji modelu.
+        """
+        position = position or self.instance_position
+        self.has_next = len(results) > self.current_page_size
+        self.page = results[:self.current_page_size]
+        self.next_cursor = self.encode_cursor(self.ordering, position(self.page[-1])) if self.has_next else None
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class SectionCursorPagination(ToDoCursorPagination):
+    """
+    Stronicowanie jednej sekcji zadań w odpowiedzi złożonej (BootstrapView).
+
+    Parametry sekcji mają prefiks (np. 'personal_todos_page_size',
+    'personal_todos_cursor'), a link 'next' zawęża odpowiedź do tej jednej sekcji
+    (parametr 'sections'), więc kolejne strony nie pobierają ponownie pozostałych.
+    """
+    sections_query_param = 'sections'
+
+    def __init__(self, section):
+        super().__init__()
+        self.section = section
+        self.cursor_query_param = f'{section}_cursor'
+        self.page_size_query_param = f'{section}_page_size'
+
+    def get_next_link(self):
+        url = super().get_next_link()
+        if url is None:
+            return None
+        return replace_query_param(url, self.sections_query_param, self.section)
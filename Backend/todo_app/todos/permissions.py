@@ -1,5 +1,6 @@
 from rest_framework import permissions
 from .models import Group, ToDo 
+from .membership import get_group_roster
 
 class IsGroupAdminOrMemberReadOnly(permissions.BasePermission):
     """
@@ -18,8 +19,9 @@ class IsGroupAdminOrMemberReadOnly(permissions.BasePermission):
            
             if request.user.is_superuser: 
                 return True
-            is_admin = obj.admins.filter(id=request.user.id).exists()
-            is_member = obj.members.filter(id=request.user.id).exists()
+            roster = get_group_roster(request, obj.id)
+            is_admin = roster.is_admin(request.user.id)
+            is_member = roster.is_member(request.user.id)
 
             
             if request.method in permissions.SAFE_METHODS:
@@ -51,7 +53,7 @@ class IsTaskOwnerOrGroupMember(permissions.BasePermission):
         if obj.user:  
             return obj.user == request.user
         elif obj.group:  
-            return obj.group.members.filter(id=request.user.id).exists()
+            return get_group_roster(request, obj.group_id).is_member(request.user.id)
         
         return False
     
@@ -72,8 +74,4 @@ class IsGroupAdmin(permissions.BasePermission):
         group_id = view.kwargs.get('group_id')
         if not group_id:
             return False 
-        try:
-            group = Group.objects.get(id=group_id)
-            return group.admins.filter(id=request.user.id).exists()
-        except Group.DoesNotExist:
-            return False 
\ No newline at end of file
+        return get_group_roster(request, group_id).is_admin(request.user.id)
\ No newline at end of file
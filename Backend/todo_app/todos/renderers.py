@@ -0,0 +1,104 @@
+"""
+Renderer JSON dla DRF (REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES']): orjson, gdy jest
+zainstalowany, w przeciwnym razie json z biblioteki standardowej (JSONRenderer).
+
+Przy domyślnych ustawieniach DRF (COMPACT_JSON, UNICODE_JSON) orjson daje te same
+bajty co JSONRenderer: zwarte separatory, UTF-8 bez escapowania, te same sekwencje
+ucieczki. Różnice są wyrównywane tutaj - U+2028/U+2029 są escapowane jak w DRF,
+a daty i typy spoza JSON przechodzą przez encoder DRF (encoders.JSONEncoder.default).
+Wcięcia (?format=json; indent=...), inne ustawienia DRF i dane, których orjson nie
+obsługuje (np. liczby całkowite powyżej 64 bitów), renderuje JSONRenderer.
+
+Wyjątek: liczby zmiennoprzecinkowe orjson zapisuje po swojemu (np. 1e16 zamiast
+1e+16, NaN jako null); odpowiedzi API zadań i grup ich nie zawierają.
+
+NDJSONRenderer i CSVRenderer służą eksportowi zadań (todos.export): oprócz render()
+mają render_header() i render_rows(), z których eksport składa strumień paczka po paczce.
+"""
+import csv
+import io
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except TypeError:
+            # orjson.JSONEncodeError; JSONRenderer albo wyrenderuje dane, albo zgłosi ten sam błąd co dotąd
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Jeden obiekt JSON na linię (application/x-ndjson)."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return self.render_rows(data if isinstance(data, list) else [data])
+
+    def render_header(self, field_names):
+        return b''
+
+    def render_rows(self, rows, field_names=None):
+        json_renderer = FastJSONRenderer()
+        return b''.join(json_renderer.render(row) + b'\n' for row in rows)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    CSV z nagłówkiem (text/csv). Wartości jak w JSON: null jako pusta komórka,
+    wartości logiczne jako true/false. Tekst zaczynający się od znaku, który
+    arkusz kalkulacyjny potraktowałby jako formułę, dostaje prefiks "'".
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+    formula_prefixes = ('=', '+', '-', '@', '\t', '\r')
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not data:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        field_names = list(rows[0])
+        return self.render_header(field_names) + self.render_rows(rows, field_names)
+
+    def render_header(self, field_names):
+        return self.write([field_names])
+
+    def render_rows(self, rows, field_names=None):
+        return self.write([self.cell(row[name]) for name in field_names] for row in rows)
+
+    def write(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode(self.charset)
+
+    @classmethod
+    def cell(cls, value):
+        if value is None:
+            return ''
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if isinstance(value, str) and value.startswith(cls.formula_prefixes):
+            return "'" + value
+        return value
@@ -0,0 +1,47 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast
+
+SEARCH_CONFIG = 'simple'
+SEARCH_ORDERING = ('-search_rank', '-created_at', '-id')
+
+
+def search_todos(queryset, query, order_by_rank=True):
+    """
+    Zawęża queryset zadań do pasujących do frazy 'query'.
+
+    Na PostgreSQL używa kolumny search_vector (indeks GIN) i sortuje wyniki
+    po trafności (ts_rank; tytuł ma wyższą wagę niż opis). Na innych bazach
+    (np. SQLite w testach) każde słowo musi wystąpić w tytule lub opisie
+    (icontains), a trafność to odsetek słów występujących w tytule. Przy równej
+    trafności nowsze zadania są pierwsze - w tej samej kolejności co strony
+    ToDoCursorPagination.
+
+    Trafność jest typu double precision: ts_rank zwraca real, a kursor porównuje
+    zapisaną wartość (float Pythona) z adnotacją, więc oba typy muszą być równe.
+    """
+    query = (query or '').strip()
+    if not query:
+        return queryset
+
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        queryset = queryset.filter(search_vector=search_query)
+        if order_by_rank:
+            rank = Cast(SearchRank(F('search_vector'), search_query), FloatField())
+            queryset = queryset.annotate(search_rank=rank).order_by(*SEARCH_ORDERING)
+        return queryset
+
+    terms = query.split()
+    for term in terms:
+        queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+    if order_by_rank:
+        title_matches = sum(
+            Case(When(title__icontains=term, then=Value(1.0)), default=Value(0.0), output_field=FloatField())
+            for term in terms
+        )
+        queryset = queryset.annotate(
+            search_rank=Cast(title_matches / Value(float(len(terms))), FloatField())
+        ).order_by(*SEARCH_ORDERING)
+    return queryset
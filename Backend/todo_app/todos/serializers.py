@@ -1,15 +1,38 @@
 from rest_framework import serializers, exceptions as drf_exceptions
 from rest_framework.validators import UniqueValidator
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from .models import ToDo, Group
+from .counters import summarize_counters
+from .fieldsets import SparseFieldsetMixin, only_requested_columns
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError as DjangoValidationError 
+from django.db.models import Exists, OuterRef, Prefetch
 User = get_user_model()  
 
 from django.core.exceptions import ValidationError as DjangoValidationError
 
-class ToDoSerializer(serializers.ModelSerializer):
-    group_id = serializers.PrimaryKeyRelatedField(
+class GroupMembershipRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Pole 'group_id', które przy pobieraniu grupy od razu dołącza informację,
+    czy użytkownik z żądania jest jej członkiem (atrybut 'requester_is_member').
+    Walidacja grupy i sprawdzenie członkostwa kosztują jedno zapytanie.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is not None and request.user.is_authenticated:
+            membership = Group.members.through.objects.filter(
+                group_id=OuterRef('pk'),
+                customuser_id=request.user.id,
+            )
+            queryset = queryset.annotate(requester_is_member=Exists(membership))
+        return queryset
+
+
+class ToDoSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    group_id = GroupMembershipRelatedField(
         source='group',  
         queryset=Group.objects.all(), 
         allow_null=True,  
@@ -18,6 +41,8 @@ class ToDoSerializer(serializers.ModelSerializer):
 
     group_name = serializers.CharField(source='group.name', read_only=True, allow_null=True)
 
+    sparse_columns = {'group_id': ('group',), 'group_name': ('group', 'group__name')}
+
     class Meta:
         model = ToDo
         fields = [
@@ -29,8 +54,42 @@ class ToDoSerializer(serializers.ModelSerializer):
             'group_id',
             'group_name',               
             'created_at',
+            'updated_at',
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+class ToDoBatchDataSerializer(serializers.ModelSerializer):
+    """
+    Dane pojedynczego zadania w operacji wsadowej. 'group_id' jest zwykłą liczbą;
+    grupy są pobierane jednym zapytaniem dla całej partii w ToDoBatchView.
+    """
+    group_id = serializers.IntegerField(allow_null=True, required=False)
+
+    class Meta:
+        model = ToDo
+        fields = ['title', 'description', 'priority', 'is_completed', 'group_id']
+
+
+class ToDoBatchOperationSerializer(serializers.Serializer):
+    OPERATIONS = ('create', 'update', 'complete', 'delete')
+
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    id = serializers.IntegerField(required=False)
+    data = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        if attrs['op'] != 'create' and 'id' not in attrs:
+            raise serializers.ValidationError({'id': f"This field is required for '{attrs['op']}'."})
+        return attrs
+
+
+class ToDoBatchSerializer(serializers.Serializer):
+    operations = ToDoBatchOperationSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=getattr(settings, 'TODO_BATCH_MAX_OPERATIONS', 500),
+    )
+
 
 class LoginSerializer(serializers.Serializer):
     username = serializers.CharField()
@@ -95,18 +154,50 @@ class GroupMemberSerializer(serializers.ModelSerializer):
         'obj' to instancja User.
         Kontekst 'group' jest przekazywany z GroupSerializer.
         """
+        admin_ids = self.context.get('admin_ids')
+        if admin_ids is not None:
+            return 'admin' if obj.id in admin_ids else 'user'
+
         group = self.context.get('group')
         if group and group.admins.filter(id=obj.id).exists(): 
             return 'admin'
         return 'user'
 
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     members = serializers.SerializerMethodField() 
+    todo_counts = serializers.SerializerMethodField()
+
+    sparse_columns = {'members': (), 'todo_counts': ()}
 
     class Meta:
         model = Group
-        fields = ['id', 'name','icon','color', 'members'] 
+        fields = ['id', 'name','icon','color', 'members', 'todo_counts'] 
+
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None):
+        """
+        Dołącza do querysetu grup prefetch członków i administratorów, dzięki czemu
+        serializacja dowolnej liczby grup kosztuje stałą liczbę zapytań
+        (grupy + członkowie + administratorzy) zamiast zapytań per grupa i per członek.
+        Przy zawężonym zestawie pól ('fields', patrz todos.fieldsets) pomija prefetche
+        pól, które nie będą zwrócone.
+        """
+        prefetches = []
+        if fields is None or 'members' in fields:
+            prefetches += [
+                Prefetch('members', queryset=User.objects.only('id', 'username')),
+                Prefetch('admins', queryset=User.objects.only('id')),
+            ]
+        if fields is None or 'todo_counts' in fields:
+            prefetches.append('todo_counters')
+        return queryset.prefetch_related(*prefetches)
+
+    @classmethod
+    def eager_queryset(cls, queryset, request):
+        """Queryset grup z prefetchami i kolumnami pól wybranych w żądaniu."""
+        fields = cls.requested_fields_for(request)
+        return cls.setup_eager_loading(only_requested_columns(queryset, fields, cls.sparse_columns), fields)
 
     def get_members(self, obj): 
         """
@@ -116,8 +207,14 @@ class GroupSerializer(serializers.ModelSerializer):
         queryset = obj.members.all() 
         
         serializer_context = {'group': obj, 'request': self.context.get('request')}
+        if 'admins' in getattr(obj, '_prefetched_objects_cache', {}):
+            serializer_context['admin_ids'] = {admin.id for admin in obj.admins.all()}
         return GroupMemberSerializer(queryset, many=True, context=serializer_context).data
 
+    def get_todo_counts(self, obj):
+        """Liczniki zadań grupy (otwarte / ukończone / histogram priorytetów) z tabeli ToDoCounter."""
+        return summarize_counters(obj.todo_counters.all())
+
     def create(self, validated_data):
         request = self.context.get('request')
         
@@ -168,10 +265,9 @@ class ChangePasswordSerializer(serializers.Serializer):
         return value
 
     def validate_new_password1(self, value): 
+        # Porównanie ze starym hasłem odbywa się w validate() na jawnym tekście:
+        # old_password zostało już zweryfikowane, więc drugi check_password (PBKDF2) jest zbędny
         user = self.context.get('request').user
-        if user and user.check_password(value):
-            raise serializers.ValidationError("Nowe hasło musi być inne niż stare hasło.")
-        
         if user:
             try:
                 validate_password(value, user=user)
@@ -182,6 +278,8 @@ class ChangePasswordSerializer(serializers.Serializer):
         return value
 
     def validate(self, data):
+        if data['new_password1'] == data['old_password']:
+            raise serializers.ValidationError({"new_password1": "Nowe hasło musi być inne niż stare hasło."})
         if data['new_password1'] != data['new_password2']:
             raise serializers.ValidationError({"new_password2": "Podane nowe hasła nie są identyczne."})
         return data
\ No newline at end of file
@@ -0,0 +1,124 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .authentication import token_version_cache_key
+from .counters import apply_counter_deltas, counter_deltas
+from .models import CustomUser, Group, ToDo, ToDoTombstone
+from .sync import make_tombstone
+from .versioning import bump_data_version
+
+_batched_deletes = ContextVar('todo_batched_deletes', default=None)
+
+
+def deleted_with_owner(todo, origin):
+    """
+    Czy zadanie jest usuwane kaskadowo razem ze swoim właścicielem (użytkownikiem
+    lub grupą). Wiersze ToDoCounter właściciela są wtedy usuwane tą samą kaskadą.
+    """
+    if isinstance(origin, Group):
+        return origin.pk == todo.group_id
+    if isinstance(origin, CustomUser):
+        return origin.pk == todo.user_id
+    if isinstance(origin, QuerySet):
+        return origin.model in (Group, CustomUser)
+    return False
+
+
+def record_deleted_todos(deleted):
+    """
+    Tombstone'y (synchronizacja przyrostowa), liczniki i data_version dla
+    usuniętych zadań; 'deleted' to trójki (id, zadanie, origin z post_delete).
+    Id jest zapamiętane osobno, bo QuerySet.delete() czyści pk instancji.
+    """
+    if not deleted:
+        return
+    todos = [todo for _, todo, _ in deleted]
+    ToDoTombstone.objects.bulk_create([make_tombstone(todo_id, todo.user_id, todo.group_id) for todo_id, todo, _ in deleted])
+    apply_counter_deltas(counter_deltas(deleted=[todo for _, todo, origin in deleted if not deleted_with_owner(todo, origin)]))
+    bump_data_version(user_ids={todo.user_id for todo in todos}, group_ids={todo.group_id for todo in todos})
+
+
+@contextmanager
+def batch_todo_deletes():
+    """
+    Wewnątrz bloku post_delete zadań tylko zbiera usunięte wiersze, a
+    record_deleted_todos() zapisuje je zbiorczo przy wyjściu - stała liczba
+    zapytań dla QuerySet.delete() wielu zadań (np. ToDoBatchView).
+    """
+    deleted = []
+    token = _batched_deletes.set(deleted)
+    try:
+        yield
+    finally:
+        _batched_deletes.reset(token)
+    record_deleted_todos(deleted)
+
+
+@receiver(post_delete, sender=ToDo)
+def record_todo_tombstone(sender, instance, origin=None, **kwargs):
+    """Zapisuje tombstone usuniętego zadania dla synchronizacji przyrostowej."""
+    deleted = _batched_deletes.get()
+    if deleted is not None:
+        deleted.append((instance.id, instance, origin))
+        return
+    record_deleted_todos([(instance.id, instance, origin)])
+
+
+@receiver(post_save, sender=ToDo)
+def update_todo_counters(sender, instance, created, raw=False, **kwargs):
+    """
+    Aktualizuje liczniki ToDoCounter. Dla zmienionego zadania porównuje klucz
+    zapamiętany przy odczycie z bazy (ToDo.from_db) z bieżącym.
+    """
+    if raw:
+        return
+    if created:
+        apply_counter_deltas(counter_deltas(created=[instance]))
+    elif hasattr(instance, '_loaded_counter_key'):
+        apply_counter_deltas(counter_deltas(changed=[(instance._loaded_counter_key, instance.counter_key())]))
+    instance._loaded_counter_key = instance.counter_key()
+
+
+@receiver(post_save, sender=ToDo)
+def bump_todo_owner_version(sender, instance, **kwargs):
+    bump_data_version(user_ids=[instance.user_id], group_ids=[instance.group_id])
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def bump_group_members_version(sender, instance, **kwargs):
+    bump_data_version(group_ids=[instance.id])
+
+
+@receiver(m2m_changed, sender=Group.members.through)
+@receiver(m2m_changed, sender=Group.admins.through)
+def bump_membership_version(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Zmiana członków lub administratorów grupy zmienia dane wszystkich członków
+    grupy (listy członków i ról) oraz samych dodanych/usuniętych użytkowników.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if not reverse:
+        bump_data_version(user_ids=pk_set or (), group_ids=[instance.id])
+        return
+
+    group_ids = pk_set
+    if action == 'pre_clear':
+        group_ids = sender.objects.filter(customuser_id=instance.id).values_list('group_id', flat=True)
+    bump_data_version(user_ids=[instance.id], group_ids=list(group_ids))
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def reset_token_version_cache(sender, instance, **kwargs):
+    # Po commicie, żeby równoległe żądanie nie zapisało w cache jeszcze starej wartości
+    key = token_version_cache_key(instance.pk)
+    transaction.on_commit(lambda: cache.delete(key))
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ToDoTombstone
+
+SYNC_CURSOR_SALT = 'todos.sync.cursor'
+
+
+def encode_sync_cursor(synced_at, group_ids):
+    """
+    Tworzy podpisany kursor synchronizacji: moment rozpoczęcia odczytu oraz
+    zbiór grup, do których należał użytkownik.
+    """
+    payload = {'t': synced_at.isoformat(), 'g': sorted(group_ids)}
+    return signing.dumps(payload, salt=SYNC_CURSOR_SALT, compress=True)
+
+
+def decode_sync_cursor(value, group_ids):
+    """
+    Zwraca moment, od którego należy wysłać zmiany, albo None, jeśli klient musi
+    wykonać pełną synchronizację: brak/niepoprawny kursor, zmiana członkostwa
+    w grupach albo kursor starszy niż okres przechowywania tombstone'ów.
+    """
+    if not value:
+        return None
+    try:
+        payload = signing.loads(value, salt=SYNC_CURSOR_SALT)
+        synced_at = parse_datetime(payload['t'])
+        cursor_group_ids = payload['g']
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+    if synced_at is None or sorted(cursor_group_ids) != sorted(group_ids):
+        return None
+
+    retention = getattr(settings, 'TODO_TOMBSTONE_RETENTION', None)
+    if retention and synced_at < timezone.now() - retention:
+        return None
+
+    # Overlap window: rows written by transactions that started before the
+    # previous sync but committed after it still have an older updated_at.
+    return synced_at - getattr(settings, 'TODO_SYNC_OVERLAP', timedelta(0))
+
+
+def make_tombstone(todo_id, user_id, group_id):
+    return ToDoTombstone(todo_id=todo_id, user_id=user_id, group_id=group_id)
@@ -1,3 +1,1661 @@
-from django.test import TestCase
+import csv
+import gzip
+import importlib
+import json
+import os
+import re
+import runpy
+import subprocess
+import sys
+import tempfile
+import threading
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from smtplib import SMTPException
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from axes.models import AccessAttempt, AccessFailureLog, AccessLog
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.core import mail, signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections
+from django.db.models import Q
+from django.http import HttpResponse
+from django.test import AsyncClient, AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import async_views, compression
+from .authentication import ClaimsJWTAuthentication, ClaimsRefreshToken
+from .counters import rebuild_counters
+from .instrumentation import RequestInstrumentationMiddleware, parse_server_timing
+from .metrics import LOGIN_ATTEMPTS, MetricsMiddleware, render_metrics
+from .outbox import deliver_queued_emails, queue_email
+from . import urls as todo_urls
+from .models import CustomUser, Device, Group, Invitation, OutboxEmail, ToDo, ToDoCounter, ToDoTombstone
+from .pagination import ToDoCursorPagination
+from .renderers import FastJSONRenderer
+from .serializers import ToDoSerializer
+from .sync import encode_sync_cursor
+from .views import get_filtered_todos, get_group_filtered_todos, group_todos_filter, personal_todos_filter
+
+
+class GroupSerializerQueryCountTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='owner', email='owner@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_groups(self, group_count, member_count):
+        for i in range(group_count):
+            group = Group.objects.create(name=f'group-{group_count}-{i}')
+            members = [
+                CustomUser.objects.create(username=f'm-{group_count}-{i}-{j}', email=f'm-{group_count}-{i}-{j}@example.com')
+                for j in range(member_count)
+            ]
+            group.members.add(self.user, *members)
+            group.admins.add(self.user, members[0])
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_my_groups_query_count_does_not_depend_on_groups_or_members(self):
+        self.create_groups(group_count=2, member_count=2)
+        small, _ = self.count_queries('/groups/')
+
+        self.create_groups(group_count=6, member_count=8)
+        large, response = self.count_queries('/groups/')
+
+        self.assertEqual(len(response.data), 8)
+        self.assertEqual(small, large)
+
+    def test_member_roles(self):
+        self.create_groups(group_count=1, member_count=2)
+        group = Group.objects.get()
+        response = self.client.get(f'/groups/{group.id}/')
+
+        roles = {member['username']: member['role'] for member in response.data['members']}
+        self.assertEqual(roles, {'owner': 'admin', 'm-1-0-0': 'admin', 'm-1-0-1': 'user'})
+
+
+class BootstrapViewTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='owner', email='owner@example.com', is_verified=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_data(self, group_count, todo_count):
+        for i in range(group_count):
+            group = Group.objects.create(name=f'group-{group_count}-{i}')
+            member = CustomUser.objects.create(username=f'm-{group_count}-{i}', email=f'm-{group_count}-{i}@example.com')
+            group.members.add(self.user, member)
+            group.admins.add(member)
+            for j in range(todo_count):
+                ToDo.objects.create(title=f'group {i} {j}', group=group)
+                ToDo.objects.create(title=f'personal {i} {j}', user=self.user)
+        # Grupa administrowana bez członkostwa: widoczna w groups, jej zadania nie
+        administered = Group.objects.create(name=f'administered-{group_count}')
+        administered.admins.add(self.user)
+        ToDo.objects.create(title='hidden', group=administered)
+
+    def get(self, query=''):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/bootstrap/{query}')
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_sections_match_dedicated_endpoints(self):
+        self.create_data(group_count=2, todo_count=2)
+        _, data = self.get()
+
+        self.assertEqual(data['user'], self.client.get('/info/').json())
+        self.assertEqual(data['groups'], self.client.get('/groups/').json())
+        self.assertEqual(data['group_todos'], self.client.get('/todos/groups/').json())
+        personal = [todo for todo in self.client.get('/todos/user/').json() if todo['group_id'] is None]
+        self.assertEqual(data['personal_todos'], personal)
+
+    def test_query_count_does_not_depend_on_data_size(self):
+        self.create_data(group_count=1, todo_count=1)
+        small, _ = self.get()
+        self.create_data(group_count=5, todo_count=4)
+        large, data = self.get()
+
+        self.assertEqual(len(data['group_todos']), 21)
+        self.assertEqual(small, large)
+
+    def test_paginated_section_continues_alone(self):
+        self.create_data(group_count=1, todo_count=5)
+        _, data = self.get('?sections=user,group_todos&group_todos_page_size=2')
+        self.assertEqual(set(data), {'user', 'group_todos'})
+        self.assertEqual(len(data['group_todos']['results']), 2)
+
+        titles = [todo['title'] for todo in data['group_todos']['results']]
+        next_url = data['group_todos']['next']
+        while next_url:
+            page = self.client.get(next_url).json()
+            self.assertEqual(set(page), {'group_todos'})
+            titles += [todo['title'] for todo in page['group_todos']['results']]
+            next_url = page['group_todos']['next']
+        self.assertEqual(sorted(titles), [f'group 0 {j}' for j in range(5)])
+
+    def test_unknown_section(self):
+        response = self.client.get('/bootstrap/?sections=todos')
+        self.assertEqual(response.status_code, 400)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='owner', email='owner@example.com')
+        self.group = Group.objects.create(name='group')
+        self.group.members.add(self.user)
+        self.group.admins.add(self.user)
+        for i in range(3):
+            ToDo.objects.create(user=self.user, title=f'personal-{i}', description='long text')
+            ToDo.objects.create(group=self.group, title=f'group-{i}', description='long text')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json(), [query['sql'] for query in ctx.captured_queries]
+
+    def test_fields_trim_response_and_columns(self):
+        data, queries = self.get('/todos/?fields=title,is_completed')
+        self.assertEqual(len(data), 6)
+        self.assertEqual({tuple(sorted(todo)) for todo in data}, {('id', 'is_completed', 'title')})
+        todo_query = next(sql for sql in queries if 'FROM "todos_todo"' in sql)
+        self.assertNotIn('"description"', todo_query)
+        self.assertNotIn('JOIN "todos_group"', todo_query)
+
+    def test_omit_keeps_group_name_join(self):
+        data, queries = self.get('/todos/groups/?omit=description,updated_at')
+        self.assertEqual(
+            set(data[0]), {'id', 'title', 'priority', 'is_completed', 'group_id', 'group_name', 'created_at'}
+        )
+        self.assertEqual(data[0]['group_name'], 'group')
+        todo_query = next(sql for sql in queries if 'FROM "todos_todo"' in sql)
+        self.assertNotIn('"description"', todo_query)
+
+    def test_paginated_sort_by_omitted_field(self):
+        data, queries = self.get('/todos/user/?fields=id&ordering=title&page_size=4')
+        self.assertEqual([set(todo) for todo in data['results']], [{'id'}] * 4)
+        titles_query_count = len(queries)
+        next_page, queries = self.get(data['next'])
+        self.assertEqual(len(next_page['results']), 2)
+        self.assertEqual(len(queries), titles_query_count)
+
+    def test_group_fields_skip_member_prefetch(self):
+        full, full_queries = self.get('/groups/')
+        data, queries = self.get('/groups/?fields=name,color')
+        self.assertEqual(data, [{'id': self.group.id, 'name': 'group', 'color': full[0]['color']}])
+        self.assertEqual(len(queries), len(full_queries) - 3)
+
+    def test_unknown_field(self):
+        response = self.client.get('/todos/?omit=body')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('omit', response.json())
+
+    def test_writes_ignore_fieldsets(self):
+        todo = ToDo.objects.filter(user=self.user).first()
+        response = self.client.patch(f'/todos/{todo.id}/?fields=title', {'is_completed': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('description', response.json())
+
+
+class ToDoCursorPaginationTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='owner', email='owner@example.com')
+        created_at = timezone.now()
+        # Powtarzające się priorytety, tytuły i daty utworzenia
+        for i in range(7):
+            todo = ToDo.objects.create(user=self.user, title=f'todo {i % 3}', priority=i % 2)
+            ToDo.objects.filter(pk=todo.pk).update(created_at=created_at)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def ids(self, query):
+        return [todo['id'] for todo in self.client.get(f'/todos/{query}').json()]
+
+    def pages(self, query):
+        pages, url = [], f'/todos/{query}'
+        while url:
+            data = self.client.get(url).json()
+            pages.append([todo['id'] for todo in data['results']])
+            url = data['next']
+        return pages
+
+    def signed_cursor(self, ordering, values, pk):
+        return signing.dumps({'o': ordering, 'v': values, 'id': pk}, salt=ToDoCursorPagination.signing_salt, compress=True)
+
+    def test_duplicate_sort_keys_are_broken_by_id(self):
+        for ordering in ('', 'priority', '-priority', 'title', '-title', 'created_at'):
+            query = f'?ordering={ordering}' if ordering else ''
+            expected = self.ids(query)
+            for page_size in (1, 2, 3):
+                pages = self.pages(f'{query}{"&" if query else "?"}page_size={page_size}')
+                self.assertEqual(sum(pages, []), expected, (ordering, page_size))
+                self.assertTrue(all(len(page) <= page_size for page in pages))
+
+        by_priority = ToDo.objects.values_list('priority', 'id')
+        self.assertEqual(self.ids('?ordering=priority'), [pk for _, pk in sorted(by_priority)])
+
+    def test_reversed_ordering_pages_in_reverse(self):
+        for field in ('priority', 'title', 'created_at'):
+            forward = sum(self.pages(f'?ordering={field}&page_size=2'), [])
+            backward = sum(self.pages(f'?ordering=-{field}&page_size=2'), [])
+            self.assertEqual(backward, forward[::-1], field)
+
+    @override_settings(TODO_PAGE_SIZE=2, TODO_MAX_PAGE_SIZE=3)
+    def test_page_size_is_bounded(self):
+        self.assertEqual(len(self.client.get('/todos/?page_size=100').json()['results']), 3)
+        for value in ('0', '-1', 'abc'):
+            self.assertEqual(len(self.client.get(f'/todos/?page_size={value}').json()['results']), 2, value)
+        self.assertEqual(len(self.client.get('/todos/?cursor=').json()['results']), 2)
+
+    def test_invalid_cursors_return_not_found(self):
+        next_url = self.client.get('/todos/?ordering=priority&page_size=2').json()['next']
+        cursor = parse_qs(urlsplit(next_url).query)['cursor'][0]
+        self.assertEqual(self.client.get('/todos/', {'ordering': 'priority', 'cursor': cursor}).status_code, 200)
+        # Kursor innego sortowania
+        self.assertEqual(self.client.get('/todos/', {'ordering': 'title', 'cursor': cursor}).status_code, 404)
+
+        invalid = [
+            'bad',
+            cursor[:-2] + ('AA' if not cursor.endswith('AA') else 'BB'),
+            self.signed_cursor('priority', 'x', 1),
+            self.signed_cursor('priority', ['abc'], 1),
+            self.signed_cursor('priority', [None], 1),
+            self.signed_cursor('priority', [1, 2], 1),
+            self.signed_cursor('priority', [1], 'x'),
+            self.signed_cursor('-created_at', ['not a date'], 1),
+            signing.dumps({'o': 'priority', 'v': [1]}, salt=ToDoCursorPagination.signing_salt),
+            signing.dumps({'o': 'priority', 'v': [1], 'id': 1}, salt='other'),
+        ]
+        for value in invalid:
+            response = self.client.get('/todos/', {'ordering': 'priority', 'cursor': value})
+            self.assertEqual(response.status_code, 404, value)
+
+
+class ToDoFastPathTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='owner', email='owner@example.com')
+        group = Group.objects.create(name='Zespół "A" \u2028')
+        group.members.add(self.user)
+        titles = ['zakupy ż\u2029', 'quote " and \\ slash', 'emoji 😀', 'tab\tnewline\n', 'plain']
+        for i, title in enumerate(titles):
+            ToDo.objects.create(user=self.user, title=title, description='' if i % 2 else 'opis\x01', priority=i % 3 + 1)
+            ToDo.objects.create(group=group, title=f'group {title}', is_completed=bool(i % 2))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def reference(self, path, queryset_for):
+        """Odpowiedź dotychczasowej ścieżki: ToDoSerializer i JSONRenderer DRF."""
+        request = Request(RequestFactory().get(path))
+        request.user = self.user
+        todos = queryset_for(request)
+        paginator = ToDoCursorPagination()
+        page = paginator.paginate_queryset(todos, request)
+        data = ToDoSerializer(todos if page is None else page, many=True, context={'request': request}).data
+        return JSONRenderer().render(data if page is None else paginator.get_paginated_data(data))
+
+    def assertSameAsSerializer(self, path, queryset_for):
+        # Kursor jest podpisany ze znacznikiem czasu - porównujemy resztę odpowiedzi
+        mask = re.compile(rb'cursor=[^&"]+')
+        content = self.client.get(path).content
+        self.assertEqual(mask.sub(b'cursor=', content), mask.sub(b'cursor=', self.reference(path, queryset_for)), path)
+
+    def test_lists_are_byte_compatible_with_serializer(self):
+        for query in ('', '?page_size=3', '?ordering=title&page_size=4', '?fields=title,group_name', '?omit=created_at&priority=2'):
+            self.assertSameAsSerializer(f'/todos/{query}', get_filtered_todos)
+            self.assertSameAsSerializer(f'/todos/user/{query}', get_filtered_todos)
+            self.assertSameAsSerializer(f'/todos/groups/{query}', get_group_filtered_todos)
+
+    def test_dates_follow_current_timezone(self):
+        with timezone.override('Europe/Warsaw'):
+            self.assertSameAsSerializer('/todos/', get_filtered_todos)
+            self.assertIn(b'+0', self.client.get('/todos/').content)
+
+    def test_fast_renderer_matches_drf_renderer(self):
+        data = {
+            'text': 'ż \u2028 \u2029 "\\ \x00 😀', 'none': None, 'bool': True, 1: [1.5, -2],
+            'date': timezone.now(), 'uuid': uuid.uuid4(), 'decimal': Decimal('1.25'),
+            'lazy': gettext_lazy('Invalid'), 'nested': ({'id': 2},),
+        }
+        # Wcięcie i liczby spoza 64 bitów renderuje JSONRenderer
+        for value, media_type in ((data, None), (data, 'application/json; indent=2'), ({'id': 2**70}, None)):
+            self.assertEqual(FastJSONRenderer().render(value, media_type), JSONRenderer().render(value, media_type))
+
+
+@override_settings(RESPONSE_COMPRESSION_MIN_SIZE=200)
+class ResponseCompressionTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='owner', email='owner@example.com')
+        for i in range(20):
+            ToDo.objects.create(user=self.user, title=f'todo-{i}', description='description ' * 5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_gzip_for_large_json(self):
+        plain = self.client.get('/todos/')
+        response = self.client.get('/todos/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content) / 4)
+
+    @skipUnless(compression.brotli, 'Brotli is not installed')
+    def test_brotli_preferred_when_accepted(self):
+        plain = self.client.get('/todos/')
+        response = self.client.get('/todos/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(response.content), plain.content)
+
+    def test_small_and_refused_responses_are_not_compressed(self):
+        small = self.client.get('/info/', HTTP_ACCEPT_ENCODING='gzip')
+        refused = self.client.get('/todos/', HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(small.has_header('Content-Encoding'))
+        self.assertFalse(refused.has_header('Content-Encoding'))
+
+
+class ToDoExportTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='owner', email='owner@example.com')
+        other = CustomUser.objects.create(username='other', email='other@example.com')
+        self.group = Group.objects.create(name='group')
+        self.group.members.add(self.user)
+        for i in range(5):
+            ToDo.objects.create(user=self.user, title=f'personal, "{i}"', priority=i % 3 + 1, is_completed=i == 2)
+            ToDo.objects.create(group=self.group, title=f'group-{i}')
+            ToDo.objects.create(user=other, title=f'hidden-{i}')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, query=''):
+        response = self.client.get(f'/todos/export/{query}')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.is_async)
+        return response, response.getvalue()
+
+    def ndjson_rows(self, content):
+        return [json.loads(line) for line in content.decode().splitlines()]
+
+    @override_settings(TODO_EXPORT_CHUNK_SIZE=2)
+    def test_ndjson_contains_visible_todos_in_id_order(self):
+        response, content = self.export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="todos.ndjson"')
+        expected = sorted(self.client.get('/todos/').json(), key=lambda todo: todo['id'])
+        self.assertEqual(len(expected), 10)
+        self.assertEqual(self.ndjson_rows(content), expected)
+
+    def test_csv_header_and_values(self):
+        response, content = self.export('?format=csv&fields=title,is_completed,group_id&priority=3')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        todo = ToDo.objects.get(user=self.user, priority=3)
+        self.assertEqual(content.decode().splitlines(), [
+            'id,title,is_completed,group_id',
+            f'{todo.id},"personal, ""2""",true,',
+        ])
+
+    def test_csv_escapes_formula_cells(self):
+        titles = ['=HYPERLINK("http://example.com")', '+1', '-1', '@SUM(A1)', '\tx', '\rx', 'a=b']
+        todos = [ToDo.objects.create(user=self.user, title=title, priority=5) for title in titles]
+        _, content = self.export('?format=csv&fields=title&priority=5')
+        rows = list(csv.reader(StringIO(content.decode())))
+        self.assertEqual(rows[1:], [
+            [str(todo.id), title if title == 'a=b' else "'" + title] for todo, title in zip(todos, titles)
+        ])
+
+    def test_search_export_skips_rank_annotation(self):
+        with CaptureQueriesContext(connection) as queries:
+            _, content = self.export('?search=group&fields=title')
+        self.assertEqual([row['title'] for row in self.ndjson_rows(content)], [f'group-{i}' for i in range(5)])
+        self.assertFalse(any('search_rank' in query['sql'] for query in queries.captured_queries))
+
+    def test_after_id_and_filters(self):
+        ids = list(ToDo.objects.filter(group=self.group).order_by('id').values_list('id', flat=True))
+        _, content = self.export(f'?group_id={self.group.id}&after_id={ids[2]}&fields=title')
+        self.assertEqual(self.ndjson_rows(content), [
+            {'id': todo_id, 'title': f'group-{i}'} for i, todo_id in enumerate(ids) if i > 2
+        ])
+        invalid = self.client.get('/todos/export/?after_id=x')
+        self.assertEqual(invalid.status_code, 400)
+        self.assertEqual(invalid.json(), {'after_id': 'Must be an integer.'})
+
+    def test_errors_are_json(self):
+        response = APIClient().get('/todos/export/?format=csv')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    async def test_asgi_streams_async_iterator(self):
+        token = await sync_to_async(lambda: str(ClaimsRefreshToken.for_user(self.user).access_token))()
+        response = await AsyncClient().get('/todos/export/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        expected = await sync_to_async(lambda: self.export()[1])()
+        self.assertEqual(content, expected)
+
+
+class HotPathIndexTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='owner', email='owner@example.com')
+        self.group = Group.objects.create(name='group')
+        self.group.members.add(self.user)
+
+    def assertUsesIndex(self, queryset, index_name):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        self.assertIn(index_name, queryset.explain())
+
+    def test_personal_todo_list_uses_partial_index(self):
+        queryset = ToDo.objects.filter(personal_todos_filter(self.user)).order_by('-created_at')
+        self.assertUsesIndex(queryset, 'todo_user_created_idx')
+
+    def test_group_todo_list_uses_partial_index(self):
+        queryset = ToDo.objects.filter(group_todos_filter(self.user), group_id=self.group.id).order_by('-created_at')
+        self.assertUsesIndex(queryset, 'todo_group_created_idx')
+
+    def test_device_lookup_uses_composite_index(self):
+        queryset = Device.objects.filter(user=self.user, device_id='device')
+        self.assertUsesIndex(queryset, 'device_user_device_idx')
+
+    def test_refresh_token_lookup_uses_hash_index(self):
+        queryset = Device.objects.filter(token_hash=Device.hash_token('token'), device_id='device')
+        # SQLite nadaje indeksom ograniczeń UNIQUE własne nazwy (sqlite_autoindex_*)
+        index_name = 'device_token_hash_uniq' if connection.vendor == 'postgresql' else 'sqlite_autoindex_todos_device'
+        self.assertUsesIndex(queryset, index_name)
+
+    def test_invitation_expiry_uses_index(self):
+        queryset = Invitation.objects.filter(expiration_date__lt=timezone.now())
+        self.assertUsesIndex(queryset, 'invitation_expiration_idx')
+
+
+class ToDoVisibilityTests(TestCase):
+    """Widoczność i kolejność zadań zgodne z dawnymi zapytaniami (JOIN + DISTINCT)."""
+
+    def setUp(self):
+        cache.clear()
+        self.member = CustomUser.objects.create(username='member', email='member@example.com')
+        self.other = CustomUser.objects.create(username='other', email='other@example.com')
+        self.outsider = CustomUser.objects.create(username='outsider', email='outsider@example.com')
+        self.superuser = CustomUser.objects.create(username='root', email='root@example.com', is_superuser=True)
+        shared, own, foreign, administered = (Group.objects.create(name=name) for name in ('shared', 'own', 'foreign', 'administered'))
+        shared.members.add(self.member, self.other, self.superuser)
+        own.members.add(self.member)
+        foreign.members.add(self.other, self.outsider)
+        # Administrator, który nie jest członkiem, nie widzi zadań grupy
+        administered.admins.add(self.member)
+        administered.members.add(self.other)
+
+        owners = [
+            {'user': self.member}, {'user': self.member}, {'user': self.other}, {'user': self.superuser},
+            {'group': shared}, {'group': shared}, {'group': own}, {'group': foreign}, {'group': administered},
+        ]
+        now = timezone.now()
+        for i, owner in enumerate(owners):
+            todo = ToDo.objects.create(title=f'todo {i:02d}', priority=i % 3, **owner)
+            ToDo.objects.filter(pk=todo.pk).update(created_at=now - timedelta(minutes=i * 7 % 10))
+
+    def legacy_visible(self, user, ordering='-created_at'):
+        todos = ToDo.objects.all()
+        if not user.is_superuser:
+            todos = todos.filter(Q(user=user) | (Q(group__members=user) & Q(user__isnull=True))).distinct()
+        return list(todos.order_by(ordering).values_list('id', flat=True))
+
+    def legacy_group(self, user):
+        todos = ToDo.objects.filter(group__members=user, user__isnull=True).distinct()
+        return list(todos.order_by('-created_at').values_list('id', flat=True))
+
+    def ids(self, client, path):
+        return [todo['id'] for todo in client.get(path).json()]
+
+    def test_lists_match_legacy_queries(self):
+        for user in (self.member, self.other, self.outsider, self.superuser):
+            client = APIClient()
+            client.force_authenticate(user)
+            with self.subTest(user=user.username):
+                self.assertEqual(self.ids(client, '/todos/'), self.legacy_visible(user))
+                self.assertEqual(self.ids(client, '/todos/user/'), self.legacy_visible(user))
+                self.assertEqual(self.ids(client, '/todos/?ordering=title'), self.legacy_visible(user, 'title'))
+                self.assertEqual(self.ids(client, '/todos/?ordering=-title'), self.legacy_visible(user, '-title'))
+                self.assertEqual(self.ids(client, '/todos/groups/'), self.legacy_group(user))
+
+    def test_detail_access_matches_legacy_queries(self):
+        for user in (self.member, self.other, self.outsider, self.superuser):
+            client = APIClient()
+            client.force_authenticate(user)
+            visible = set(self.legacy_visible(user))
+            for todo_id in ToDo.objects.values_list('id', flat=True):
+                expected = 200 if todo_id in visible else 404
+                self.assertEqual(client.get(f'/todos/{todo_id}/').status_code, expected, (user.username, todo_id))
+
+
+class ToDoQueryCountTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='owner', email='owner@example.com')
+        self.groups = [Group.objects.create(name=f'group {i}') for i in range(6)]
+        for group in self.groups:
+            group.members.add(self.user)
+            ToDo.objects.create(group=group, title=f'{group.name} todo')
+        ToDo.objects.create(user=self.user, title='personal')
+        self.foreign = Group.objects.create(name='foreign')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_lists_run_one_query_regardless_of_groups(self):
+        for path in ('/todos/', '/todos/user/', '/todos/groups/', '/todos/?page_size=3'):
+            with self.assertNumQueries(1):
+                response = self.client.get(path)
+            self.assertEqual(response.status_code, 200, path)
+        # Nazwa grupy z JOIN, bez zapytania na wiersz
+        self.assertEqual(
+            {todo['group_name'] for todo in self.client.get('/todos/groups/').json()},
+            {group.name for group in self.groups},
+        )
+
+    def test_create_group_todo(self):
+        # SELECT grupy z flagą członkostwa (EXISTS), INSERT, licznik, data_version + BEGIN/COMMIT
+        with self.assertNumQueries(6):
+            response = self.client.post('/todos/', {'title': 'new', 'group_id': self.groups[0].id}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['group_name'], self.groups[0].name)
+
+        with self.assertNumQueries(1):
+            response = self.client.post('/todos/', {'title': 'new', 'group_id': self.foreign.id}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_create_personal_todo(self):
+        with self.assertNumQueries(5):
+            response = self.client.post('/todos/', {'title': 'new'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+class ToDoOwnershipTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create(username='owner', email='owner@example.com')
+        self.member = CustomUser.objects.create(username='member', email='member@example.com')
+        self.group = Group.objects.create(name='group')
+        self.group.members.add(self.user, self.member)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_mixed_owner_rows_are_normalized_to_personal(self):
+        migration = importlib.import_module('todos.migrations.0021_normalize_todo_owner')
+        mixed = ToDo.objects.create(user=self.user, group=self.group, title='mixed')
+        group_todo = ToDo.objects.create(group=self.group, title='group')
+        migration.normalize_todo_owner(django_apps, None)
+
+        mixed.refresh_from_db()
+        self.assertEqual((mixed.user_id, mixed.group_id), (self.user.id, None))
+        self.assertEqual(list(ToDo.objects.filter(personal_todos_filter(self.user))), [mixed])
+        self.assertEqual(list(ToDo.objects.filter(group_todos_filter(self.member))), [group_todo])
+        self.assertEqual(
+            set(ToDoCounter.objects.values_list('user_id', 'group_id', 'count')),
+            {(self.user.id, None, 1), (None, self.group.id, 1)},
+        )
+
+    def test_setting_group_moves_personal_todo_to_group(self):
+        todo = ToDo.objects.create(user=self.user, title='personal')
+        response = self.client.patch(f'/todos/{todo.id}/', {'group_id': self.group.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        todo.refresh_from_db()
+        self.assertEqual((todo.user_id, todo.group_id), (None, self.group.id))
+        self.assertTrue(ToDoTombstone.objects.filter(todo_id=todo.id, user_id=self.user.id, group_id=None).exists())
+
+    def test_clearing_group_moves_group_todo_to_editors_list(self):
+        todo = ToDo.objects.create(group=self.group, title='group')
+        member_client = APIClient()
+        member_client.force_authenticate(self.member)
+        response = member_client.patch(f'/todos/{todo.id}/', {'group_id': None}, format='json')
+        self.assertEqual(response.status_code, 200)
+        todo.refresh_from_db()
+        # Trafia do edytującego, nie do autora zadania
+        self.assertEqual((todo.user_id, todo.group_id), (self.member.id, None))
+        self.assertTrue(ToDoTombstone.objects.filter(todo_id=todo.id, user_id=None, group_id=self.group.id).exists())
+        self.assertNotIn(todo.id, [row['id'] for row in self.client.get('/todos/').json()])
+
+    def test_moving_to_foreign_group_is_denied(self):
+        other_group = Group.objects.create(name='other')
+        todo = ToDo.objects.create(user=self.user, title='personal')
+        response = self.client.patch(f'/todos/{todo.id}/', {'group_id': other_group.id}, format='json')
+        self.assertIn(response.status_code, (400, 403))
+        todo.refresh_from_db()
+        self.assertEqual((todo.user_id, todo.group_id), (self.user.id, None))
+
+
+@override_settings(TODO_SYNC_OVERLAP=timedelta(0))
+class ToDoSyncTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create(username='owner', email='owner@example.com')
+        self.member = CustomUser.objects.create(username='member', email='member@example.com')
+        self.group = Group.objects.create(name='group')
+        self.group.members.add(self.user, self.member)
+        self.personal = ToDo.objects.create(user=self.user, title='personal')
+        self.group_todo = ToDo.objects.create(group=self.group, title='group')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, cursor=None):
+        response = self.client.get('/todos/sync/', {'cursor': cursor} if cursor else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_initial_sync_returns_everything(self):
+        data = self.sync()
+        self.assertTrue(data['reset'])
+        self.assertEqual({todo['id'] for todo in data['changed']}, {self.personal.id, self.group_todo.id})
+        self.assertEqual(data['deleted'], [])
+
+    def test_changes_and_deletions_after_cursor(self):
+        cursor = self.sync()['cursor']
+        created = ToDo.objects.create(user=self.user, title='new')
+        self.client.patch(f'/todos/{self.group_todo.id}/', {'is_completed': True}, format='json')
+        self.client.delete(f'/todos/{self.personal.id}/')
+
+        data = self.sync(cursor)
+        self.assertFalse(data['reset'])
+        self.assertEqual({todo['id'] for todo in data['changed']}, {created.id, self.group_todo.id})
+        self.assertEqual(data['deleted'], [self.personal.id])
+        self.assertEqual(self.sync(data['cursor'])['changed'], [])
+
+    def test_move_out_of_group_is_a_deletion_for_other_members(self):
+        cursor = self.sync()['cursor']
+        member_client = APIClient()
+        member_client.force_authenticate(self.member)
+        member_client.patch(f'/todos/{self.group_todo.id}/', {'group_id': None}, format='json')
+
+        data = self.sync(cursor)
+        self.assertEqual(data['changed'], [])
+        self.assertEqual(data['deleted'], [self.group_todo.id])
+
+    def test_membership_change_or_expired_cursor_forces_reset(self):
+        cursor = self.sync()['cursor']
+        Group.objects.create(name='other').members.add(self.user)
+        self.assertTrue(self.sync(cursor)['reset'])
+
+        group_ids = list(self.user.custom_groups.values_list('id', flat=True))
+        expired = encode_sync_cursor(timezone.now() - settings.TODO_TOMBSTONE_RETENTION - timedelta(minutes=1), group_ids)
+        self.assertTrue(self.sync(expired)['reset'])
+        self.assertTrue(self.sync('tampered')['reset'])
+
+
+class ConditionalRequestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create(username='owner', email='owner@example.com')
+        self.member = CustomUser.objects.create(username='member', email='member@example.com')
+        self.group = Group.objects.create(name='group')
+        self.group.members.add(self.user, self.member)
+        ToDo.objects.create(user=self.user, title='personal')
+        self.group_todo = ToDo.objects.create(group=self.group, title='group')
+        self.client = self.client_for(self.user)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {ClaimsRefreshToken.for_user(user).access_token}')
+        return client
+
+    def test_matching_etag_returns_not_modified(self):
+        for path in ('/todos/', '/todos/user/', '/todos/groups/', '/todos/summary/', '/groups/', f'/groups/{self.group.id}/'):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertTrue(response['ETag'].startswith('W/"'), path)
+            with self.assertNumQueries(1):
+                # Tylko odczyt data_version użytkownika
+                not_modified = self.client.get(path, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(not_modified.status_code, 304, path)
+            self.assertEqual(not_modified.content, b'', path)
+
+    def test_etag_differs_per_query_string(self):
+        self.assertNotEqual(self.client.get('/todos/')['ETag'], self.client.get('/todos/?priority=1')['ETag'])
+
+    def test_group_write_by_another_member_changes_etag(self):
+        etag = self.client.get('/todos/groups/')['ETag']
+        response = self.client_for(self.member).patch(f'/todos/{self.group_todo.id}/', {'is_completed': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/todos/groups/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertTrue(response.json()[0]['is_completed'])
+
+    def test_stale_user_save_keeps_version_bumps(self):
+        stale = CustomUser.objects.get(pk=self.user.pk)
+        etag = self.client.get('/todos/groups/')['ETag']
+        self.client_for(self.member).patch(f'/todos/{self.group_todo.id}/', {'is_completed': True}, format='json')
+
+        stale.first_name = 'Owner'
+        stale.save()
+        other = CustomUser.objects.get(pk=self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            stale.set_password('Secret-pass-123')
+            stale.save()
+            other.set_password('Other-pass-456')
+            other.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Owner')
+        self.assertEqual(self.user.data_version, stale.data_version + 1)
+        # Obie zmiany hasła unieważniają tokeny, nawet na nieaktualnych instancjach
+        self.assertEqual(self.user.token_version, 2)
+        self.assertEqual(other.token_version, 2)
+        response = self.client_for(self.user).get('/todos/groups/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class GroupRosterCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = CustomUser.objects.create(username='admin', email='admin@example.com')
+        self.member = CustomUser.objects.create(username='member', email='member@example.com')
+        self.other = CustomUser.objects.create(username='other', email='other@example.com')
+        self.group = Group.objects.create(name='group')
+        self.group.members.add(self.admin, self.member, self.other)
+        self.group.admins.add(self.admin)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {ClaimsRefreshToken.for_user(user).access_token}')
+        return client
+
+    def promote(self, client, user):
+        return client.post(f'/groups/{self.group.id}/admins/{user.id}/')
+
+    def test_roster_is_cached_between_requests(self):
+        client = self.client_for(self.member)
+        self.assertEqual(self.promote(client, self.other).status_code, 403)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.promote(client, self.other).status_code, 403)
+        self.assertFalse([query for query in queries if 'todos_group_admins' in query['sql']])
+
+    def test_promotion_and_demotion_apply_immediately(self):
+        admin, member = self.client_for(self.admin), self.client_for(self.member)
+        self.assertEqual(self.promote(member, self.other).status_code, 403)
+
+        self.assertEqual(self.promote(admin, self.member).status_code, 200)
+        self.assertEqual(self.promote(member, self.other).status_code, 200)
+
+        self.assertEqual(admin.delete(f'/groups/{self.group.id}/admins/{self.member.id}/').status_code, 200)
+        self.assertEqual(member.delete(f'/groups/{self.group.id}/admins/{self.other.id}/').status_code, 403)
+
+    def test_removed_member_is_denied_immediately(self):
+        self.group.admins.add(self.member)
+        member = self.client_for(self.member)
+        self.assertEqual(member.get(f'/groups/{self.group.id}/').status_code, 200)
+        self.assertEqual(member.patch(f'/groups/{self.group.id}/', {'name': 'renamed'}, format='json').status_code, 200)
+
+        self.assertEqual(self.client_for(self.admin).delete(f'/groups/{self.group.id}/members/{self.member.id}/').status_code, 200)
+        self.assertEqual(member.patch(f'/groups/{self.group.id}/', {'name': 'again'}, format='json').status_code, 404)
+        self.assertEqual(self.promote(member, self.other).status_code, 403)
+
+    def test_superuser_sees_current_roster(self):
+        superuser = CustomUser.objects.create(username='root', email='root@example.com', is_superuser=True)
+        client = self.client_for(superuser)
+        self.assertEqual(self.promote(client, self.other).status_code, 200)
+        # Zmiana ról nie podbija data_version superużytkownika spoza grupy
+        self.group.admins.remove(self.other)
+        self.assertEqual(self.promote(client, self.other).status_code, 200)
+        self.assertEqual(self.promote(client, self.other).status_code, 409)
+
+    def test_leaving_updates_other_members_rosters(self):
+        admin, other = self.client_for(self.admin), self.client_for(self.other)
+        # Wczytuje roster administratora do cache
+        self.assertEqual(self.promote(admin, self.admin).status_code, 409)
+
+        self.assertEqual(other.delete(f'/groups/{self.group.id}/leave/').status_code, 200)
+        self.assertEqual(other.delete(f'/groups/{self.group.id}/leave/').status_code, 404)
+        self.assertEqual(self.promote(admin, self.other).status_code, 404)
+
+
+class StopWorker(BaseException):
+    pass
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+    EMAIL_OUTBOX_RETRY_BACKOFF=timedelta(minutes=1),
+    EMAIL_OUTBOX_CLAIM_TIMEOUT=timedelta(minutes=10),
+)
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        mail.outbox = []
+        self.emails = [queue_email(f'subject-{i}', 'body', 'app@example.com', [f'user{i}@example.com']) for i in range(3)]
+
+    def test_sends_pending_emails(self):
+        self.assertEqual(deliver_queued_emails(), {'sent': 3, 'retry': 0, 'dead': 0})
+        self.assertEqual([message.to for message in mail.outbox], [[f'user{i}@example.com'] for i in range(3)])
+        self.assertEqual(set(OutboxEmail.objects.values_list('status', 'attempts')), {(OutboxEmail.STATUS_SENT, 1)})
+        self.assertEqual(deliver_queued_emails(), {'sent': 0, 'retry': 0, 'dead': 0})
+
+    def test_failed_send_is_retried_with_backoff_then_dead_lettered(self):
+        with mock.patch.object(locmem.EmailBackend, 'send_messages', side_effect=SMTPException('boom')), \
+                self.assertLogs('todos.outbox', 'WARNING'):
+            started = timezone.now()
+            self.assertEqual(deliver_queued_emails(), {'sent': 0, 'retry': 3, 'dead': 0})
+            email = OutboxEmail.objects.get(pk=self.emails[0].pk)
+            self.assertEqual((email.status, email.attempts, email.last_error), (OutboxEmail.STATUS_PENDING, 1, 'boom'))
+            self.assertGreaterEqual(email.next_attempt_at, started + timedelta(minutes=1))
+            # Przed upływem backoffu wiadomości nie są ponawiane
+            self.assertEqual(deliver_queued_emails(), {'sent': 0, 'retry': 0, 'dead': 0})
+
+            OutboxEmail.objects.update(next_attempt_at=timezone.now())
+            deliver_queued_emails()
+            email.refresh_from_db()
+            self.assertEqual(email.attempts, 2)
+            self.assertGreaterEqual(email.next_attempt_at, timezone.now() + timedelta(minutes=1))
+
+            OutboxEmail.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(deliver_queued_emails(), {'sent': 0, 'retry': 0, 'dead': 3})
+        self.assertEqual(set(OutboxEmail.objects.values_list('status', 'attempts')), {(OutboxEmail.STATUS_DEAD, 3)})
+        self.assertEqual(mail.outbox, [])
+
+    def test_connection_open_failure_is_persisted(self):
+        with mock.patch.object(locmem.EmailBackend, 'open', side_effect=OSError('refused')), \
+                self.assertLogs('todos.outbox', 'ERROR'):
+            self.assertEqual(deliver_queued_emails(), {'sent': 0, 'retry': 3, 'dead': 0})
+        for email in OutboxEmail.objects.all():
+            self.assertEqual((email.status, email.attempts, email.last_error), (OutboxEmail.STATUS_PENDING, 1, 'refused'))
+            self.assertGreater(email.next_attempt_at, timezone.now())
+
+    def test_worker_crash_keeps_sent_emails_and_releases_the_rest_later(self):
+        send = locmem.EmailBackend.send_messages
+        calls = []
+
+        def send_then_crash(backend, messages):
+            calls.append(messages)
+            if len(calls) == 2:
+                raise StopWorker
+            return send(backend, messages)
+
+        with mock.patch.object(locmem.EmailBackend, 'send_messages', send_then_crash):
+            with self.assertRaises(StopWorker):
+                deliver_queued_emails()
+        self.assertEqual(len(mail.outbox), 1)
+        statuses = dict(OutboxEmail.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[self.emails[0].pk], OutboxEmail.STATUS_SENT)
+
+        # Pozostałe są zarezerwowane do końca EMAIL_OUTBOX_CLAIM_TIMEOUT, potem wracają do kolejki
+        self.assertEqual(deliver_queued_emails(), {'sent': 0, 'retry': 0, 'dead': 0})
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(minutes=11)):
+            self.assertEqual(deliver_queued_emails(), {'sent': 2, 'retry': 0, 'dead': 0})
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_command_waits_when_smtp_is_down(self):
+        # Pełna partia (1 wiadomość) bez wysyłki - worker czeka zamiast od razu pobierać kolejną
+        with mock.patch.object(locmem.EmailBackend, 'open', side_effect=OSError('refused')), \
+                mock.patch('time.sleep', side_effect=StopWorker), self.assertLogs('todos.outbox', 'ERROR'):
+            with self.assertRaises(StopWorker):
+                call_command('send_queued_emails', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(sorted(OutboxEmail.objects.values_list('attempts', flat=True)), [0, 0, 1])
+
+
+class ToDoBatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create(username='owner', email='owner@example.com')
+        self.other = CustomUser.objects.create(username='other', email='other@example.com')
+        self.group = Group.objects.create(name='group')
+        self.group.members.add(self.user)
+        self.foreign_group = Group.objects.create(name='foreign')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def batch(self, *operations):
+        response = self.client.post('/todos/batch/', {'operations': list(operations)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [(result['index'], result['status']) for result in response.json()['results']], response.json()['results']
+
+    def assertCountersMatchRebuild(self):
+        incremental = set(ToDoCounter.objects.values_list('user_id', 'group_id', 'priority', 'is_completed', 'count'))
+        rebuild_counters()
+        rebuilt = set(ToDoCounter.objects.values_list('user_id', 'group_id', 'priority', 'is_completed', 'count'))
+        self.assertEqual({row for row in incremental if row[-1]}, rebuilt)
+
+    def test_mixed_operations(self):
+        personal = ToDo.objects.create(user=self.user, title='personal')
+        done = ToDo.objects.create(group=self.group, title='group')
+        removed = ToDo.objects.create(user=self.user, title='removed')
+
+        statuses, results = self.batch(
+            {'op': 'create', 'data': {'title': 'new'}},
+            {'op': 'create', 'data': {'title': 'new group', 'group_id': self.group.id}},
+            {'op': 'update', 'id': personal.id, 'data': {'title': 'renamed', 'priority': 3}},
+            {'op': 'complete', 'id': done.id},
+            {'op': 'delete', 'id': removed.id},
+        )
+        self.assertEqual(statuses, [(0, 201), (1, 201), (2, 200), (3, 200), (4, 204)])
+        self.assertEqual(results[1]['todo']['group_id'], self.group.id)
+
+        personal.refresh_from_db()
+        done.refresh_from_db()
+        self.assertEqual((personal.title, personal.priority), ('renamed', 3))
+        self.assertTrue(done.is_completed)
+        self.assertFalse(ToDo.objects.filter(id=removed.id).exists())
+        self.assertEqual(ToDo.objects.get(title='new group').user_id, None)
+        self.assertEqual(ToDo.objects.get(title='new').user_id, self.user.id)
+
+    def test_per_item_failures_do_not_block_other_operations(self):
+        foreign = ToDo.objects.create(user=self.other, title='foreign')
+        statuses, results = self.batch(
+            {'op': 'update', 'id': foreign.id, 'data': {'title': 'stolen'}},
+            {'op': 'delete', 'id': foreign.id},
+            {'op': 'create', 'data': {'title': 'intruder', 'group_id': self.foreign_group.id}},
+            {'op': 'create', 'data': {'title': 'bad group', 'group_id': 999999}},
+            {'op': 'create', 'data': {'priority': 2}},
+            {'op': 'create', 'data': {'title': 'ok'}},
+        )
+        self.assertEqual(statuses, [(0, 404), (1, 404), (2, 403), (3, 400), (4, 400), (5, 201)])
+        self.assertIn('title', results[4]['errors'])
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.title, 'foreign')
+        self.assertFalse(ToDo.objects.filter(title='intruder').exists())
+        self.assertTrue(ToDo.objects.filter(title='ok').exists())
+
+    def test_counters_and_tombstones(self):
+        moved = ToDo.objects.create(user=self.user, title='moved')
+        completed = ToDo.objects.create(group=self.group, title='completed')
+        removed = ToDo.objects.create(group=self.group, title='removed')
+        # Zmiana, a potem usunięcie tego samego zadania: liczy się stan z bazy
+        changed_then_removed = ToDo.objects.create(user=self.user, title='changed then removed')
+
+        self.batch(
+            {'op': 'create', 'data': {'title': 'new', 'priority': 1}},
+            {'op': 'update', 'id': moved.id, 'data': {'group_id': self.group.id}},
+            {'op': 'complete', 'id': completed.id},
+            {'op': 'delete', 'id': removed.id},
+            {'op': 'update', 'id': changed_then_removed.id, 'data': {'group_id': self.group.id, 'is_completed': True}},
+            {'op': 'delete', 'id': changed_then_removed.id},
+        )
+        self.assertEqual(
+            set(ToDoTombstone.objects.values_list('todo_id', 'user_id', 'group_id')),
+            {(moved.id, self.user.id, None), (removed.id, None, self.group.id), (changed_then_removed.id, self.user.id, None)},
+        )
+        self.assertCountersMatchRebuild()
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def run(size):
+            todos = [ToDo.objects.create(user=self.user, title=f'todo-{i}') for i in range(2 * size)]
+            operations = [{'op': 'create', 'data': {'title': f'new-{i}', 'group_id': self.group.id}} for i in range(size)]
+            operations += [{'op': 'complete', 'id': todo.id} for todo in todos[:size]]
+            operations += [{'op': 'delete', 'id': todo.id} for todo in todos[size:]]
+            with CaptureQueriesContext(connection) as queries:
+                self.batch(*operations)
+            return len(queries)
+
+        # Pierwsze wywołanie tworzy wiersze liczników
+        run(1)
+        small, large = run(2), run(20)
+        self.assertEqual(small, large)
+        # Zadania, grupy, zapisy zadań, DELETE z odczytem usuwanych wierszy,
+        # tombstone'y, liczniki i data_version (osobno dla usunięć) + BEGIN/COMMIT
+        self.assertLessEqual(large, 15)
+
+
+class ToDoCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create(username='owner', email='owner@example.com')
+        self.member = CustomUser.objects.create(username='member', email='member@example.com')
+        self.group = Group.objects.create(name='group')
+        self.group.members.add(self.user, self.member)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def counters(self):
+        return set(ToDoCounter.objects.filter(count__gt=0).values_list('user_id', 'group_id', 'priority', 'is_completed', 'count'))
+
+    def assertMatchesRebuild(self):
+        incremental = self.counters()
+        rebuild_counters()
+        self.assertEqual(incremental, self.counters())
+
+    def test_incremental_counters_match_rebuild(self):
+        with self.assertNoLogs('todos.counters', 'WARNING'):
+            ids = [self.client.post('/todos/', {'title': f'todo-{i}', 'priority': i % 3 + 1}, format='json').json()['id'] for i in range(4)]
+            self.client.post('/todos/', {'title': 'group', 'group_id': self.group.id}, format='json')
+            self.assertMatchesRebuild()
+
+            self.client.patch(f'/todos/{ids[0]}/', {'is_completed': True}, format='json')
+            self.client.patch(f'/todos/{ids[1]}/', {'priority': 3}, format='json')
+            self.client.patch(f'/todos/{ids[2]}/', {'group_id': self.group.id}, format='json')
+            self.client.delete(f'/todos/{ids[3]}/')
+            self.assertMatchesRebuild()
+            self.assertEqual(sum(ToDoCounter.objects.filter(group=self.group).values_list('count', flat=True)), 2)
+
+    def test_owner_deletion_does_not_report_drift(self):
+        ToDo.objects.create(user=self.member, title='personal')
+        ToDo.objects.create(group=self.group, title='group')
+        ToDo.objects.create(user=self.user, title='kept')
+        with self.assertNoLogs('todos.counters', 'WARNING'):
+            self.group.delete()
+            self.member.delete()
+            Group.objects.create(name='other').todos.create(title='other')
+            Group.objects.filter(name='other').delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(self.counters(), {(self.user.id, None, 2, False, 1)})
+
+
+    def test_migration_populates_same_counters_as_rebuild(self):
+        ToDo.objects.create(user=self.user, title='personal', priority=3)
+        ToDo.objects.create(user=self.user, title='done', is_completed=True)
+        ToDo.objects.create(group=self.group, title='group')
+        rebuild_counters()
+        expected = self.counters()
+
+        ToDoCounter.objects.all().delete()
+        importlib.import_module('todos.migrations.0016_todocounter').populate_counters(django_apps, None)
+        self.assertEqual(self.counters(), expected)
+
+
+class ToDoSearchTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='owner', email='owner@example.com')
+        other = CustomUser.objects.create(username='other', email='other@example.com')
+        now = timezone.now()
+        # Kolejność utworzenia (id) celowo różna od created_at
+        rows = [
+            ('old title match', 'milk and bread', 3),
+            ('shopping', 'buy milk and bread', 1),
+            ('new title milk bread', '', 2),
+            ('newest milk bread', 'also bread', 0),
+            ('unrelated', 'nothing here', 4),
+            ('milk only', '', 5),
+        ]
+        self.todos = {}
+        for title, description, age in rows:
+            todo = ToDo.objects.create(user=self.user, title=title, description=description)
+            ToDo.objects.filter(pk=todo.pk).update(created_at=now - timedelta(hours=age))
+            self.todos[title] = todo.id
+        ToDo.objects.create(user=other, title='milk bread of someone else')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def titles(self, query):
+        return [todo['title'] for todo in self.client.get(f'/todos/{query}').json()]
+
+    def all_pages(self, query):
+        titles, url = [], f'/todos/{query}'
+        while url:
+            data = self.client.get(url).json()
+            titles += [todo['title'] for todo in data['results']]
+            url = data['next']
+        return titles
+
+    def test_every_term_must_match_title_or_description(self):
+        self.assertEqual(
+            set(self.titles('?search=milk bread')),
+            {'old title match', 'shopping', 'new title milk bread', 'newest milk bread'},
+        )
+        self.assertEqual(self.titles('?search=nothing'), ['unrelated'])
+        self.assertEqual(self.titles('?search=absent'), [])
+
+    def test_title_matches_rank_first_then_newest(self):
+        expected = ['newest milk bread', 'new title milk bread', 'shopping', 'old title match']
+        self.assertEqual(self.titles('?search=milk bread'), expected)
+        # Nieznane 'ordering' nie wyłącza sortowania po trafności
+        self.assertEqual(self.titles('?search=milk bread&ordering=nope'), expected)
+        self.assertEqual(
+            self.titles('?search=milk bread&ordering=title'),
+            ['new title milk bread', 'newest milk bread', 'old title match', 'shopping'],
+        )
+
+    def test_pages_follow_unpaginated_order(self):
+        for query in ('?search=milk', '?search=milk bread', '?search=milk&ordering=-priority', '?ordering=nope'):
+            for page_size in (1, 2, 4):
+                self.assertEqual(self.all_pages(f'{query}&page_size={page_size}'), self.titles(query), (query, page_size))
+        self.assertEqual(self.all_pages('?search=milk&page_size=2'), self.all_pages('?search=milk&page_size=2&fields=title'))
+
+    def test_pages_through_tied_fractional_ranks(self):
+        created_at = timezone.now() - timedelta(days=1)
+        for i in range(5):
+            todo = ToDo.objects.create(user=self.user, title=f'eggs {i}', description='milk bread')
+            ToDo.objects.filter(pk=todo.pk).update(created_at=created_at)
+        # Trafność 1/3 nie ma dokładnej reprezentacji binarnej
+        query = '?search=eggs milk bread'
+        expected = self.titles(query)
+        self.assertEqual(len(expected), 5)
+        for page_size in (1, 2, 3):
+            self.assertEqual(self.all_pages(f'{query}&page_size={page_size}'), expected, page_size)
+
+
+@override_settings(AXES_COOLOFF_TIME=timedelta(minutes=30), ACCESS_LOG_RETENTION=timedelta(days=90), TODO_TOMBSTONE_RETENTION=timedelta(days=30))
+class ReapExpiredTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        user = CustomUser.objects.create(username='owner', email='owner@example.com')
+        group = Group.objects.create(name='group')
+
+        self.kept = {}
+        self.expired = {}
+
+        def add(model, expired, **fields):
+            bucket = self.expired if expired else self.kept
+            bucket.setdefault(model, set()).add(model.objects.create(**fields).pk)
+
+        add(Device, True, user=user, device_id='old', refresh_token='old', expires_at=now - timedelta(minutes=1))
+        add(Device, False, user=user, device_id='new', refresh_token='new', expires_at=now + timedelta(days=1))
+        add(Invitation, True, group=group, inviter=user, expiration_date=now - timedelta(minutes=1))
+        add(Invitation, True, group=group, inviter=user, expiration_date=now + timedelta(days=1), max_uses=2, uses=2)
+        add(Invitation, False, group=group, inviter=user, expiration_date=now + timedelta(days=1), max_uses=2, uses=1)
+        add(ToDoTombstone, True, todo_id=1, user_id=user.id, deleted_at=now - timedelta(days=31))
+        add(ToDoTombstone, False, todo_id=2, user_id=user.id, deleted_at=now - timedelta(days=29))
+
+        for status, age, expired in (
+            (OutboxEmail.STATUS_SENT, timedelta(days=31), True),
+            (OutboxEmail.STATUS_DEAD, timedelta(days=31), True),
+            (OutboxEmail.STATUS_PENDING, timedelta(days=31), False),
+            (OutboxEmail.STATUS_SENT, timedelta(days=29), False),
+        ):
+            row = OutboxEmail.objects.create(subject='s', body='b', recipients=['a@example.com'], status=status)
+            # created_at ma auto_now_add
+            OutboxEmail.objects.filter(pk=row.pk).update(created_at=now - age)
+            (self.expired if expired else self.kept).setdefault(OutboxEmail, set()).add(row.pk)
+
+        axes_fields = {'user_agent': 'agent', 'ip_address': '127.0.0.1', 'http_accept': '*/*', 'path_info': '/token/'}
+        for model, expired_age, kept_age, extra in (
+            (AccessAttempt, timedelta(minutes=31), timedelta(minutes=29), {'get_data': '', 'post_data': '', 'failures_since_start': 1}),
+            (AccessLog, timedelta(days=91), timedelta(days=89), {}),
+            (AccessFailureLog, timedelta(days=91), timedelta(days=89), {}),
+        ):
+            for age, expired in ((expired_age, True), (kept_age, False)):
+                row = model.objects.create(username=f'user-{expired}', **axes_fields, **extra)
+                # attempt_time ma auto_now_add
+                model.objects.filter(pk=row.pk).update(attempt_time=now - age)
+                (self.expired if expired else self.kept).setdefault(model, set()).add(row.pk)
+
+    def remaining(self):
+        return {model: set(model.objects.values_list('pk', flat=True)) for model in self.kept}
+
+    def test_dry_run_counts_without_deleting(self):
+        before = self.remaining()
+        out = StringIO()
+        call_command('reap_expired', '--dry-run', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[:-1], [
+            'device: 1', 'invitation: 1', 'invitation_used_up: 1', 'todo_tombstone: 1',
+            'outbox_email: 2', 'axes_access_attempt: 1', 'axes_access_log: 1', 'axes_access_failure_log: 1',
+        ])
+        self.assertIn('Would delete 9 rows.', lines[-1])
+        self.assertEqual(self.remaining(), before)
+
+    def test_deletes_only_expired_rows_in_batches(self):
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('reap_expired', '--batch-size', '1', stdout=out)
+        # Partie idą po indeksowanej kolumnie wygaśnięcia, nie po PK
+        selects = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertTrue(any('ORDER BY "todos_device"."expires_at" ASC, "todos_device"."id" ASC' in sql for sql in selects))
+        self.assertTrue(any('ORDER BY "todos_invitation"."expiration_date" ASC' in sql for sql in selects))
+        self.assertIn('Deleted 9 rows.', out.getvalue())
+        self.assertEqual(self.remaining(), self.kept)
+
+        out = StringIO()
+        call_command('reap_expired', stdout=out)
+        self.assertIn('Deleted 0 rows.', out.getvalue())
+
+
+class ClaimsJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='owner', email='owner@example.com', password='Secret-pass-123')
+        self.factory = RequestFactory()
+        self.auth = ClaimsJWTAuthentication()
+
+    def request(self, token=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        return Request(self.factory.get('/api/todos/', **headers))
+
+    def issue(self):
+        return str(ClaimsRefreshToken.for_user(self.user).access_token)
+
+    def save_user(self):
+        # wpis w cache znika dopiero po commicie
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+    def assertRevoked(self, token):
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate(self.request(token))
+
+    def test_claims_user_does_not_query(self):
+        token = self.issue()
+        self.auth.authenticate(self.request(token))
+        with self.assertNumQueries(0):
+            user, _ = self.auth.authenticate(self.request(token))
+            self.assertEqual((user.id, user.username, user.is_superuser), (self.user.id, 'owner', False))
+        with self.assertNumQueries(1):
+            # data_version nie jest w claimach
+            self.assertEqual(user.data_version, self.user.data_version)
+
+    def test_password_change_revokes_token(self):
+        token = self.issue()
+        self.auth.authenticate(self.request(token))
+
+        self.user.set_password('Other-pass-456')
+        self.save_user()
+
+        self.assertRevoked(token)
+        user, _ = self.auth.authenticate(self.request(self.issue()))
+        self.assertEqual(user.id, self.user.id)
+
+    def test_deactivated_user_is_rejected(self):
+        token = self.issue()
+        self.auth.authenticate(self.request(token))
+
+        self.user.is_active = False
+        self.save_user()
+
+        self.assertRevoked(token)
+        self.assertRevoked(self.issue())
+
+    def test_permission_changes_revoke_token(self):
+        for field in ('is_staff', 'is_superuser'):
+            with self.subTest(field=field):
+                token = self.issue()
+                self.auth.authenticate(self.request(token))
+
+                setattr(self.user, field, True)
+                self.save_user()
+
+                self.assertRevoked(token)
+
+    def test_unrelated_save_keeps_token(self):
+        token = self.issue()
+        self.user.first_name = 'Owner'
+        self.save_user()
+        user, _ = self.auth.authenticate(self.request(token))
+        self.assertEqual(user.id, self.user.id)
+
+    def test_legacy_token_without_claims(self):
+        token = str(RefreshToken.for_user(self.user).access_token)
+        user, _ = self.auth.authenticate(self.request(token))
+        self.assertIsInstance(user, CustomUser)
+        self.assertEqual(user.pk, self.user.pk)
+
+        self.user.is_active = False
+        self.save_user()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate(self.request(token))
+
+    async def test_async_authenticate(self):
+        token = await sync_to_async(self.issue)()
+        self.assertIsNone(await self.auth.aauthenticate(self.request()))
+        legacy = await sync_to_async(lambda: str(RefreshToken.for_user(self.user).access_token))()
+        self.assertIsNone(await self.auth.aauthenticate(self.request(legacy)))
+
+        user, _ = await self.auth.aauthenticate(self.request(token))
+        self.assertEqual((user.id, user.username), (self.user.id, 'owner'))
+
+        self.user.set_password('Other-pass-456')
+        await sync_to_async(self.save_user)()
+        with self.assertRaises(AuthenticationFailed):
+            await self.auth.aauthenticate(self.request(token))
+
+
+class ChangePasswordTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='owner', email='owner@example.com', password='Secret-pass-123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def change(self, old, new):
+        encode = PBKDF2PasswordHasher.encode
+        with mock.patch.object(PBKDF2PasswordHasher, 'encode', autospec=True, side_effect=encode) as hashes:
+            response = self.client.post('/password/change/', {
+                'old_password': old, 'new_password1': new, 'new_password2': new,
+            }, format='json')
+        return response, hashes.call_count
+
+    def test_change_runs_two_hashes(self):
+        response, hashes = self.change('Secret-pass-123', 'Other-pass-456')
+        self.assertEqual(response.status_code, 200)
+        # weryfikacja starego hasła + set_password
+        self.assertEqual(hashes, 2)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('Other-pass-456'))
+
+    def test_wrong_old_password_is_rejected(self):
+        response, hashes = self.change('Wrong-pass-000', 'Other-pass-456')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('old_password', response.data)
+        self.assertEqual(hashes, 1)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('Secret-pass-123'))
+
+    def test_reused_password_is_rejected(self):
+        response, hashes = self.change('Secret-pass-123', 'Secret-pass-123')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('new_password1', response.data)
+        self.assertEqual(hashes, 1)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('Secret-pass-123'))
+
+
+class InvitationTests(TestCase):
+    def setUp(self):
+        self.inviter = CustomUser.objects.create(username='inviter', email='inviter@example.com')
+        self.group = Group.objects.create(name='group')
+        self.group.members.add(self.inviter)
+
+    def create_invitation(self, **kwargs):
+        kwargs.setdefault('expiration_date', timezone.now() + timedelta(days=1))
+        return Invitation.objects.create(group=self.group, inviter=self.inviter, **kwargs)
+
+    def test_token_collision_is_retried(self):
+        existing = self.create_invitation()
+        with mock.patch.object(Invitation, '_generate_short_token', side_effect=[existing.token, '654321']):
+            invitation = self.create_invitation()
+        self.assertEqual(invitation.token, '654321')
+
+    def test_other_integrity_errors_are_not_retried(self):
+        invitation = Invitation(group=self.group, inviter=self.inviter, expiration_date=None)
+        with mock.patch.object(Invitation, '_generate_short_token', return_value='123456') as generate:
+            with self.assertRaises(IntegrityError):
+                invitation.save()
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(invitation.token, '')
+
+    def test_stale_instances_cannot_exceed_max_uses(self):
+        invitation = self.create_invitation(max_uses=1)
+        first, second = Invitation.objects.get(pk=invitation.pk), Invitation.objects.get(pk=invitation.pk)
+
+        self.assertTrue(first.claim_use())
+        self.assertFalse(second.claim_use())
+        invitation.refresh_from_db()
+        self.assertEqual(invitation.uses, 1)
+
+    def test_expired_invitation_cannot_be_claimed(self):
+        invitation = self.create_invitation(expiration_date=timezone.now() - timedelta(seconds=1))
+        self.assertFalse(invitation.claim_use())
+
+    def test_accept_stops_at_max_uses(self):
+        invitation = self.create_invitation(max_uses=1)
+        statuses = []
+        for name in ('first', 'second'):
+            client = APIClient()
+            client.force_authenticate(CustomUser.objects.create(username=name, email=f'{name}@example.com'))
+            statuses.append(client.post(f'/invitations/{invitation.token}/accept').status_code)
+
+        self.assertEqual(statuses, [200, 400])
+        self.assertEqual(self.group.members.count(), 2)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SQLite serializes writers, so the race cannot happen there')
+class InvitationConcurrencyTests(TransactionTestCase):
+    def test_concurrent_accepts_respect_max_uses(self):
+        inviter = CustomUser.objects.create(username='inviter', email='inviter@example.com')
+        group = Group.objects.create(name='group')
+        invitation = Invitation.objects.create(
+            group=group, inviter=inviter, expiration_date=timezone.now() + timedelta(days=1), max_uses=2,
+        )
+        users = [CustomUser.objects.create(username=f'user-{i}', email=f'user-{i}@example.com') for i in range(8)]
+        barrier = threading.Barrier(len(users))
+        statuses = []
+
+        def accept(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                statuses.append(client.post(f'/invitations/{invitation.token}/accept').status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=accept, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        invitation.refresh_from_db()
+        self.assertEqual(sorted(statuses), [200, 200] + [400] * (len(users) - 2))
+        self.assertEqual(invitation.uses, 2)
+        self.assertEqual(group.members.count(), 2)
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create(username='owner', email='owner@example.com', is_verified=True)
+        group = Group.objects.create(name='group')
+        group.members.add(self.user)
+        group.admins.add(self.user)
+        for i in range(5):
+            ToDo.objects.create(user=self.user, title=f'personal-{i}', priority=i % 3)
+            ToDo.objects.create(group=group, title=f'group-{i}')
+        self.token = str(ClaimsRefreshToken.for_user(self.user).access_token)
+        # Kursory są podpisane ze znacznikiem czasu - obie odpowiedzi muszą dostać ten sam
+        patcher = mock.patch.object(signing.TimestampSigner, 'timestamp', return_value='1')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def assertSameAsSync(self, view_class, path, **headers):
+        headers = {'Authorization': f'Bearer {self.token}', **headers}
+        async_response = await view_class.as_view()(AsyncRequestFactory().get(path, headers=headers))
+        if hasattr(async_response, 'render'):
+            # Odpowiedź widoku DRF wywołanego przez fallback renderuje dopiero handler
+            async_response = await sync_to_async(async_response.render)()
+        sync_response = await sync_to_async(
+            lambda: view_class.sync_view.as_view()(RequestFactory().get(path, headers=headers)).render()
+        )()
+
+        self.assertEqual(async_response.status_code, sync_response.status_code, path)
+        self.assertEqual(async_response.content, sync_response.content, path)
+        for header in ('Content-Type', 'ETag', 'Allow'):
+            self.assertEqual(async_response.get(header), sync_response.get(header), header)
+        return async_response
+
+    async def test_responses_match_sync_views(self):
+        for path in ('/todos/', '/todos/?page_size=3', '/todos/?ordering=title&priority=1', '/todos/?search=personal'):
+            await self.assertSameAsSync(async_views.AsyncToDoListView, path)
+        await self.assertSameAsSync(async_views.AsyncToDoByUserView, '/todos/user/?page_size=2')
+        await self.assertSameAsSync(async_views.AsyncToDoByGroupView, '/todos/groups/')
+        await self.assertSameAsSync(async_views.AsyncMyGroupsListView, '/groups/')
+        await self.assertSameAsSync(async_views.AsyncUserInfoView, '/info/')
+
+    async def test_sparse_fieldsets_and_errors_match_sync_views(self):
+        for path in ('/todos/?fields=title&page_size=2', '/todos/?omit=description', '/todos/?fields=nope', '/todos/?cursor=bad'):
+            await self.assertSameAsSync(async_views.AsyncToDoListView, path)
+        await self.assertSameAsSync(async_views.AsyncMyGroupsListView, '/groups/?fields=name')
+
+    async def test_not_modified_matches_sync_view(self):
+        response = await self.assertSameAsSync(async_views.AsyncToDoListView, '/todos/')
+        not_modified = await self.assertSameAsSync(
+            async_views.AsyncToDoListView, '/todos/', **{'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    async def test_invalid_token_falls_back_to_sync_view(self):
+        self.token = 'invalid'
+        response = await self.assertSameAsSync(async_views.AsyncToDoListView, '/todos/')
+        self.assertEqual(response.status_code, 403)
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_generated_dataset_is_benchmarked_on_every_route(self):
+        call_command(
+            'generate_dataset', users=8, groups=4, todos=80, max_group_size=5, batch_size=30, stdout=StringIO(),
+        )
+        self.assertEqual(CustomUser.objects.filter(username__startswith='bench-').count(), 8)
+        self.assertEqual(ToDo.objects.count(), 80)
+        self.assertEqual(sum(ToDoCounter.objects.values_list('count', flat=True)), 80)
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'result.json'
+            call_command('benchmark_endpoints', requests=1, warmup=0, output=str(output), stdout=StringIO())
+            report = json.loads(output.read_text())
+
+        self.assertEqual(report['skipped'], {})
+        self.assertEqual(
+            {key.split(':')[0] for key in report['endpoints']},
+            {pattern.name for pattern in todo_urls.urlpatterns},
+        )
+        failed = {key: result['status'] for key, result in report['endpoints'].items() if result['status'] >= 400}
+        self.assertEqual(failed, {})
+        # Wszystkie zapisy pomiaru są wycofywane
+        self.assertEqual(ToDo.objects.count(), 80)
+        self.assertFalse(CustomUser.objects.filter(username__startswith='benchmark-').exists())
+
+    def test_clear_replaces_previous_dataset(self):
+        options = {'users': 4, 'groups': 2, 'todos': 40, 'max_group_size': 3, 'batch_size': 7, 'stdout': StringIO()}
+        call_command('generate_dataset', **options)
+        kept = ToDo.objects.create(user=CustomUser.objects.create(username='kept', email='kept@example.com'), title='kept')
+
+        call_command('generate_dataset', clear=True, seed=1, **options)
+        self.assertEqual(ToDo.objects.count(), 41)
+        self.assertTrue(ToDo.objects.filter(pk=kept.pk).exists())
+        self.assertEqual(sum(ToDoCounter.objects.values_list('count', flat=True)), 41)
+
+
+@override_settings(REQUEST_INSTRUMENTATION=True, REQUEST_INSTRUMENTATION_REPEATED_QUERY_THRESHOLD=5)
+class RequestInstrumentationTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username='owner', email='owner@example.com')
+        group = Group.objects.create(name='group')
+        group.members.add(self.user)
+
+    def test_server_timing_reports_queries_and_phases(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as ctx, self.assertLogs('todos.instrumentation', 'INFO') as logs:
+            response = client.get('/groups/')
+
+        timing = parse_server_timing(response['Server-Timing'])
+        self.assertEqual(timing['db']['desc'], f'{len(ctx.captured_queries)} queries')
+        self.assertLessEqual({'view', 'serialize', 'total'}, set(timing))
+        self.assertNotIn('n-plus-one', timing)
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((record['path'], record['status'], record['queries']), ('/groups/', 200, len(ctx.captured_queries)))
+
+    def test_repeated_query_shape_is_flagged(self):
+        def view(request):
+            for user_id in range(6):
+                CustomUser.objects.filter(pk=user_id).exists()
+            CustomUser.objects.filter(pk__in=[1, 2, 3]).exists()
+            return HttpResponse()
+
+        with self.assertLogs('todos.instrumentation', 'WARNING') as logs:
+            response = RequestInstrumentationMiddleware(view)(RequestFactory().get('/'))
+
+        self.assertIn('n-plus-one', parse_server_timing(response['Server-Timing']))
+        repeated = json.loads(logs.records[-1].getMessage())['repeated_queries']
+        self.assertEqual([entry['count'] for entry in repeated], [6])
+
+    @override_settings(REQUEST_INSTRUMENTATION=False)
+    def test_disabled_middleware_is_removed(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            RequestInstrumentationMiddleware(lambda request: HttpResponse())
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertNotIn('Server-Timing', client.get('/groups/'))
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.staff = CustomUser.objects.create(username='staff', email='staff@example.com', is_staff=True)
+        self.user = CustomUser.objects.create(username='user', email='user@example.com')
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_endpoint_is_staff_only(self):
+        self.assertEqual(APIClient().get('/metrics/').status_code, 403)
+        self.assertEqual(self.client_for(self.user).get('/metrics/').status_code, 403)
+        response = self.client_for(self.staff).get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+    def test_request_latency_is_labelled_with_url_name(self):
+        self.client_for(self.user).get('/groups/')
+        body = self.client_for(self.staff).get('/metrics/').content.decode()
+        self.assertIn('todo_app_http_request_duration_seconds_count{method="GET",view="group-list"}', body)
+        self.assertIn('todo_app_db_queries_per_request_count{view="group-list"}', body)
+        self.assertIn('todo_app_http_requests_total{method="GET",status="2xx",view="group-list"}', body)
+
+    def test_query_text_is_kept_only_with_instrumentation(self):
+        def view(request):
+            CustomUser.objects.exists()
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        MetricsMiddleware(view)(request)
+        self.assertEqual(request.instrumentation.queries, 1)
+        self.assertIsNone(request.instrumentation.statements)
+
+        request = RequestFactory().get('/')
+        with override_settings(REQUEST_INSTRUMENTATION=True), self.assertLogs('todos.instrumentation', 'INFO'):
+            RequestInstrumentationMiddleware(MetricsMiddleware(view))(request)
+        self.assertEqual(sum(request.instrumentation.statements.values()), 1)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled_middleware_is_removed(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            MetricsMiddleware(lambda request: HttpResponse())
+
+    def test_login_outcomes(self):
+        def count(outcome):
+            return LOGIN_ATTEMPTS.labels(outcome=outcome)._value.get()
+
+        CustomUser.objects.create_user(username='login', email='login@example.com', password='Secret-password-1!')
+        before = count('success'), count('invalid_credentials')
+        APIClient().post('/login/', {'username': 'login', 'password': 'wrong'}, format='json')
+        APIClient().post('/login/', {'username': 'login', 'password': 'Secret-password-1!'}, format='json')
+        self.assertEqual((count('success'), count('invalid_credentials')), (before[0] + 1, before[1] + 1))
+
+    def test_email_queue_depth(self):
+        queue_email('Subject', 'Body', None, ['a@example.com'])
+        queue_email('Subject', 'Body', None, ['b@example.com'])
+        body = render_metrics().decode()
+        self.assertIn('todo_app_email_outbox_pending 2.0', body)
+        self.assertIn('todo_app_email_outbox_due 2.0', body)
+
+    def test_gunicorn_startup_removes_only_metric_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ('counter_1.db', 'histogram_2.db', 'keep.txt'):
+                Path(directory, name).touch()
+            with mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': directory}):
+                config = runpy.run_path(str(Path(settings.BASE_DIR, 'gunicorn.conf.py')))
+                config['on_starting'](server=None)
+            self.assertEqual(os.listdir(directory), ['keep.txt'])
+
+    def test_counters_are_summed_across_processes(self):
+        record = (
+            "import django; django.setup(); "
+            "from todos.metrics import record_token_refresh; record_token_refresh('success')"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': directory}
+            for _ in range(2):
+                subprocess.run([sys.executable, '-c', record], env=env, cwd=settings.BASE_DIR, check=True)
+            with mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': directory}):
+                body = render_metrics().decode()
+        self.assertIn('todo_app_token_refreshes_total{outcome="success"} 2.0', body)
@@ -1,6 +1,18 @@
+from django.conf import settings
 from django.urls import path
 from .views import *
 
+# Under an ASGI server the hot read endpoints are served by async views; anything
+# they don't handle themselves falls through to the synchronous views above.
+if settings.ASYNC_READ_VIEWS:
+    from .async_views import (
+        AsyncMyGroupsListView as MyGroupsListView,
+        AsyncToDoByGroupView as ToDoByGroupView,
+        AsyncToDoByUserView as ToDoByUserView,
+        AsyncToDoListView as ToDoListCreateView,
+        AsyncUserInfoView as UserInfoView,
+    )
+
 urlpatterns = [
     path('info/',UserInfoView.as_view(), name='userinfo'),
     path('register/', RegisterView.as_view(), name='register'),
@@ -12,6 +24,16 @@ urlpatterns = [
     path('verify-email/<uidb64>/<token>/', VerifyEmailView.as_view(), name='verify-email'),
     # Tasks assigned to the user, grouped by groups
     path('todos/groups/', ToDoByGroupView.as_view(), name='todos-by-group'),
+    # Changes (created/updated/deleted) since a sync cursor
+    path('todos/sync/', ToDoSyncView.as_view(), name='todos-sync'),
+    # Open/completed/per-priority counts of the personal list and each group
+    path('todos/summary/', ToDoSummaryView.as_view(), name='todos-summary'),
+    # Streaming NDJSON/CSV export of all visible tasks (?format=ndjson|csv)
+    path('todos/export/', ToDoExportView.as_view(), name='todos-export'),
+    # User info, personal and group tasks and groups in one request (app start)
+    path('bootstrap/', BootstrapView.as_view(), name='bootstrap'),
+    # Batch create/update/complete/delete
+    path('todos/batch/', ToDoBatchView.as_view(), name='todos-batch'),
 
     # Task details (view, edit, delete)
     path('todos/<int:pk>/', ToDoDetailView.as_view(), name='todo-detail'),
@@ -31,4 +53,6 @@ urlpatterns = [
     path('password/change/', ChangePasswordView.as_view(), name='auth-password-change'),
     path('groups/<int:group_id>/leave/', LeaveGroupView.as_view(), name='group-leave'),
     path('reset-password/<str:uidb64>/<str:token>/', password_reset_form_render_view, name='password_reset_form_page'),
+    # Prometheus scrape endpoint (staff only)
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
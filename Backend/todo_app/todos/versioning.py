@@ -0,0 +1,74 @@
+import functools
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.db.models import F, Q
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def bump_data_version(user_ids=(), group_ids=()):
+    """
+    Podbija 'data_version' użytkowników, których dane (zadania, grupy,
+    członkostwa) się zmieniły: wskazanych wprost oraz wszystkich członków
+    i administratorów wskazanych grup. Jedno zapytanie UPDATE.
+    """
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    group_ids = [group_id for group_id in group_ids if group_id is not None]
+    if not user_ids and not group_ids:
+        return
+
+    User = get_user_model()
+    condition = Q(id__in=user_ids)
+    if group_ids:
+        condition |= Q(id__in=User.custom_groups.through.objects.filter(group_id__in=group_ids).values('customuser_id'))
+        condition |= Q(id__in=User.administered_groups.through.objects.filter(group_id__in=group_ids).values('customuser_id'))
+    User.objects.filter(condition).update(data_version=F('data_version') + 1)
+
+
+def user_version_etag(request):
+    """
+    Słaby ETag odpowiedzi: użytkownik, jego 'data_version' oraz ścieżka z
+    parametrami zapytania. Przy uwierzytelnianiu ClaimsJWTAuthentication
+    'data_version' nie jest w tokenie, więc odczyt wczytuje użytkownika (jedno
+    zapytanie) - nadal dużo taniej niż zbudowanie odpowiedzi.
+    """
+    user = request.user
+    if not user or not user.is_authenticated or user.is_superuser:
+        return None
+    return version_etag(user.id, user.data_version, request.get_full_path())
+
+
+def version_etag(user_id, data_version, full_path):
+    path_hash = hashlib.md5(full_path.encode(), usedforsecurity=False).hexdigest()[:16]
+    return f'W/"{user_id}-{data_version}-{path_hash}"'
+
+
+def etag_matches(etag, if_none_match):
+    if not etag or not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    if etags == ['*']:
+        return True
+    return etag.removeprefix('W/') in (candidate.removeprefix('W/') for candidate in etags)
+
+
+def conditional_on_user_version(view_method):
+    """
+    Dekorator metody GET widoku DRF: przy zgodnym nagłówku If-None-Match zwraca
+    304 bez wykonywania zapytań o dane, w przeciwnym razie dodaje ETag do
+    odpowiedzi 200.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        etag = user_version_etag(request)
+        if etag_matches(etag, request.headers.get('If-None-Match')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        response = view_method(self, request, *args, **kwargs)
+        if etag and response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    return wrapper
@@ -3,8 +3,9 @@ import random
 import uuid
 from django.contrib.auth import get_user_model, authenticate, update_session_auth_hash 
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
+from django.db import transaction
 from django.conf import settings
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse
 from django.utils import timezone
@@ -24,19 +25,40 @@ from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 
 from todo_app.settings import EMAIL_HOST_USER
-from .models import ToDo, Group, Invitation, Device
-from .serializers import ChangePasswordSerializer, InvitationCreateSerializer, LoginSerializer, PasswordResetConfirmSerializer, PasswordResetRequestSerializer, ToDoSerializer, UserSerializer, GroupSerializer
+from .models import ToDo, Group, Invitation, Device, ToDoCounter, ToDoTombstone
+from .serializers import ChangePasswordSerializer, InvitationCreateSerializer, LoginSerializer, PasswordResetConfirmSerializer, PasswordResetRequestSerializer, ToDoSerializer, UserSerializer, GroupSerializer, ToDoBatchSerializer, ToDoBatchDataSerializer
 from axes.handlers.proxy import AxesProxyHandler
 from axes.helpers import get_client_username, get_client_ip_address
 from todos.utils import lockout_response 
 from .permissions import IsGroupAdmin, IsGroupAdminOrMemberReadOnly, IsTaskOwnerOrGroupMember 
-from django.db.models import Q
+from .pagination import SectionCursorPagination, ToDoCursorPagination
+from .fastpath import ToDoListFastPath
+from .export import export_response
+from .renderers import CSVRenderer, FastJSONRenderer, NDJSONRenderer
+from .signals import batch_todo_deletes
+from .sync import decode_sync_cursor, encode_sync_cursor, make_tombstone
+from .versioning import bump_data_version, conditional_on_user_version
+from .membership import get_group_roster
+from .outbox import queue_email
+from .counters import apply_counter_deltas, counter_deltas, summarize_counters
+from .search import search_todos
+from .authentication import ClaimsRefreshToken
+from .metrics import METRICS_CONTENT_TYPE, record_login, record_token_refresh, render_metrics
+from django.db.models import Exists, OuterRef, Q
 
 from rest_framework.exceptions import PermissionDenied
 
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError as DjangoValidationError
 
+def user_info_data(user):
+    return {
+        "username": user.username,
+        "user_id": user.id,
+        "status": "verified" if user.is_verified else "not_verified"
+    }
+
+
 class UserInfoView(APIView):
     permission_classes = [AllowAny]  
     @swagger_auto_schema(
@@ -48,11 +70,7 @@ class UserInfoView(APIView):
     )
     def get(self, request):
         if request.user.is_authenticated:
-            return Response({
-                "username": request.user.username,
-                "user_id": request.user.id,
-                "status": "verified" if request.user.is_verified else "not_verified"
-            }, status=status.HTTP_200_OK)
+            return Response(user_info_data(request.user), status=status.HTTP_200_OK)
         return Response({"error": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
 
 class RegisterView(generics.CreateAPIView):
@@ -61,8 +79,9 @@ class RegisterView(generics.CreateAPIView):
     serializer_class = UserSerializer
 
     def perform_create(self, serializer):
-        user = serializer.save(is_verified=False)  
-        self.send_verification_email(user)
+        with transaction.atomic():
+            user = serializer.save(is_verified=False)  
+            self.send_verification_email(user)
 
     def send_verification_email(self, user):
         token = default_token_generator.make_token(user)
@@ -72,7 +91,7 @@ class RegisterView(generics.CreateAPIView):
         subject = "Verify your email"
         message = f"Click the link to verify: {verify_url}"
         recipient_list = [user.email]
-        send_mail(subject, message, EMAIL_HOST_USER, recipient_list, fail_silently=False)
+        queue_email(subject, message, EMAIL_HOST_USER, recipient_list)
 
 class VerifyEmailView(APIView):
     permission_classes = [AllowAny]
@@ -86,7 +105,7 @@ class VerifyEmailView(APIView):
 
         if default_token_generator.check_token(user, token):
             user.is_verified = True
-            user.save()
+            user.save(update_fields=['is_verified'])
             return Response({"message": "Email verified successfully"}, status=status.HTTP_200_OK)
         else:
             return Response({"error": "Invalid or expired token"}, status=status.HTTP_400_BAD_REQUEST)
@@ -132,6 +151,7 @@ class LoginView(APIView):
         device_id_from_client = validated_data.get('device_id') or None
 
         if AxesProxyHandler.is_locked(request):
+            record_login('locked_out')
             return lockout_response(request, credentials={"username": username})
 
         generated_device_id_on_server = None 
@@ -149,6 +169,7 @@ class LoginView(APIView):
             if user.is_superuser:
                 logger = logging.getLogger(__name__)
                 logger.warning(f"Superuser '{user.username}' attempt to login via API blocked.")
+                record_login('superuser_blocked')
                 raise PermissionDenied(
                     ("Superadministratorzy mogą logować się tylko przez panel administracyjny Django.")
                 )
@@ -184,25 +205,89 @@ class LoginView(APIView):
                  )
                  if generated_device_id_on_server:
                     response_data['device_id'] = generated_device_id_on_server
+            record_login('success')
             return Response(response_data, status=status.HTTP_200_OK)
         else:
+            # Axes oznacza żądanie, które przekroczyło limit; odpowiedź 429 podmienia AxesMiddleware
+            record_login('locked_out' if getattr(request, 'axes_locked_out', False) else 'invalid_credentials')
             return Response({'error': 'Invalid Credentials'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-def get_filtered_todos(request, requesting_user=None):
+def group_todos_filter(user):
+    """
+    Warunek dla zadań grupowych widocznych dla użytkownika. Członkostwo jest
+    sprawdzane przez EXISTS na tabeli łączącej (semi-join po indeksie
+    (group_id, customuser_id)), więc zapytanie nie mnoży wierszy i nie
+    wymaga DISTINCT.
+    """
+    membership = Group.members.through.objects.filter(
+        group_id=OuterRef('group_id'),
+        customuser_id=user.id,
+    )
+    return Q(user__isnull=True) & Exists(membership)
+
+
+def personal_todos_filter(user):
+    """
+    Warunek dla zadań osobistych użytkownika. Jawne group_id IS NULL pozwala
+    plannerowi użyć częściowego indeksu todo_user_created_idx.
+    """
+    return Q(user_id=user.id, group__isnull=True)
+
+
+def visible_todos_filter(user):
+    """Warunek widoczności zadań: zadania osobiste oraz zadania grup użytkownika."""
+    return personal_todos_filter(user) | group_todos_filter(user)
+
+
+def user_groups_filter(user):
+    """Warunek dla grup, w których użytkownik jest członkiem lub administratorem."""
+    return Q(members=user.id) | Q(admins=user.id)
+
+
+def resolve_todo_owner(requesting_user, group_instance):
+    """
+    Zwraca parę (user, group), do której ma zostać przypisane zadanie.
+    - Zadanie grupowe: tylko dla członka grupy, pole 'user' jest czyszczone.
+    - Zadanie osobiste: przypisywane do zalogowanego użytkownika.
+    Zadanie nigdy nie ma jednocześnie 'user' i 'group' (patrz ToDo.clean).
+    """
+    if not group_instance:
+        return requesting_user, None
+
+    is_member = getattr(group_instance, 'requester_is_member', None)
+    if is_member is None:
+        is_member = group_instance.members.filter(id=requesting_user.id).exists()
+    if not is_member:
+        raise exceptions.PermissionDenied(
+            "Nie należysz do tej grupy lub nie masz uprawnień do tworzenia dla niej zadań."
+        )
+    return None, group_instance
+
+
+def get_requested_ordering(request):
+    """
+    Sortowanie z parametru 'ordering' z 'id' rozstrzygającym remisy, jak na stronach
+    ToDoCursorPagination. Nieznana wartość jest ignorowana (None - domyślne sortowanie).
+    """
+    allowed_ordering = ['title', '-title', 'priority', '-priority', 'created_at', '-created_at', 'is_completed', '-is_completed']
+    ordering_param = request.query_params.get('ordering')
+    if ordering_param not in allowed_ordering:
+        return None
+    return ordering_param, '-id' if ordering_param.startswith('-') else 'id'
+
+
+def get_filtered_todos(request, requesting_user=None, order_by_rank=True):
     if not requesting_user:
         requesting_user = request.user
 
     if not requesting_user or not requesting_user.is_authenticated:
         return ToDo.objects.none()
 
-    base_queryset = ToDo.objects.all()
+    base_queryset = ToDo.objects.select_related('group')
 
     if not requesting_user.is_superuser:
-        base_queryset = base_queryset.filter(
-            Q(user=requesting_user) | 
-            (Q(group__members=requesting_user) & Q(user__isnull=True))
-        ).distinct()
+        base_queryset = base_queryset.filter(visible_todos_filter(requesting_user))
 
     group_id_param = request.query_params.get('group_id')
     if group_id_param:
@@ -218,61 +303,443 @@ def get_filtered_todos(request, requesting_user=None):
         except ValueError:
             pass 
 
-    ordering_param = request.query_params.get('ordering')
-    if ordering_param:
-        allowed_ordering = ['title', '-title', 'priority', '-priority', 'created_at', '-created_at', 'is_completed', '-is_completed']
-        if ordering_param in allowed_ordering:
-            base_queryset = base_queryset.order_by(ordering_param)
-    else:
-        base_queryset = base_queryset.order_by('-created_at')
+    ordering = get_requested_ordering(request)
+    search_param = request.query_params.get('search')
+    if search_param:
+        # Ranked by relevance unless an explicit ordering is requested.
+        base_queryset = search_todos(base_queryset, search_param, order_by_rank=order_by_rank and not ordering)
+
+    if ordering:
+        base_queryset = base_queryset.order_by(*ordering)
+    elif not search_param:
+        base_queryset = base_queryset.order_by('-created_at', '-id')
 
-    return base_queryset
+    return ToDoSerializer.trim_queryset(base_queryset, request)
 
 class ToDoByUserView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_on_user_version
     def get(self, request):
-        todos = get_filtered_todos(request)
-        serializer = ToDoSerializer(todos, many=True) 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        fast = ToDoListFastPath(request, get_filtered_todos(request))
+        return Response(fast.data(list(fast.rows)), status=status.HTTP_200_OK)
+
+
+def get_group_filtered_todos(request, requesting_user=None):
+    user = requesting_user or request.user
+    todos = ToDo.objects.select_related('group').filter(group_todos_filter(user))
+
+    group_id_param = request.query_params.get('group_id')
+    if group_id_param:
+        try:
+            todos = todos.filter(group_id=int(group_id_param))
+        except ValueError:
+            todos = ToDo.objects.none()
+
+    priority_param = request.query_params.get('priority')
+    if priority_param:
+        try:
+            todos = todos.filter(priority=int(priority_param))
+        except ValueError:
+            pass
+
+    ordering = get_requested_ordering(request)
+    search_param = request.query_params.get('search')
+    if search_param:
+        todos = search_todos(todos, search_param, order_by_rank=not ordering)
+
+    if ordering:
+        todos = todos.order_by(*ordering)
+    elif not search_param:
+        todos = todos.order_by('-created_at', '-id')
+
+    return ToDoSerializer.trim_queryset(todos, request)
 
 
 # Returning tasks assigned to the user, grouped by their respective groups
 class ToDoByGroupView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_on_user_version
+    def get(self, request):
+        fast = ToDoListFastPath(request, get_group_filtered_todos(request))
+        return Response(fast.data(list(fast.rows)), status=status.HTTP_200_OK)
+
+
+class ToDoSyncView(APIView):
+    """
+    Synchronizacja przyrostowa zadań osobistych i grupowych użytkownika.
+    - Bez kursora (lub gdy kursor jest nieważny, zbyt stary albo zmieniło się
+      członkostwo w grupach) zwraca pełną listę i 'reset': true.
+    - Z kursorem zwraca tylko zadania utworzone/zmienione od tego momentu
+      ('changed') oraz identyfikatory zadań usuniętych lub przeniesionych
+      poza widoczne listy ('deleted').
+    W obu przypadkach zwraca nowy 'cursor' do kolejnego wywołania.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description='Kursor zwrócony przez poprzednie wywołanie (opcjonalnie)'),
+        ],
+    )
     def get(self, request):
         user = request.user
-        todos = ToDo.objects.filter(
-            group__members=user, 
-            user__isnull=True
-        ).distinct()
-        
-        group_id_param = request.query_params.get('group_id')
-        if group_id_param:
-            try:
-                todos = todos.filter(group_id=int(group_id_param))
-            except ValueError:
-                todos = ToDo.objects.none()
+        synced_at = timezone.now()
+        group_ids = list(
+            Group.members.through.objects.filter(customuser_id=user.id).values_list('group_id', flat=True)
+        )
+        since = decode_sync_cursor(request.query_params.get('cursor'), group_ids)
+
+        todos = ToDo.objects.select_related('group').filter(
+            personal_todos_filter(user) | Q(user__isnull=True, group_id__in=group_ids)
+        )
+
+        if since is None:
+            changed = list(ToDoSerializer.trim_queryset(todos.order_by('-created_at'), request))
+            deleted = []
+        else:
+            changed = list(ToDoSerializer.trim_queryset(todos.filter(updated_at__gt=since).order_by('updated_at', 'id'), request))
+            changed_ids = {todo.id for todo in changed}
+            deleted = sorted(
+                set(
+                    ToDoTombstone.objects.filter(
+                        Q(user_id=user.id) | Q(group_id__in=group_ids),
+                        deleted_at__gt=since,
+                    ).values_list('todo_id', flat=True)
+                ) - changed_ids
+            )
+
+        return Response({
+            'cursor': encode_sync_cursor(synced_at, group_ids),
+            'reset': since is None,
+            'changed': ToDoSerializer(changed, many=True, context={'request': request}).data,
+            'deleted': deleted,
+        }, status=status.HTTP_200_OK)
+
+
+class ToDoSummaryView(APIView):
+    """
+    Zwraca liczniki zadań (otwarte / ukończone / histogram priorytetów) dla listy
+    osobistej użytkownika i każdej grupy, do której należy, bez pobierania zadań.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @conditional_on_user_version
+    def get(self, request):
+        user = request.user
+        group_ids = list(
+            Group.members.through.objects.filter(customuser_id=user.id).values_list('group_id', flat=True)
+        )
+        counters = ToDoCounter.objects.filter(
+            Q(user=user, group__isnull=True) | Q(user__isnull=True, group_id__in=group_ids)
+        )
 
-        priority_param = request.query_params.get('priority')
-        if priority_param:
+        personal = []
+        per_group = {group_id: [] for group_id in group_ids}
+        for counter in counters:
+            if counter.group_id:
+                per_group[counter.group_id].append(counter)
+            else:
+                personal.append(counter)
+
+        return Response({
+            'personal': summarize_counters(personal),
+            'groups': [
+                {'group_id': group_id, **summarize_counters(group_counters)}
+                for group_id, group_counters in sorted(per_group.items())
+            ],
+        }, status=status.HTTP_200_OK)
+
+
+class ToDoExportView(APIView):
+    """
+    Strumieniowy eksport wszystkich zadań widocznych dla użytkownika (jak /todos/,
+    z tymi samymi filtrami) jako NDJSON (domyślnie) lub CSV (?format=csv).
+    Zadania są posortowane po 'id'; 'after_id' wznawia przerwany eksport.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('format', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['ndjson', 'csv'],
+                              description='Format eksportu (domyślnie ndjson)'),
+            openapi.Parameter('group_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter('priority', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+            openapi.Parameter('search', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter('after_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description="Tylko zadania o 'id' większym niż podane (wznowienie eksportu)"),
+            openapi.Parameter('fields', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter('omit', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+        ],
+    )
+    def get(self, request):
+        after_id = request.query_params.get('after_id')
+        if after_id is not None:
             try:
-                todos = todos.filter(priority=int(priority_param))
+                after_id = int(after_id)
             except ValueError:
-                pass
+                raise exceptions.ValidationError({'after_id': 'Must be an integer.'})
+        # Eksport i tak idzie po 'id', więc bez adnotacji trafności
+        todos = get_filtered_todos(request, order_by_rank=False)
+        return export_response(request, todos, request.accepted_renderer, after_id)
 
-        ordering_param = request.query_params.get('ordering')
-        if ordering_param:
-            allowed_ordering = ['title', '-title', 'priority', '-priority', 'created_at', '-created_at', 'is_completed', '-is_completed']
-            if ordering_param in allowed_ordering:
-                todos = todos.order_by(ordering_param)
-        else:
-            todos = todos.order_by('-created_at')
+    def handle_exception(self, exc):
+        # Błędy (401/403/400) jako JSON, nie w formacie eksportu
+        self.request.accepted_renderer = FastJSONRenderer()
+        self.request.accepted_media_type = FastJSONRenderer.media_type
+        return super().handle_exception(exc)
 
 
-        serializer = ToDoSerializer(todos, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+class BootstrapView(APIView):
+    """
+    Dane potrzebne aplikacji przy starcie w jednym żądaniu: informacje o
+    użytkowniku (jak info/), zadania osobiste, zadania grup użytkownika oraz
+    grupy z członkami (jak groups/).
+
+    Grupy są wczytywane raz, z prefetchem członków i administratorów; z tych
+    samych obiektów pochodzą nazwy grup i członkostwo dla sekcji zadań
+    grupowych, więc całość kosztuje stałą liczbę zapytań niezależnie od liczby
+    grup, członków i zadań.
+
+    - 'sections' ogranicza odpowiedź do wybranych sekcji (domyślnie wszystkie).
+    - Sekcje zadań są stronicowane kursorowo jak listy zadań, z parametrami
+      z prefiksem sekcji ('personal_todos_page_size', 'group_todos_cursor', ...);
+      link 'next' zwraca kolejną stronę tylko tej sekcji.
+    - 'fields'/'omit' (todos.fieldsets) nie są obsługiwane - nazwy pól zadań i
+      grup byłyby niejednoznaczne; sekcje wybiera się parametrem 'sections'.
+    """
+    permission_classes = [IsAuthenticated]
+    sections = ('user', 'personal_todos', 'group_todos', 'groups')
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('sections', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description='Sekcje oddzielone przecinkami: user, personal_todos, group_todos, groups'),
+        ] + [
+            openapi.Parameter(f'{section}_{param}', openapi.IN_QUERY, type=param_type,
+                              description='Stronicowanie sekcji (opcjonalnie)')
+            for section in ('personal_todos', 'group_todos')
+            for param, param_type in (('page_size', openapi.TYPE_INTEGER), ('cursor', openapi.TYPE_STRING))
+        ],
+    )
+    @conditional_on_user_version
+    def get(self, request):
+        user = request.user
+        requested = self.get_requested_sections(request)
+        data = {}
+
+        if 'user' in requested:
+            data['user'] = user_info_data(user)
+
+        groups_by_id, member_group_ids = {}, []
+        if 'groups' in requested:
+            groups = list(GroupSerializer.setup_eager_loading(Group.objects.filter(user_groups_filter(user)).distinct()))
+            groups_by_id = {group.id: group for group in groups}
+            # Zadania grupowe widzą tylko członkowie (nie sami administratorzy), jak w group_todos_filter
+            member_group_ids = [
+                group.id for group in groups if any(member.id == user.id for member in group.members.all())
+            ]
+            data['groups'] = GroupSerializer(groups, many=True).data
+        elif 'group_todos' in requested:
+            groups_by_id = Group.objects.filter(members=user.id).only('id', 'name').in_bulk()
+            member_group_ids = list(groups_by_id)
+
+        if 'personal_todos' in requested:
+            todos = ToDo.objects.filter(personal_todos_filter(user)).order_by('-created_at', '-id')
+            data['personal_todos'] = self.list_section(request, 'personal_todos', todos)
+
+        if 'group_todos' in requested:
+            todos = ToDo.objects.filter(user__isnull=True, group_id__in=member_group_ids).order_by('-created_at', '-id')
+            data['group_todos'] = self.list_section(request, 'group_todos', todos, groups_by_id)
+
+        return Response(data, status=status.HTTP_200_OK)
+
+    def get_requested_sections(self, request):
+        value = request.query_params.get('sections')
+        if not value:
+            return set(self.sections)
+        requested = {section.strip() for section in value.split(',') if section.strip()}
+        unknown = requested - set(self.sections)
+        if unknown:
+            raise exceptions.ValidationError({'sections': f"Unknown sections: {', '.join(sorted(unknown))}"})
+        return requested
+
+    def list_section(self, request, section, todos, groups_by_id=None):
+        paginator = SectionCursorPagination(section)
+        page = paginator.paginate_queryset(todos, request, view=self)
+        items = page if page is not None else list(todos)
+        if groups_by_id:
+            # Grupy są już wczytane, więc group_name nie wymaga JOIN-a ani zapytań per zadanie
+            for todo in items:
+                todo.group = groups_by_id[todo.group_id]
+        data = ToDoSerializer(items, many=True).data
+        if page is not None:
+            return paginator.get_paginated_data(data)
+        return data
+
+class ToDoBatchView(APIView):
+    """
+    Wsadowe operacje na zadaniach: create / update / complete / delete.
+
+    Widoczność wszystkich wskazanych zadań i członkostwo we wskazanych grupach
+    są sprawdzane jednym zapytaniem każde, a zapisy wykonywane w jednej
+    transakcji przez bulk_create / bulk_update / QuerySet.delete(). Wskazane
+    zadania są blokowane (SELECT ... FOR UPDATE) do końca transakcji, więc
+    równoległe partie nie liczą zmian liczników od tego samego stanu. Operacje
+    niepoprawne lub niedozwolone są pomijane i raportowane w wynikach
+    (status per element), pozostałe zostają zastosowane.
+    """
+    permission_classes = [IsAuthenticated]
+    update_fields = ['title', 'description', 'priority', 'is_completed', 'user', 'group', 'updated_at']
+
+    @swagger_auto_schema(request_body=ToDoBatchSerializer)
+    def post(self, request):
+        serializer = ToDoBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            results = self.run(serializer.validated_data['operations'], request.user)
+
+        for result in results:
+            if 'todo' in result:
+                result['todo'] = ToDoSerializer(result['todo']).data
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    def run(self, operations, user):
+
+        todo_ids = {operation['id'] for operation in operations if operation['op'] != 'create'}
+        group_ids = set()
+        for operation in operations:
+            if operation['op'] in ('create', 'update'):
+                try:
+                    group_ids.add(int(operation['data']['group_id']))
+                except (KeyError, TypeError, ValueError):
+                    pass
+
+        todos = ToDo.objects.select_related('group').select_for_update(of=('self',))
+        if not user.is_superuser:
+            todos = todos.filter(visible_todos_filter(user))
+        todos_by_id = todos.in_bulk(todo_ids) if todo_ids else {}
+        # Stan z bazy sprzed zmian tej partii: właściciel (tombstone) i klucz licznika
+        loaded_state = {todo.id: (todo.user_id, todo.group_id, todo.counter_key()) for todo in todos_by_id.values()}
+
+        groups_by_id = {}
+        if group_ids:
+            membership = Group.members.through.objects.filter(group_id=OuterRef('pk'), customuser_id=user.id)
+            groups_by_id = Group.objects.annotate(requester_is_member=Exists(membership)).in_bulk(group_ids)
+
+        results = []
+        to_create = []
+        to_update = {}
+        to_delete = {}
+
+        for index, operation in enumerate(operations):
+            kind = operation['op']
+
+            if kind == 'create':
+                try:
+                    data = self.validate_data(operation['data'], partial=False)
+                    owner, group = self.resolve_owner(user, data.pop('group_id', None), groups_by_id)
+                except exceptions.APIException as e:
+                    results.append(self.error_result(index, e))
+                    continue
+                todo = ToDo(user=owner, group=group, **data)
+                to_create.append(todo)
+                results.append({'index': index, 'status': status.HTTP_201_CREATED, 'todo': todo})
+                continue
+
+            todo = todos_by_id.get(operation['id'])
+            if todo is None or todo.id in to_delete:
+                results.append(self.error_result(index, exceptions.NotFound()))
+                continue
+
+            if kind == 'delete':
+                to_delete[todo.id] = todo
+                to_update.pop(todo.id, None)
+                results.append({'index': index, 'status': status.HTTP_204_NO_CONTENT, 'id': todo.id})
+                continue
+
+            try:
+                if kind == 'complete':
+                    data = {'is_completed': operation['data'].get('is_completed', True)}
+                    data = self.validate_data(data, partial=True)
+                else:
+                    data = self.validate_data(operation['data'], partial=True)
+                if 'group_id' in data:
+                    owner, group = self.resolve_owner(user, data.pop('group_id'), groups_by_id)
+                    todo.user, todo.group = owner, group
+            except exceptions.APIException as e:
+                results.append(self.error_result(index, e))
+                continue
+
+            for field, value in data.items():
+                setattr(todo, field, value)
+            to_update[todo.id] = todo
+            results.append({'index': index, 'status': status.HTTP_200_OK, 'todo': todo})
+
+        self.apply(to_create, list(to_update.values()), list(to_delete), loaded_state)
+        return results
+
+    def validate_data(self, data, partial):
+        data_serializer = ToDoBatchDataSerializer(data=data, partial=partial)
+        data_serializer.is_valid(raise_exception=True)
+        return dict(data_serializer.validated_data)
+
+    def resolve_owner(self, user, group_id, groups_by_id):
+        if group_id is None:
+            return resolve_todo_owner(user, None)
+        group = groups_by_id.get(group_id)
+        if group is None:
+            raise exceptions.ValidationError({'group_id': [f'Invalid pk "{group_id}" - object does not exist.']})
+        return resolve_todo_owner(user, group)
+
+    def error_result(self, index, exception):
+        return {'index': index, 'status': exception.status_code, 'errors': exception.detail}
+
+    def apply(self, to_create, to_update, to_delete_ids, loaded_state):
+        """
+        Zapisuje zmiany partii. bulk_create / bulk_update nie wysyłają sygnałów,
+        więc tombstone'y, liczniki i data_version tworzonych i zmienianych zadań
+        są liczone tutaj ze stanu wczytanego z bazy; usunięcia obsługują
+        odbiorniki post_delete (zbiorczo, przez batch_todo_deletes).
+        """
+        affected_users = set()
+        affected_groups = set()
+        tombstones = []
+        now = timezone.now()
+
+        for todo in to_update:
+            todo.updated_at = now
+            previous_owner = loaded_state[todo.id][:2]
+            if previous_owner != (todo.user_id, todo.group_id):
+                tombstones.append(make_tombstone(todo.id, *previous_owner))
+                affected_users.add(previous_owner[0])
+                affected_groups.add(previous_owner[1])
+
+        deltas = counter_deltas(
+            created=to_create,
+            changed=[(loaded_state[todo.id][2], todo.counter_key()) for todo in to_update],
+        )
+        for todo in [*to_create, *to_update]:
+            affected_users.add(todo.user_id)
+            affected_groups.add(todo.group_id)
+
+        if to_create:
+            ToDo.objects.bulk_create(to_create)
+        if to_update:
+            ToDo.objects.bulk_update(to_update, self.update_fields)
+        if to_delete_ids:
+            with batch_todo_deletes():
+                ToDo.objects.filter(pk__in=to_delete_ids).delete()
+        if tombstones:
+            ToDoTombstone.objects.bulk_create(tombstones)
+        apply_counter_deltas(deltas)
+        bump_data_version(user_ids=affected_users, group_ids=affected_groups)
+
+        for todo in [*to_create, *to_update]:
+            todo._loaded_counter_key = todo.counter_key()
 
 
 class ToDoDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -284,14 +751,46 @@ class ToDoDetailView(generics.RetrieveUpdateDestroyAPIView):
         if not user.is_authenticated:
             return ToDo.objects.none()
         if user.is_superuser:
-            return ToDo.objects.all()
-        return ToDo.objects.filter(
-            Q(user=user) | (Q(group__members=user) & Q(user__isnull=True))
-        ).distinct()
+            return ToDo.objects.select_related('group')
+        return ToDo.objects.select_related('group').filter(visible_todos_filter(user))
+
+    def perform_update(self, serializer):
+        """
+        Przy zmianie 'group_id' zadanie jest przenoszone między listą osobistą
+        a grupą tak, aby nigdy nie miało jednocześnie 'user' i 'group':
+        - 'group_id' grupy (członek grupy): zadanie staje się zadaniem grupy,
+          pole 'user' jest czyszczone;
+        - 'group_id': null: zadanie grupy trafia na listę osobistą edytującego
+          (nie autora - zadania grupowe nie mają autora).
+        Poprzedni właściciel dostaje tombstone (todos/sync/) i nową wersję danych.
+        """
+        if 'group' not in serializer.validated_data:
+            serializer.save()
+            return
+
+        instance = serializer.instance
+        previous_owner = (instance.user_id, instance.group_id)
+
+        user, group = resolve_todo_owner(self.request.user, serializer.validated_data.get('group'))
+        serializer.save(user=user, group=group)
+
+        if (instance.user_id, instance.group_id) != previous_owner:
+            make_tombstone(instance.id, *previous_owner).save()
+            bump_data_version(user_ids=[previous_owner[0]], group_ids=[previous_owner[1]])
 
 class ToDoListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ToDoSerializer
+    pagination_class = ToDoCursorPagination
+
+    @conditional_on_user_version
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        # Odczyt listy bez ToDoSerializer (todos.fastpath); zapis nadal przez serializer
+        fast = ToDoListFastPath(request, self.get_queryset())
+        return Response(fast.data(list(fast.rows)))
 
     def get_queryset(self):
         """
@@ -307,21 +806,9 @@ class ToDoListCreateView(generics.ListCreateAPIView):
         - Jeśli w żądaniu podano 'group_id', tworzy jedno współdzielone zadanie dla tej grupy.
         - W przeciwnym razie tworzy zadanie osobiste dla zalogowanego użytkownika.
         """
-        requesting_user = self.request.user
-    
         group_instance = serializer.validated_data.get('group') 
 
-        final_user_to_assign = None
-        final_group_to_assign = None
-
-        if group_instance:
-            if not group_instance.members.filter(id=requesting_user.id).exists():
-                raise exceptions.PermissionDenied(
-                    "Nie należysz do tej grupy lub nie masz uprawnień do tworzenia dla niej zadań."
-                )
-            final_group_to_assign = group_instance
-        else:
-            final_user_to_assign = requesting_user
+        final_user_to_assign, final_group_to_assign = resolve_todo_owner(self.request.user, group_instance)
 
         serializer.save(user=final_user_to_assign, group=final_group_to_assign)
 
@@ -329,9 +816,11 @@ class ToDoListCreateView(generics.ListCreateAPIView):
 
 class GroupListView(generics.ListAPIView):
     permission_classes = [IsAdminUser]
-    queryset = Group.objects.all()
     serializer_class = GroupSerializer
 
+    def get_queryset(self):
+        return GroupSerializer.eager_queryset(Group.objects.all(), self.request)
+
 class MyGroupsListView(generics.ListAPIView):
     """
     Widok API zwracający listę grup, do których należy
@@ -340,6 +829,10 @@ class MyGroupsListView(generics.ListAPIView):
     serializer_class = GroupSerializer
     permission_classes = [IsAuthenticated] 
 
+    @conditional_on_user_version
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
         """
         Ta metoda zwraca queryset grup przefiltrowany dla aktualnego użytkownika.
@@ -348,21 +841,27 @@ class MyGroupsListView(generics.ListAPIView):
         """
         user = self.request.user
         if user.is_authenticated:
-            return Group.objects.filter(Q(members=user) | Q(admins=user)).distinct()
+            queryset = Group.objects.filter(user_groups_filter(user)).distinct()
+            return GroupSerializer.eager_queryset(queryset, self.request)
         return Group.objects.none()
 
 class GroupDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated, IsGroupAdminOrMemberReadOnly] 
     serializer_class = GroupSerializer 
 
+    @conditional_on_user_version
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
         user = self.request.user
         if not user.is_authenticated:
             return Group.objects.none()
             
         if user.is_superuser:
-            return Group.objects.all()
-        return Group.objects.filter(Q(members=user) | Q(admins=user)).distinct()
+            return GroupSerializer.eager_queryset(Group.objects.all(), self.request)
+        queryset = Group.objects.filter(user_groups_filter(user)).distinct()
+        return GroupSerializer.eager_queryset(queryset, self.request)
 
 class GroupCreateView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
@@ -398,7 +897,7 @@ class InvitationCreateView(APIView):
             except Group.DoesNotExist:
                 return Response({"error": "Group not found"}, status=status.HTTP_400_BAD_REQUEST)
             
-            is_group_admin = group.admins.filter(id=request.user.id).exists()
+            is_group_admin = get_group_roster(request, group.id).is_admin(request.user.id)
 
             if not (request.user.is_superuser or is_group_admin):
                 return Response(
@@ -407,33 +906,24 @@ class InvitationCreateView(APIView):
                 )
             
             expiration_date = timezone.now() + timedelta(days=expiration_days)
-            invitation = Invitation.objects.create(
-                group=group,
-                inviter=request.user,
-                expiration_date=expiration_date,
-                max_uses=max_uses
-            )
-
-            if email:
-                subject = f"Zaproszenie do grupy: {group.name}"
-                message = (
-                    f"Cześć!\n\n"
-                    f"{request.user.username} zaprosił(a) Cię do dołączenia do grupy \"{group.name}\".\n\n"
-                    f"Aby dołączyć, wpisz poniższy kod zaproszenia w aplikacji:\n"
-                    f"{invitation.token}\n\n" 
-                    f"Kod wygaśnie za {expiration_days} dni.\n"
+            with transaction.atomic():
+                invitation = Invitation.objects.create(
+                    group=group,
+                    inviter=request.user,
+                    expiration_date=expiration_date,
+                    max_uses=max_uses
                 )
-                try:
-                    send_mail(
-                        subject=subject,
-                        message=message,
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[email],
-                        fail_silently=False,
+
+                if email:
+                    subject = f"Zaproszenie do grupy: {group.name}"
+                    message = (
+                        f"Cześć!\n\n"
+                        f"{request.user.username} zaprosił(a) Cię do dołączenia do grupy \"{group.name}\".\n\n"
+                        f"Aby dołączyć, wpisz poniższy kod zaproszenia w aplikacji:\n"
+                        f"{invitation.token}\n\n" 
+                        f"Kod wygaśnie za {expiration_days} dni.\n"
                     )
-                except Exception as e:
-                    logger = logging.getLogger(__name__) 
-                    logger.error(f"Nie udało się wysłać emaila z zaproszeniem do {email} dla grupy {group.name}: {e}")
+                    queue_email(subject, message, settings.DEFAULT_FROM_EMAIL, [email])
 
 
             return Response({
@@ -456,7 +946,7 @@ class AcceptInvitationView(APIView):
     )
     def post(self, request, token):
         try:
-            invitation = Invitation.objects.get(token=token)
+            invitation = Invitation.objects.select_related('group').get(token=token)
         except Invitation.DoesNotExist:
             return Response({"error": "Invitation not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -467,16 +957,14 @@ class AcceptInvitationView(APIView):
         user = request.user
         group = invitation.group
 
-        if group.members.filter(id=user.id).exists():
+        if get_group_roster(request, group.id).is_member(user.id):
             return Response({"message": "User is already a member of the group"}, status=status.HTTP_200_OK)
 
-        if invitation.uses >= invitation.max_uses:
-            return Response({"error": "Invitation has already been used the maximum number of times"},
-                            status=status.HTTP_400_BAD_REQUEST)
-
-        group.members.add(user)
-        invitation.uses += 1
-        invitation.save()
+        with transaction.atomic():
+            if not invitation.claim_use():
+                return Response({"error": "Invitation has already been used the maximum number of times"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            group.members.add(user)
 
         return Response({
             "message": f"Invitation accepted successfully. User: {user.username} added to group: {group.name}"
@@ -507,12 +995,12 @@ class LogoutView(APIView):
         if not device_id or not refresh_token:
             return Response({"detail": "device_id and refresh_token are required"},
                             status=status.HTTP_400_BAD_REQUEST)
-        try:
-            device = Device.objects.get(user=request.user, device_id=device_id, refresh_token=refresh_token)
-            device.delete()
+        deleted, _ = Device.objects.filter(
+            user=request.user, device_id=device_id, token_hash=Device.hash_token(refresh_token)
+        ).delete()
+        if deleted:
             return Response({"detail": "Successfully logged out"}, status=status.HTTP_200_OK)
-        except Device.DoesNotExist:
-            return Response({"detail": "Successfully logged out (session was not persistent or already ended)."}, status=status.HTTP_200_OK)
+        return Response({"detail": "Successfully logged out (session was not persistent or already ended)."}, status=status.HTTP_200_OK)
 
 
 class RefreshTokenView(APIView):
@@ -539,47 +1027,61 @@ class RefreshTokenView(APIView):
          refresh_token_str = request.data.get('refresh_token')
 
          if not device_id or not refresh_token_str:
+             record_token_refresh('missing_fields')
              return Response({"detail": "device_id and refresh_token are required"}, status=status.HTTP_400_BAD_REQUEST)
 
          try:
              token = SimpleJWTRefreshToken(refresh_token_str)
-             user_id = token.get('user_id')
-             user = get_user_model().objects.get(id=user_id) 
+             token_hash = Device.hash_token(refresh_token_str)
 
-             device = Device.objects.get(user=user, device_id=device_id, refresh_token=refresh_token_str)
+             # Urządzenie i użytkownik w jednym zapytaniu po unikalnym indeksie skrótu tokena
+             device = Device.objects.select_related('user').get(
+                 token_hash=token_hash,
+                 device_id=device_id,
+                 user_id=token.get('user_id'),
+             )
 
              if device.expires_at < timezone.now():
+                 record_token_refresh('expired')
                  return Response({"detail": "Refresh token has expired (session inactive)."}, status=status.HTTP_401_UNAUTHORIZED)
 
-             new_refresh_token_str, new_access_token_str = create_new_tokens(user, device.remember_me)
-
-             device.refresh_token = new_refresh_token_str
+             new_refresh_token_str, new_access_token_str = create_new_tokens(device.user, device.remember_me)
 
+             rotated_fields = {
+                 'refresh_token': new_refresh_token_str,
+                 'token_hash': Device.hash_token(new_refresh_token_str),
+             }
              if device.remember_me:
-                sliding_window_duration = timedelta(days=settings.SIMPLE_JWT.get('REFRESH_TOKEN_LIFETIME', 30))
-                new_db_expires_at = timezone.now() + sliding_window_duration
-                device.expires_at = new_db_expires_at
-             
-             device.save()
+                sliding_window_duration = settings.SIMPLE_JWT.get('REFRESH_TOKEN_LIFETIME', timedelta(days=30))
+                rotated_fields['expires_at'] = timezone.now() + sliding_window_duration
 
+             # Warunkowy UPDATE: przy dwóch równoległych odświeżeniach tym samym tokenem wygrywa jedno
+             rotated = Device.objects.filter(pk=device.pk, token_hash=token_hash).update(**rotated_fields)
+             if not rotated:
+                 record_token_refresh('conflict')
+                 return Response({"detail": "Invalid refresh token or device ID association."}, status=status.HTTP_401_UNAUTHORIZED)
+
+             record_token_refresh('success')
              return Response({
                  'access': new_access_token_str,
                  'refresh': new_refresh_token_str,
              }, status=status.HTTP_200_OK)
 
          except (Device.DoesNotExist):
+             record_token_refresh('invalid')
              return Response({"detail": "Invalid refresh token or device ID association."}, status=status.HTTP_401_UNAUTHORIZED)
-         except (get_user_model().DoesNotExist):
-              return Response({"detail": "User associated with token not found."}, status=status.HTTP_401_UNAUTHORIZED)
          except (TokenError, InvalidToken) as e:
+              record_token_refresh('invalid')
               return Response({"detail": f"Refresh token is invalid or expired: {e}"}, status=status.HTTP_401_UNAUTHORIZED)
-         except Exception as e:
-              print(f"Unexpected error during token refresh: {e}")
+         except Exception:
+              logger = logging.getLogger(__name__)
+              logger.exception("Unexpected error during token refresh")
+              record_token_refresh('error')
               return Response({"detail": "An internal error occurred during token refresh."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 def create_new_tokens(user, remember_me):
-     refresh = SimpleJWTRefreshToken.for_user(user)
+     refresh = ClaimsRefreshToken.for_user(user)
      refresh_lifetime = settings.SIMPLE_JWT.get('REFRESH_TOKEN_LIFETIME',timedelta(days=30))
      if remember_me:
          refresh.set_exp(lifetime=refresh_lifetime)
@@ -619,13 +1121,7 @@ class PasswordResetRequestView(APIView):
             f"Pozdrawiamy,\nZespół Aplikacji GoNext"
         )
 
-        try:
-            send_mail(subject, message, EMAIL_HOST_USER, [email], fail_silently=False)
-        except Exception as e:
-            logger = logging.getLogger(__name__) 
-            logger.error(f"Nie udało się wysłać emaila resetującego hasło do {email}: {e}")
-            return Response({"message": "Jeśli konto powiązane z tym adresem email istnieje i jest aktywne, otrzymasz wiadomość e-mail z instrukcjami dotyczącymi resetowania hasła."}, status=status.HTTP_200_OK)
-
+        queue_email(subject, message, EMAIL_HOST_USER, [email])
 
         return Response({"message": "Link do resetu hasła został wysłany na Twój adres email (jeśli konto istnieje i jest aktywne)."}, status=status.HTTP_200_OK)
 
@@ -677,7 +1173,7 @@ class PasswordResetConfirmView(APIView):
             return Response({"new_password": list(e.messages)}, status=status.HTTP_400_BAD_REQUEST)
 
         user.set_password(new_password)
-        user.save()
+        user.save(update_fields=['password'])
         update_session_auth_hash(request, user) 
         return Response({"message": "Hasło zostało zmienione pomyślnie."}, status=status.HTTP_200_OK)
     
@@ -697,15 +1193,16 @@ class ManageGroupMemberView(APIView):
     def delete(self, request, group_id, user_id):
         group = get_object_or_404(Group, id=group_id)
         user_to_remove = get_object_or_404(User, id=user_id)
+        roster = get_group_roster(request, group.id)
 
-        if not group.members.filter(id=user_to_remove.id).exists():
+        if not roster.is_member(user_to_remove.id):
             return Response({"error": "User is not a member of this group."}, status=status.HTTP_404_NOT_FOUND)
 
-        if user_to_remove == request.user and group.admins.count() == 1 and group.admins.filter(id=request.user.id).exists():
+        if user_to_remove == request.user and len(roster.admin_ids) == 1 and roster.is_admin(request.user.id):
             return Response({"error": "You cannot remove yourself as the last administrator of the group."}, status=status.HTTP_403_FORBIDDEN)
         
-        if group.admins.filter(id=user_to_remove.id).exists():
-            if group.admins.count() == 1: 
+        if roster.is_admin(user_to_remove.id):
+            if len(roster.admin_ids) == 1: 
                  return Response({"error": "Cannot remove the only administrator of the group. Promote another admin first."}, status=status.HTTP_403_FORBIDDEN)
             group.admins.remove(user_to_remove)
         
@@ -729,16 +1226,15 @@ class ManageGroupAdminView(APIView):
     def post(self, request, group_id, user_id): 
         group = get_object_or_404(Group, id=group_id)
         user_to_promote = get_object_or_404(User, id=user_id)
+        roster = get_group_roster(request, group.id)
 
-        if not group.members.filter(id=user_to_promote.id).exists():
+        if not roster.is_member(user_to_promote.id):
             return Response({"error": "User is not a member of this group and cannot be promoted."}, status=status.HTTP_404_NOT_FOUND)
         
-        if group.admins.filter(id=user_to_promote.id).exists():
+        if roster.is_admin(user_to_promote.id):
             return Response({"error": "User is already an administrator of this group."}, status=status.HTTP_409_CONFLICT)
 
         group.admins.add(user_to_promote)
-        if not group.members.filter(id=user_to_promote.id).exists():
-            group.members.add(user_to_promote) 
 
         return Response({"message": f"User {user_to_promote.username} promoted to administrator in group {group.name}."}, status=status.HTTP_200_OK)
 
@@ -754,14 +1250,15 @@ class ManageGroupAdminView(APIView):
     def delete(self, request, group_id, user_id): 
         group = get_object_or_404(Group, id=group_id)
         admin_to_demote = get_object_or_404(User, id=user_id)
+        roster = get_group_roster(request, group.id)
 
-        if not group.admins.filter(id=admin_to_demote.id).exists():
+        if not roster.is_admin(admin_to_demote.id):
             return Response({"error": "User is not an administrator of this group."}, status=status.HTTP_404_NOT_FOUND)
 
-        if admin_to_demote == request.user and group.admins.count() == 1:
+        if admin_to_demote == request.user and len(roster.admin_ids) == 1:
             return Response({"error": "You cannot demote yourself as the last administrator. Promote another admin first or delete the group."}, status=status.HTTP_403_FORBIDDEN)
         
-        if group.admins.count() == 1 and not request.user.is_superuser:
+        if len(roster.admin_ids) == 1 and not request.user.is_superuser:
              return Response({"error": "Cannot demote the only administrator of the group unless you are a superuser. Promote another admin first."}, status=status.HTTP_403_FORBIDDEN)
 
 
@@ -796,7 +1293,7 @@ class ChangePasswordView(generics.GenericAPIView):
         current_device_id = serializer.validated_data.get('current_device_id')
 
         user.set_password(new_password)
-        user.save()
+        user.save(update_fields=['password'])
 
         update_session_auth_hash(request, user)
 
@@ -828,15 +1325,17 @@ class LeaveGroupView(APIView):
         user_to_leave = request.user
         group = get_object_or_404(Group, id=group_id)
 
-        if not group.members.filter(id=user_to_leave.id).exists():
+        roster = get_group_roster(request, group.id)
+
+        if not roster.is_member(user_to_leave.id):
             return Response(
                 {"error": "Nie jesteś członkiem tej grupy."},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        is_admin = group.admins.filter(id=user_to_leave.id).exists()
+        is_admin = roster.is_admin(user_to_leave.id)
 
-        if is_admin and group.admins.count() == 1:
+        if is_admin and len(roster.admin_ids) == 1:
             return Response(
                 {"error": "Nie możesz opuścić grupy, ponieważ jesteś jej ostatnim administratorem. "
                           "Najpierw mianuj innego administratora lub usuń grupę."},
@@ -873,4 +1372,16 @@ def password_reset_form_render_view(request, uidb64=None, token=None):
         'token': token,
         'error_message': error_message 
     }
-    return render(request, 'todos/password_reset_form_page.html', context)
\ No newline at end of file
+    return render(request, 'todos/password_reset_form_page.html', context)
+
+
+class MetricsView(APIView):
+    """
+    Metryki w formacie tekstowym Prometheusa (todos.metrics), zsumowane ze
+    wszystkich workerów. Dostępne tylko dla użytkowników ze statusem staff.
+    """
+    permission_classes = [IsAdminUser]
+    swagger_schema = None
+
+    def get(self, request):
+        return HttpResponse(render_metrics(), content_type=METRICS_CONTENT_TYPE)